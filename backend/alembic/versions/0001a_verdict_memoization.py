@@ -0,0 +1,34 @@
+"""submissions: code/problem fingerprints and memoized grade result
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-19 18:39:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001a'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('submissions', sa.Column('code_hash', sa.String(length=64), nullable=True))
+    op.add_column('submissions', sa.Column('problem_hash', sa.String(length=64), nullable=True))
+    op.add_column('submissions', sa.Column('grade_result', sa.JSON(none_as_null=True), nullable=True))
+    op.create_index('ix_submissions_problem_code_hash', 'submissions', ['problem_id', 'code_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_submissions_problem_code_hash', table_name='submissions')
+    op.drop_column('submissions', 'grade_result')
+    op.drop_column('submissions', 'problem_hash')
+    op.drop_column('submissions', 'code_hash')
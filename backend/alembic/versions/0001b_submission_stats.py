@@ -0,0 +1,65 @@
+"""per-user and per-problem submission statistics
+
+Revision ID: 0001b
+Revises: 0001a
+Create Date: 2026-10-19 18:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001b'
+down_revision: Union[str, Sequence[str], None] = '0001a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('problem_stats',
+    sa.Column('problem_id', sa.Integer(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('accepted', sa.Integer(), nullable=False),
+    sa.Column('attempted_by', sa.Integer(), nullable=False),
+    sa.Column('solved_by', sa.Integer(), nullable=False),
+    sa.Column('status_counts', sa.JSON(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['problem_id'], ['problems.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('problem_id')
+    )
+    op.create_table('user_problem_stats',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('problem_id', sa.Integer(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('accepted', sa.Integer(), nullable=False),
+    sa.Column('status_counts', sa.JSON(), nullable=False),
+    sa.Column('last_status', sa.String(length=50), nullable=True),
+    sa.Column('first_attempt_at', sa.DateTime(), nullable=True),
+    sa.Column('first_accepted_at', sa.DateTime(), nullable=True),
+    sa.Column('last_submitted_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['problem_id'], ['problems.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'problem_id')
+    )
+    op.create_table('user_stats',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('accepted', sa.Integer(), nullable=False),
+    sa.Column('solved', sa.Integer(), nullable=False),
+    sa.Column('status_counts', sa.JSON(), nullable=False),
+    sa.Column('topic_solved', sa.JSON(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_stats')
+    op.drop_table('user_problem_stats')
+    op.drop_table('problem_stats')
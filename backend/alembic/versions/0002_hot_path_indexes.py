@@ -0,0 +1,55 @@
+"""hot-path indexes for chat history and submission listings
+
+Revision ID: 0002
+Revises: 0001b
+Create Date: 2026-10-19 18:45:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built concurrently on Postgres so live tables aren't locked for writes
+    with op.get_context().autocommit_block():
+        # send_message: latest history for (user, track)
+        op.create_index(
+            'ix_chat_histories_user_track_updated',
+            'chat_histories',
+            ['user_id', 'track', 'updated_at'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        # list_my_submissions: a user's submissions, newest first
+        op.create_index(
+            'ix_submissions_user_created',
+            'submissions',
+            ['user_id', 'created_at'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_submissions_user_created',
+            table_name='submissions',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_chat_histories_user_track_updated',
+            table_name='chat_histories',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,30 @@
+"""problems: reference solution and input generator spec for stress tests
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 22:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('problems', sa.Column('reference_solution', sa.Text(), nullable=True))
+    op.add_column('problems', sa.Column('stress_spec', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('problems', 'stress_spec')
+    op.drop_column('problems', 'reference_solution')
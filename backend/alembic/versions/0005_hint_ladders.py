@@ -0,0 +1,35 @@
+"""problems: stored hint ladder; user_problem_stats: hint ladder pointer
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-20 01:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('problems', sa.Column('hint_ladder', sa.JSON(), nullable=True))
+    op.add_column('problems', sa.Column('hint_ladder_hash', sa.String(length=64), nullable=True))
+    op.add_column(
+        'user_problem_stats',
+        sa.Column('hint_level', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user_problem_stats', 'hint_level')
+    op.drop_column('problems', 'hint_ladder_hash')
+    op.drop_column('problems', 'hint_ladder')
@@ -0,0 +1,42 @@
+"""problems: stable slug used to upsert the catalogue across environments
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-20 03:25:00.000000
+
+"""
+import uuid
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('problems', sa.Column('slug', sa.String(length=100), nullable=True))
+    # Random like new rows, not derived from the id: ids differ between
+    # environments, so an id-based slug would match unrelated problems
+    problems = sa.table('problems', sa.column('id', sa.Integer), sa.column('slug', sa.String))
+    bind = op.get_bind()
+    ids = bind.execute(sa.select(problems.c.id)).scalars().all()
+    for problem_id in ids:
+        bind.execute(
+            problems.update().where(problems.c.id == problem_id).values(slug=uuid.uuid4().hex)
+        )
+    with op.batch_alter_table('problems') as batch_op:
+        batch_op.alter_column('slug', existing_type=sa.String(length=100), nullable=False)
+    op.create_index(op.f('ix_problems_slug'), 'problems', ['slug'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_problems_slug'), table_name='problems')
+    op.drop_column('problems', 'slug')
@@ -1,3 +1,5 @@
+import multiprocessing
+
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 from typing import Optional
@@ -11,11 +13,36 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "postgresql+asyncpg://postgres:postgres@db:5432/codebot"
+    DB_MAX_CONNECTIONS: int = 90  # Shared by all workers; keep below Postgres max_connections (100)
+    
+    # Production server (see gunicorn.conf.py)
+    WEB_WORKERS: int = 0  # Worker processes; 0 means one per CPU core
+    WORKER_TIMEOUT: int = 180  # Longer than the 120s AI request timeout
+    GRACEFUL_TIMEOUT: int = 30  # Seconds a worker gets to finish requests on reload/stop
+    WORKER_MAX_REQUESTS: int = 0  # Recycle workers after this many requests; 0 disables
+    FORWARDED_ALLOW_IPS: str = "127.0.0.1"  # Proxies trusted to set X-Forwarded-For (comma-separated)
+    
+    # Readiness and load shedding
+    MAX_INFLIGHT_AI_REQUESTS: int = 16  # Per worker; further AI requests get a 503
+    ADMISSION_RETRY_AFTER: int = 5  # Retry-After seconds sent with shed requests
+    READY_MIN_DB_HEADROOM: int = 2  # Free pool connections required to report ready
+    
+    # Rate limiting (per user, or per IP for guests; see app/services/rate_limiter.py)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_WINDOW_SECONDS: int = 60
+    RATE_LIMIT_USER_POINTS: int = 120  # Points per window; AI routes cost 10-20
+    RATE_LIMIT_GUEST_POINTS: int = 60
+    LLM_DAILY_TOKENS_USER: int = 200_000  # Gemini tokens per UTC day
+    LLM_DAILY_TOKENS_GUEST: int = 20_000
+    
+    # Redis (optional; shared state falls back to in-process memory when unset)
+    REDIS_URL: Optional[str] = None
     
     # JWT
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440  # 24 hours
+    ADMIN_EMAILS: list = []  # Users allowed to call instructor/admin endpoints
     
     # AI Configuration
     AI_PROVIDER: str = "gemini"  # "openai" or "gemini"
@@ -29,9 +56,78 @@ class Settings(BaseSettings):
         return self.GEMINI_API_KEY or self.GOOGLE_API_KEY
     AI_MODEL: str = "gemini-flash-latest"
     
+    # LLM usage accounting; USD per million tokens, used for cost estimates only
+    LLM_INPUT_PRICE_PER_MTOK: float = 0.30
+    LLM_OUTPUT_PRICE_PER_MTOK: float = 2.50
+    
+    # Opt-in capture of sanitized LLM calls for replay (app/services/llm_capture.py)
+    LLM_CAPTURE_DIR: Optional[str] = None
+    LLM_CAPTURE_SAMPLE_RATE: float = 1.0
+    
+    # Local g++ pre-pass for grade_code / review_solution (app/services/static_analysis.py)
+    STATIC_ANALYSIS_ENABLED: bool = True
+    STATIC_ANALYSIS_COMPILER: str = "g++"
+    
+    # grade_code prompt budget in estimated tokens (app/services/prompt_budget.py)
+    GRADE_PROMPT_TOKEN_BUDGET: int = 4000  # Problem statement + code; the student's code is never cut
+    GRADE_PROBLEM_TOKEN_BUDGET: int = 1500  # Share the problem statement may use
+    
+    # Randomized stress tests against a problem's reference solution (app/services/stress_test.py).
+    # Runs student binaries with rlimits only; enable inside a locked-down container.
+    STRESS_TEST_ENABLED: bool = False
+    STRESS_TIME_LIMIT_SECONDS: float = 2.0  # Per run of either program
+    STRESS_BUDGET_SECONDS: float = 10.0  # Wall time for the random tests of one submission
+    STRESS_PARALLELISM: int = 0  # Concurrent tests per worker; 0 = one per CPU
+    
+    # Arduino sketch simulator for the robotics track (app/services/arduino_sim.py);
+    # runs student code with rlimits only, like the stress tests
+    ARDUINO_SIM_ENABLED: bool = False
+    ARDUINO_SIM_CHAT_SECONDS: float = 5.0  # Simulated time when a sketch is sent to the tutor
+    
+    # Idempotency-Key handling for submit/generate/chat (app/services/idempotency.py)
+    IDEMPOTENCY_TTL_SECONDS: int = 300  # How long a finished response is replayed
+    IDEMPOTENCY_LOCK_SECONDS: int = 180  # Pending record lifetime if a worker dies mid-request
+    IDEMPOTENCY_WAIT_SECONDS: float = 130.0  # Longest a repeat waits for the original before 409
+    
+    # Background answers to chat suggestions (app/services/speculation.py)
+    SPECULATIVE_CHAT_ENABLED: bool = False
+    SPECULATIVE_CHAT_MAX_SUGGESTIONS: int = 3  # Speculated per reply
+    SPECULATIVE_CHAT_MAX_CONCURRENT: int = 2  # Per worker; further suggestions are skipped
+    SPECULATIVE_CHAT_TOKENS_PER_HOUR: int = 100_000  # Per worker
+    SPECULATIVE_CHAT_TTL_SECONDS: int = 600  # Unclicked answers expire after this
+    
+    # Code sent to the tutor as diffs across turns (app/services/code_context.py)
+    CHAT_CODE_TTL_SECONDS: int = 7200  # Last code kept per caller and track
+    
+    # Per-problem hint ladders served on failed submissions (app/services/hint_ladder.py)
+    HINT_LADDERS_ENABLED: bool = True
+    
+    # Bulk JSONL import/export of problems (app/services/catalogue.py)
+    CATALOGUE_IMPORT_BATCH_SIZE: int = 500  # Rows per multi-row upsert
+    CATALOGUE_EXPORT_FETCH_SIZE: int = 500  # Rows fetched per server-side cursor round trip
+    
+    # AI circuit breakers (one per AIService method, per worker)
+    AI_BREAKER_WINDOW: int = 20  # Recent calls considered
+    AI_BREAKER_MIN_CALLS: int = 5  # Calls needed before the breaker can trip
+    AI_BREAKER_FAILURE_RATIO: float = 0.5  # Failing share of the window that trips it
+    AI_BREAKER_SLOW_CALL_SECONDS: float = 30.0  # Slower calls count as failures
+    AI_BREAKER_RESET_SECONDS: float = 30.0  # Open time before a half-open probe
+    
+    # Chat retrieval (see app/services/retrieval.py)
+    RETRIEVAL_INDEX_DIR: str = "data/retrieval"
+    RETRIEVAL_TOP_K: int = 3
+    EMBEDDING_MODEL: Optional[str] = None  # sentence-transformers model; feature hashing if unset
+    
+    # Plagiarism detection
+    SIMILARITY_WORKERS: int = 2  # Process pool size for batch similarity reports
+    
     # CORS
     CORS_ORIGINS: list = ["http://localhost:3000", "http://localhost"]
     
+    @property
+    def web_workers(self) -> int:
+        return self.WEB_WORKERS or multiprocessing.cpu_count()
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -1,16 +1,26 @@
-from sqlmodel import SQLModel
+from pathlib import Path
+
 from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import create_async_engine
 from app.config import get_settings
 
 settings = get_settings()
 
+MIGRATIONS_DIR = Path(__file__).resolve().parents[1] / "alembic"
+
+# Every worker gets an equal share of DB_MAX_CONNECTIONS, at most 10 + 20
+CONNECTIONS_PER_WORKER = max(2, min(30, settings.DB_MAX_CONNECTIONS // settings.web_workers))
+POOL_SIZE = max(1, CONNECTIONS_PER_WORKER // 3)
+MAX_OVERFLOW = CONNECTIONS_PER_WORKER - POOL_SIZE
+
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20
+    pool_size=POOL_SIZE,
+    max_overflow=MAX_OVERFLOW
 )
 
 
@@ -20,6 +30,40 @@ async def get_db() -> AsyncSession:
         yield session
 
 
-async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
+def pool_headroom() -> int:
+    """Connections this worker can still check out before requests start waiting."""
+    checked_out = getattr(engine.pool, "checkedout", None)
+    if checked_out is None:
+        return POOL_SIZE + MAX_OVERFLOW
+    return POOL_SIZE + MAX_OVERFLOW - checked_out()
+
+
+def _expected_revision() -> str:
+    """Head revision of the Alembic migration scripts shipped with the app."""
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    return ScriptDirectory.from_config(config).get_current_head()
+
+
+async def check_schema_version():
+    """Fail fast unless the database is migrated to the code's head revision.
+
+    Startup only reads ``alembic_version``; schema changes are applied by
+    ``alembic upgrade head`` before the server starts.
+    """
+    expected = _expected_revision()
+    async with engine.connect() as conn:
+        try:
+            result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+            current = result.scalar_one_or_none()
+        except DBAPIError:
+            current = None
+    
+    if current != expected:
+        raise RuntimeError(
+            f"Database schema is at revision {current or 'none'}, expected {expected}. "
+            "Run `alembic upgrade head` from the backend directory."
+        )
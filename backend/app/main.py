@@ -1,11 +1,37 @@
+import asyncio
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from app.config import get_settings
-from app.database import init_db
-from app.routers import auth, chat, generate, problems, solution, submissions
+from app.database import check_schema_version
+from app.middleware.admission import AdmissionControlMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.redis_client import close_redis
+from app.routers import (
+    auth,
+    chat,
+    generate,
+    leaderboard,
+    llm_usage,
+    problems,
+    recommendations,
+    robotics,
+    solution,
+    stats,
+    submissions,
+)
+from app.services.ai_service import ai_service
+from app.services.arduino_sim import arduino_simulator
+from app.services.health import readiness
+from app.services.hint_ladder import hint_ladders
+from app.services.llm_capture import llm_capture
+from app.services.llm_usage import usage_recorder
+from app.services.similarity import similarity_index
+from app.services.speculation import suggestion_prefetcher
+from app.services.stress_test import stress_tester
 
 settings = get_settings()
 
@@ -13,9 +39,21 @@ settings = get_settings()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    await init_db()
+    await check_schema_version()
+    # Load the AI SDK in the background so the worker can serve right away
+    warmup = asyncio.create_task(asyncio.to_thread(ai_service.warmup))
+    usage_recorder.start()
     yield
     # Shutdown
+    warmup.cancel()
+    suggestion_prefetcher.shutdown()
+    hint_ladders.shutdown()
+    await usage_recorder.stop()
+    llm_capture.close()
+    similarity_index.shutdown()
+    stress_tester.cleanup()
+    arduino_simulator.cleanup()
+    await close_redis()
 
 
 app = FastAPI(
@@ -28,13 +66,27 @@ app = FastAPI(
     openapi_url="/api/openapi.json"
 )
 
-# CORS middleware
+# Shed AI requests with a fast 503 when this worker is saturated
+app.add_middleware(AdmissionControlMiddleware)
+
+# Per-user/IP rate limits and daily AI token quotas, checked before admission
+app.add_middleware(RateLimitMiddleware)
+
+# CORS middleware (added last so it also wraps shed responses)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "Retry-After",
+        "X-RateLimit-Limit",
+        "X-RateLimit-Remaining",
+        "X-RateLimit-Reset",
+        "X-LLM-Tokens-Remaining",
+        "Idempotent-Replayed",
+    ],
 )
 
 # Include routers
@@ -44,13 +96,32 @@ app.include_router(generate.router, prefix="/api/generate")
 app.include_router(problems.router, prefix="/api")
 app.include_router(solution.router, prefix="/api")
 app.include_router(submissions.router, prefix="/api")
+app.include_router(stats.router, prefix="/api")
+app.include_router(leaderboard.router, prefix="/api")
+app.include_router(recommendations.router, prefix="/api")
+app.include_router(llm_usage.router, prefix="/api")
+app.include_router(robotics.router, prefix="/api")
 
 
 @app.get("/api/health")
 async def health_check():
+    """Liveness: the process is up and serving requests."""
     return {"status": "healthy", "version": settings.APP_VERSION}
 
 
+@app.get("/api/ready")
+async def readiness_check():
+    """Readiness: the database, Redis and AI capacity can take more traffic."""
+    ready, checks = await readiness()
+    if not ready:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "unavailable", "checks": checks},
+            headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER)},
+        )
+    return {"status": "ready", "checks": checks}
+
+
 @app.get("/api")
 async def root():
     return {
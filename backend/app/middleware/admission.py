@@ -0,0 +1,97 @@
+import json
+import logging
+from contextlib import contextmanager
+
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Routes whose handlers call the LLM; everything else is never shed
+AI_ROUTES = {
+    ("POST", "/api/chat"),
+    ("POST", "/api/generate/problem"),
+    ("POST", "/api/submissions"),
+    ("POST", "/api/submit-solution"),
+}
+
+
+class AdmissionController:
+    """Caps the number of in-flight LLM requests handled by this worker.
+
+    Requests over the cap are rejected immediately with a 503 instead of
+    queueing behind slow Gemini calls until the proxy times out.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.inflight = 0
+        self.rejected = 0
+
+    @property
+    def saturated(self) -> bool:
+        return self.inflight >= self.limit
+
+    def try_acquire(self) -> bool:
+        if self.saturated:
+            self.rejected += 1
+            return False
+        self.inflight += 1
+        return True
+
+    def release(self):
+        self.inflight -= 1
+
+    @contextmanager
+    def slot(self):
+        """Hold a slot for the duration of the block; yields False when shed."""
+        admitted = self.try_acquire()
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                self.release()
+
+    def stats(self) -> dict:
+        return {"inflight": self.inflight, "limit": self.limit, "rejected": self.rejected}
+
+
+admission = AdmissionController(settings.MAX_INFLIGHT_AI_REQUESTS)
+
+
+class AdmissionControlMiddleware:
+    """ASGI middleware that sheds LLM-bound requests when the worker is full.
+
+    Plain ASGI rather than BaseHTTPMiddleware so the slot is held until the
+    response has been fully sent.
+    """
+
+    def __init__(self, app, controller: AdmissionController = admission):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"].rstrip("/")) not in AI_ROUTES:
+            await self.app(scope, receive, send)
+            return
+
+        with self.controller.slot() as admitted:
+            if admitted:
+                await self.app(scope, receive, send)
+                return
+        logger.warning(f"Shedding {scope['method']} {scope['path']}: {self.controller.inflight} AI requests in flight")
+        await _reject(send)
+
+
+async def _reject(send):
+    body = json.dumps({"detail": "The AI tutor is busy. Please try again shortly."}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(settings.ADMISSION_RETRY_AFTER).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,100 @@
+import json
+import logging
+
+from app.config import get_settings
+from app.middleware.admission import AI_ROUTES
+from app.routers.auth import decode_user_id
+from app.services.rate_limiter import (
+    metered,
+    rate_limiter,
+    route_cost,
+    seconds_until_utc_midnight,
+)
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def client_identity(headers: dict, client) -> str:
+    """``user:<id>`` for a valid bearer token, else ``ip:<address>``."""
+    authorization = headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        user_id = decode_user_id(token)
+        if user_id is not None:
+            return f"user:{user_id}"
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RateLimitMiddleware:
+    """Per-user/IP weighted rate limits and daily LLM-token quotas.
+
+    Every response carries ``X-RateLimit-*`` headers; AI routes also report
+    ``X-LLM-Tokens-Remaining``. Tokens used while handling a request are
+    charged to the caller once the response has been sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        cost = route_cost(scope["method"], scope["path"])
+        if cost == 0:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        identity = client_identity(headers, scope.get("client"))
+        allowed, remaining, reset = await rate_limiter.hit(identity, cost)
+        limit_headers = [
+            (b"x-ratelimit-limit", str(rate_limiter.points_limit(identity)).encode()),
+            (b"x-ratelimit-remaining", str(remaining).encode()),
+            (b"x-ratelimit-reset", str(reset).encode()),
+        ]
+        if not allowed:
+            await _reject(send, "Too many requests. Please slow down.", reset, limit_headers)
+            return
+
+        is_ai_route = (scope["method"], scope["path"].rstrip("/")) in AI_ROUTES
+        if is_ai_route:
+            tokens_left = await rate_limiter.tokens_remaining(identity)
+            if tokens_left <= 0:
+                await _reject(
+                    send,
+                    "Daily AI usage limit reached. Please come back tomorrow.",
+                    seconds_until_utc_midnight(),
+                    limit_headers + [(b"x-llm-tokens-remaining", b"0")],
+                )
+                return
+            limit_headers.append((b"x-llm-tokens-remaining", str(tokens_left).encode()))
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + limit_headers
+            await send(message)
+
+        if not is_ai_route:
+            await self.app(scope, receive, send_with_headers)
+            return
+        with metered(identity, scope["path"]) as meter:
+            try:
+                await self.app(scope, receive, send_with_headers)
+            finally:
+                await rate_limiter.add_tokens(identity, meter.tokens)
+
+
+async def _reject(send, detail: str, retry_after: int, headers: list):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(retry_after).encode()),
+        ] + headers,
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -2,5 +2,12 @@ from app.models.user import User
 from app.models.problem import Problem
 from app.models.submission import Submission
 from app.models.chat_history import ChatHistory
+from app.models.user_stats import UserStats
+from app.models.problem_stats import ProblemStats
+from app.models.user_problem_stats import UserProblemStats
+from app.models.llm_usage import LLMUsage
 
-__all__ = ["User", "Problem", "Submission", "ChatHistory"]
+__all__ = [
+    "User", "Problem", "Submission", "ChatHistory",
+    "UserStats", "ProblemStats", "UserProblemStats", "LLMUsage",
+]
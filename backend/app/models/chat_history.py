@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime
 from typing import Optional, List, Any, TYPE_CHECKING
 from sqlmodel import SQLModel, Field, Relationship
-from sqlalchemy import Column, String, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, String, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.dialects.postgresql import UUID
 
 if TYPE_CHECKING:
@@ -11,6 +11,9 @@ if TYPE_CHECKING:
 
 class ChatHistory(SQLModel, table=True):
     __tablename__ = "chat_histories"
+    __table_args__ = (
+        Index("ix_chat_histories_user_track_updated", "user_id", "track", "updated_at"),
+    )
 
     id: Optional[uuid.UUID] = Field(
         default_factory=uuid.uuid4,
@@ -0,0 +1,65 @@
+import uuid
+from datetime import datetime
+from typing import Optional
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.dialects.postgresql import UUID
+
+
+class LLMUsage(SQLModel, table=True):
+    """One Gemini call: who made it, through which method, and what it cost."""
+    __tablename__ = "llm_usage"
+    __table_args__ = (
+        Index("ix_llm_usage_created", "created_at"),
+        Index("ix_llm_usage_user_created", "user_id", "created_at"),
+    )
+
+    id: Optional[int] = Field(
+        default=None,
+        sa_column=Column(Integer, primary_key=True, autoincrement=True)
+    )
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(DateTime, nullable=False, default=datetime.utcnow)
+    )
+    user_id: Optional[uuid.UUID] = Field(
+        default=None,
+        sa_column=Column(
+            UUID(as_uuid=True),
+            ForeignKey("users.id", ondelete="SET NULL"),
+            nullable=True
+        )
+    )
+    endpoint: Optional[str] = Field(
+        default=None,
+        sa_column=Column(String(100), nullable=True)
+    )
+    method: str = Field(
+        sa_column=Column(String(50), nullable=False)
+    )
+    model: str = Field(
+        sa_column=Column(String(100), nullable=False)
+    )
+    prompt_tokens: int = Field(
+        default=0,
+        sa_column=Column(Integer, nullable=False, default=0)
+    )
+    output_tokens: int = Field(
+        default=0,
+        sa_column=Column(Integer, nullable=False, default=0)
+    )
+    cached_tokens: int = Field(
+        default=0,
+        sa_column=Column(Integer, nullable=False, default=0)
+    )
+    total_tokens: int = Field(
+        default=0,
+        sa_column=Column(Integer, nullable=False, default=0)
+    )
+    latency_ms: int = Field(
+        sa_column=Column(Integer, nullable=False)
+    )
+    success: bool = Field(
+        default=True,
+        sa_column=Column(Boolean, nullable=False, default=True)
+    )
@@ -1,4 +1,5 @@
 from typing import Optional, List, Dict, Any, TYPE_CHECKING
+from uuid import uuid4
 from sqlmodel import SQLModel, Field, Relationship
 from sqlalchemy import Column, String, Text, Integer, JSON
 
@@ -13,6 +14,11 @@ class Problem(SQLModel, table=True):
         default=None,
         sa_column=Column(Integer, primary_key=True, autoincrement=True)
     )
+    # Stable key for catalogue import/export (app/services/catalogue.py)
+    slug: str = Field(
+        default_factory=lambda: uuid4().hex,
+        sa_column=Column(String(100), unique=True, index=True, nullable=False)
+    )
     topic: str = Field(
         sa_column=Column(String(50), index=True, nullable=False)
     )
@@ -48,6 +54,25 @@ class Problem(SQLModel, table=True):
     sample_io: Dict[str, Any] = Field(
         sa_column=Column(JSON, nullable=False)
     )
+    # Optional judge data for randomized stress tests (app/services/stress_test.py)
+    reference_solution: Optional[str] = Field(
+        default=None,
+        sa_column=Column(Text, nullable=True)
+    )
+    stress_spec: Optional[Dict[str, Any]] = Field(
+        default=None,
+        sa_column=Column(JSON, nullable=True)
+    )
+    # Progressively stronger bilingual hints (app/services/hint_ladder.py),
+    # valid while hint_ladder_hash matches the problem's fingerprint
+    hint_ladder: Optional[List[Dict[str, str]]] = Field(
+        default=None,
+        sa_column=Column(JSON, nullable=True)
+    )
+    hint_ladder_hash: Optional[str] = Field(
+        default=None,
+        sa_column=Column(String(64), nullable=True)
+    )
 
     # Relationships
     submissions: List["Submission"] = Relationship(back_populates="problem")
@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import Optional, Dict
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, JSON
+
+
+class ProblemStats(SQLModel, table=True):
+    """Per-problem submission aggregates, maintained on every graded submission."""
+    __tablename__ = "problem_stats"
+
+    problem_id: int = Field(
+        sa_column=Column(
+            Integer,
+            ForeignKey("problems.id", ondelete="CASCADE"),
+            primary_key=True
+        )
+    )
+    attempts: int = Field(
+        default=0,
+        sa_column=Column(Integer, nullable=False, default=0)
+    )
+    accepted: int = Field(
+        default=0,
+        sa_column=Column(Integer, nullable=False, default=0)
+    )
+    attempted_by: int = Field(
+        default=0,
+        sa_column=Column(Integer, nullable=False, default=0)
+    )
+    solved_by: int = Field(
+        default=0,
+        sa_column=Column(Integer, nullable=False, default=0)
+    )
+    status_counts: Dict[str, int] = Field(
+        default_factory=dict,
+        sa_column=Column(JSON, nullable=False, default=dict)
+    )
+    updated_at: Optional[datetime] = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    )
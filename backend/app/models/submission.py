@@ -1,8 +1,8 @@
 import uuid
 from datetime import datetime
-from typing import Optional, TYPE_CHECKING
+from typing import Optional, Dict, Any, TYPE_CHECKING
 from sqlmodel import SQLModel, Field, Relationship
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Integer
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Integer, JSON, Index
 from sqlalchemy.dialects.postgresql import UUID
 
 if TYPE_CHECKING:
@@ -12,6 +12,10 @@ if TYPE_CHECKING:
 
 class Submission(SQLModel, table=True):
     __tablename__ = "submissions"
+    __table_args__ = (
+        Index("ix_submissions_problem_code_hash", "problem_id", "code_hash"),
+        Index("ix_submissions_user_created", "user_id", "created_at"),
+    )
 
     id: Optional[uuid.UUID] = Field(
         default_factory=uuid.uuid4,
@@ -41,6 +45,20 @@ class Submission(SQLModel, table=True):
         default=None,
         sa_column=Column(Text, nullable=True)
     )
+    code_hash: Optional[str] = Field(
+        default=None,
+        sa_column=Column(String(64), nullable=True)
+    )
+    problem_hash: Optional[str] = Field(
+        default=None,
+        sa_column=Column(String(64), nullable=True)
+    )
+    # none_as_null: error verdicts are stored as SQL NULL, not JSON null,
+    # so the verdict cache can skip them
+    grade_result: Optional[Dict[str, Any]] = Field(
+        default=None,
+        sa_column=Column(JSON(none_as_null=True), nullable=True)
+    )
     created_at: Optional[datetime] = Field(
         default_factory=datetime.utcnow,
         sa_column=Column(DateTime, default=datetime.utcnow)
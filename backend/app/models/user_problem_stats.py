@@ -0,0 +1,59 @@
+import uuid
+from datetime import datetime
+from typing import Optional, Dict
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, JSON
+from sqlalchemy.dialects.postgresql import UUID
+
+
+class UserProblemStats(SQLModel, table=True):
+    """A user's progress on a single problem."""
+    __tablename__ = "user_problem_stats"
+
+    user_id: uuid.UUID = Field(
+        sa_column=Column(
+            UUID(as_uuid=True),
+            ForeignKey("users.id", ondelete="CASCADE"),
+            primary_key=True
+        )
+    )
+    problem_id: int = Field(
+        sa_column=Column(
+            Integer,
+            ForeignKey("problems.id", ondelete="CASCADE"),
+            primary_key=True
+        )
+    )
+    attempts: int = Field(
+        default=0,
+        sa_column=Column(Integer, nullable=False, default=0)
+    )
+    accepted: int = Field(
+        default=0,
+        sa_column=Column(Integer, nullable=False, default=0)
+    )
+    status_counts: Dict[str, int] = Field(
+        default_factory=dict,
+        sa_column=Column(JSON, nullable=False, default=dict)
+    )
+    # Failed attempts so far; picks the rung of the problem's hint ladder
+    hint_level: int = Field(
+        default=0,
+        sa_column=Column(Integer, nullable=False, default=0)
+    )
+    last_status: Optional[str] = Field(
+        default=None,
+        sa_column=Column(String(50), nullable=True)
+    )
+    first_attempt_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime, nullable=True)
+    )
+    first_accepted_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime, nullable=True)
+    )
+    last_submitted_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime, nullable=True)
+    )
@@ -0,0 +1,43 @@
+import uuid
+from datetime import datetime
+from typing import Optional, Dict
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, JSON
+from sqlalchemy.dialects.postgresql import UUID
+
+
+class UserStats(SQLModel, table=True):
+    """Per-user submission aggregates, maintained on every graded submission."""
+    __tablename__ = "user_stats"
+
+    user_id: uuid.UUID = Field(
+        sa_column=Column(
+            UUID(as_uuid=True),
+            ForeignKey("users.id", ondelete="CASCADE"),
+            primary_key=True
+        )
+    )
+    attempts: int = Field(
+        default=0,
+        sa_column=Column(Integer, nullable=False, default=0)
+    )
+    accepted: int = Field(
+        default=0,
+        sa_column=Column(Integer, nullable=False, default=0)
+    )
+    solved: int = Field(
+        default=0,
+        sa_column=Column(Integer, nullable=False, default=0)
+    )
+    status_counts: Dict[str, int] = Field(
+        default_factory=dict,
+        sa_column=Column(JSON, nullable=False, default=dict)
+    )
+    topic_solved: Dict[str, int] = Field(
+        default_factory=dict,
+        sa_column=Column(JSON, nullable=False, default=dict)
+    )
+    updated_at: Optional[datetime] = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    )
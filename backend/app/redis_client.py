@@ -0,0 +1,34 @@
+import logging
+from typing import Optional, TYPE_CHECKING
+
+from app.config import get_settings
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_client = None
+
+
+def get_redis() -> Optional["Redis"]:
+    """Return the shared async Redis client, or None when REDIS_URL is unset.
+
+    Callers fall back to in-process state when Redis is not configured.
+    """
+    global _client
+    if not settings.REDIS_URL:
+        return None
+    if _client is None:
+        import redis.asyncio as redis
+
+        _client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _client
+
+
+async def close_redis():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
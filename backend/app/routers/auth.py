@@ -62,6 +62,30 @@ async def get_current_user(
     return user
 
 
+def decode_user_id(token: str) -> UUID | None:
+    """Return the user id carried by a valid access token, else None."""
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        user_id: str = payload.get("sub")
+        if user_id is None:
+            return None
+        return TokenData(user_id=UUID(user_id)).user_id
+    except (JWTError, ValueError):
+        return None
+
+
+async def get_current_admin(
+    current_user: Annotated[User, Depends(get_current_user)]
+) -> User:
+    """Require a logged-in user listed in ADMIN_EMAILS."""
+    if current_user.email not in settings.ADMIN_EMAILS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    return current_user
+
+
 async def get_current_user_optional(
     token: Annotated[str | None, Depends(oauth2_scheme_optional)] = None,
     db: Annotated[AsyncSession, Depends(get_db)] = None
@@ -70,16 +94,11 @@ async def get_current_user_optional(
     if not token:
         return None
     
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            return None
-        token_data = TokenData(user_id=UUID(user_id))
-    except JWTError:
+    user_id = decode_user_id(token)
+    if user_id is None:
         return None
     
-    result = await db.execute(select(User).where(User.id == token_data.user_id))
+    result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalar_one_or_none()
     return user
 
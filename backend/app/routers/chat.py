@@ -1,55 +1,129 @@
-from typing import Annotated
+import asyncio
+import json
+from typing import Annotated, Literal, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+from pydantic import ValidationError
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.config import get_settings
 from app.database import get_db
+from app.middleware.admission import admission
+from app.services.rate_limiter import (
+    CHAT_TURN_COST,
+    metered,
+    rate_limiter,
+    seconds_until_utc_midnight,
+)
 from app.models.chat_history import ChatHistory
-from app.models.problem import Problem
 from app.models.user import User
 from app.routers.auth import get_current_user, get_current_user_optional
-from app.schemas.chat import ChatRequest, ChatResponse
+from app.schemas.chat import ChatRequest, ChatResponse, SpeculationStats
 from app.services.ai_service import ai_service
+from app.services.chat_context import build_problem_context, simulation_context
+from app.services.chat_session import ChatSession
+from app.services.code_context import DiffError, ResolvedCode, StaleCodeBase, code_context_store
+from app.services.idempotency import REPLAY_HEADER, IdempotencyKey, idempotency_key, idempotency_store
+from app.services.speculation import suggestion_prefetcher
 
+settings = get_settings()
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
 
 @router.post("", response_model=ChatResponse)
 async def send_message(
     request: ChatRequest,
+    http_request: Request,
+    response: Response,
     current_user: Annotated[User | None, Depends(get_current_user_optional)],
-    db: Annotated[AsyncSession, Depends(get_db)]
+    db: Annotated[AsyncSession, Depends(get_db)],
+    idempotency: Annotated[Optional[IdempotencyKey], Depends(idempotency_key)]
 ):
-    """Send a message to the AI tutor."""
-    # Handle guest user (no history)
-    if not current_user:
-        # Get problem context if provided
-        problem_context = None
-        if request.problem_id:
-            result = await db.execute(
-                select(Problem).where(Problem.id == request.problem_id)
-            )
-            problem = result.scalar_one_or_none()
-            if problem:
-                problem_context = f"Title: {problem.title_en}\n{problem.desc_en}"
-        
-        # Get AI response without history
+    """Send a message to the AI tutor.
+
+    Repeats with the same ``Idempotency-Key`` get the first reply and are
+    not added to the history again.
+    """
+    if current_user:
+        identity = f"user:{current_user.id}"
+    else:
+        identity = f"ip:{http_request.client.host if http_request.client else 'unknown'}"
+    result, replayed = await idempotency_store.run(
+        idempotency,
+        request,
+        lambda: _send_message(request, identity, current_user, db),
+        replayable=lambda result: not result["error"]
+    )
+    if replayed:
+        response.headers[REPLAY_HEADER] = "true"
+    return result
+
+
+async def _resolve_code(request: ChatRequest, identity: str) -> tuple[ChatRequest, ResolvedCode]:
+    """*request* with its full code_context, applying a code_diff if one was sent."""
+    try:
+        resolved = await code_context_store.resolve(
+            identity, request.track, request.code_context, request.code_diff, request.code_base
+        )
+    except StaleCodeBase:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="code_base is not the last code sent in this chat; resend the full code_context"
+        )
+    except DiffError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"code_diff does not apply: {e}"
+        )
+    update = {"code_context": resolved.code, "code_diff": None, "code_base": None}
+    return request.model_copy(update=update), resolved
+
+
+async def _tutor_reply(
+    request: ChatRequest,
+    identity: str,
+    history: list,
+    db: AsyncSession
+) -> dict:
+    """The tutor's answer; clicked suggestions may already be answered."""
+    response = await suggestion_prefetcher.take(identity, request)
+    simulation = None
+    if response is None:
+        simulation = await simulation_context(request)
         response = await ai_service.chat(
             track=request.track,
             message=request.message,
-            history=[],
-            problem_context=problem_context,
+            history=history,
+            problem_context=await build_problem_context(request, db),
             code_context=request.code_context,
-            project_context=request.project_context
+            project_context=request.project_context,
+            simulation_context=simulation
         )
+    suggestion_prefetcher.schedule(identity, request, response.get("suggestions", []), simulation)
+    return response
+
+
+async def _send_message(
+    request: ChatRequest,
+    identity: str,
+    current_user: User | None,
+    db: AsyncSession
+) -> ChatResponse:
+    request, code = await _resolve_code(request, identity)
+    
+    # Handle guest user (no history)
+    if not current_user:
+        response = await _tutor_reply(request, identity, [], db)
         
         return ChatResponse(
             message=response["message"],
             message_ar=response["message_ar"],
             code_snippet=response.get("code_snippet"),
-            suggestions=response.get("suggestions", [])
+            suggestions=response.get("suggestions", []),
+            code_version=code.version,
+            error=response.get("error", False)
         )
 
     # Authenticated user logic
@@ -70,25 +144,8 @@ async def send_message(
         )
         db.add(chat_history)
     
-    # Get problem context if provided
-    problem_context = None
-    if request.problem_id:
-        result = await db.execute(
-            select(Problem).where(Problem.id == request.problem_id)
-        )
-        problem = result.scalar_one_or_none()
-        if problem:
-            problem_context = f"Title: {problem.title_en}\n{problem.desc_en}"
-    
     # Get AI response
-    response = await ai_service.chat(
-        track=request.track,
-        message=request.message,
-        history=chat_history.messages,
-        problem_context=problem_context,
-        code_context=request.code_context,
-        project_context=request.project_context
-    )
+    response = await _tutor_reply(request, identity, chat_history.messages, db)
     
     # Update chat history
     messages = list(chat_history.messages)
@@ -102,10 +159,127 @@ async def send_message(
         message=response["message"],
         message_ar=response["message_ar"],
         code_snippet=response.get("code_snippet"),
-        suggestions=response.get("suggestions", [])
+        suggestions=response.get("suggestions", []),
+        code_version=code.version,
+        error=response.get("error", False)
     )
 
 
+async def _turn_rejection(identity: str) -> Optional[dict]:
+    """Why a chat turn over the socket may not run now, or None if it may."""
+    if await rate_limiter.tokens_remaining(identity) <= 0:
+        return {
+            "detail": "Daily AI usage limit reached. Please come back tomorrow.",
+            "retry_after": seconds_until_utc_midnight(),
+        }
+    allowed, _, reset = await rate_limiter.hit(identity, CHAT_TURN_COST)
+    if not allowed:
+        return {"detail": "Too many requests. Please slow down.", "retry_after": reset}
+    return None
+
+
+async def _speculated_events(answer: dict):
+    """A speculated answer as chat_stream events: all of it in one delta."""
+    yield {"type": "delta", "text": answer["message_ar"]}
+    yield {"type": "final", **answer}
+
+
+@router.websocket("/ws")
+async def chat_socket(
+    websocket: WebSocket,
+    track: Literal["problem_solving", "robotics"] = Query("problem_solving"),
+    token: str | None = Query(None, description="Access token; omit to chat as a guest")
+):
+    """Streaming chat over a WebSocket.
+
+    The client sends ChatRequest-shaped JSON objects (``track`` is fixed by
+    the connection; code may be sent as ``code_diff`` like over HTTP). For each one the server streams ``{"type": "delta"}``
+    events with the Arabic answer, then one ``{"type": "message"}`` event
+    shaped like ChatResponse.
+    """
+    await websocket.accept()
+    session = await ChatSession.open(token, track)
+    if session.user is not None:
+        identity = f"user:{session.user.id}"
+    else:
+        identity = f"ip:{websocket.client.host if websocket.client else 'unknown'}"
+    await websocket.send_json({"type": "ready", "authenticated": session.user is not None})
+    
+    try:
+        while True:
+            payload = await websocket.receive_text()
+            try:
+                request = ChatRequest(**{**json.loads(payload), "track": track})
+            except (ValidationError, TypeError, ValueError) as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+            try:
+                request, code = await _resolve_code(request, identity)
+            except HTTPException as e:
+                await websocket.send_json({"type": "error", "status": e.status_code, "detail": e.detail})
+                continue
+            
+            rejection = await _turn_rejection(identity)
+            if rejection:
+                await websocket.send_json({"type": "error", **rejection})
+                continue
+            
+            with admission.slot() as admitted, metered(identity, "/api/chat/ws") as meter:
+                if not admitted:
+                    await websocket.send_json({
+                        "type": "error",
+                        "detail": "The AI tutor is busy. Please try again shortly.",
+                        "retry_after": settings.ADMISSION_RETRY_AFTER,
+                    })
+                    continue
+                
+                speculated = await suggestion_prefetcher.take(identity, request)
+                if speculated is not None:
+                    events = _speculated_events(speculated)
+                    simulation = None
+                else:
+                    simulation = await simulation_context(request)
+                    events = ai_service.chat_stream(
+                        track=request.track,
+                        message=request.message,
+                        history=session.history,
+                        problem_context=await session.problem_context(request),
+                        code_context=request.code_context,
+                        project_context=request.project_context,
+                        simulation_context=simulation
+                    )
+                async for event in events:
+                    if event["type"] == "delta":
+                        await websocket.send_json(event)
+                        continue
+                    
+                    session.record_turn(request.message, event["message"])
+                    suggestion_prefetcher.schedule(
+                        identity, request, event.get("suggestions", []), simulation
+                    )
+                    response = ChatResponse(
+                        message=event["message"],
+                        message_ar=event["message_ar"],
+                        code_snippet=event.get("code_snippet"),
+                        suggestions=event.get("suggestions", []),
+                        code_version=code.version,
+                        error=event.get("error", False)
+                    )
+                    await websocket.send_json({"type": "message", **response.model_dump()})
+                await rate_limiter.add_tokens(identity, meter.tokens)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # Shielded so buffered messages are still saved if the task is cancelled
+        await asyncio.shield(session.close())
+
+
+@router.get("/speculation-stats", response_model=SpeculationStats)
+async def get_speculation_stats():
+    """How often clicked suggestions were answered ahead of time, in this worker."""
+    return suggestion_prefetcher.stats()
+
+
 @router.delete("/history")
 async def clear_chat_history(
     track: str,
@@ -1,18 +1,74 @@
-from fastapi import APIRouter, HTTPException, status
+from typing import Annotated, Optional
 
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import func
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import get_db
+from app.models.problem import Problem
 from app.schemas.generate import GenerateProblemRequest, GeneratedProblemResponse
 from app.services.ai_service import ai_service
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.idempotency import REPLAY_HEADER, IdempotencyKey, idempotency_key, idempotency_store
 
 router = APIRouter(tags=["Problems"])
 
 
+async def _pool_problem(
+    db: AsyncSession, request: GenerateProblemRequest
+) -> Optional[GeneratedProblemResponse]:
+    """A random stored problem, closest match first, served while Gemini is down."""
+    for conditions in (
+        [Problem.topic == request.topic, Problem.difficulty == request.difficulty],
+        [Problem.topic == request.topic],
+        [Problem.difficulty == request.difficulty],
+    ):
+        result = await db.execute(
+            select(Problem).where(*conditions).order_by(func.random()).limit(1)
+        )
+        problem = result.scalar_one_or_none()
+        if problem:
+            return GeneratedProblemResponse(
+                title_en=problem.title_en,
+                title_ar=problem.title_ar or "",
+                topic=problem.topic,
+                difficulty=problem.difficulty,
+                desc_en=problem.desc_en,
+                desc_ar=problem.desc_ar or "",
+                constraints=problem.constraints or "",
+                input_format=problem.input_format or "",
+                output_format=problem.output_format or "",
+                sample_io=problem.sample_io or [],
+            )
+    return None
+
+
 @router.post("/problem", response_model=GeneratedProblemResponse)
-async def generate_problem(request: GenerateProblemRequest):
+async def generate_problem(
+    request: GenerateProblemRequest,
+    response: Response,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    idempotency: Annotated[Optional[IdempotencyKey], Depends(idempotency_key)]
+):
     """Generate a coding problem dynamically using Google Gemini.
 
     Accepts any topic (e.g. "Arrays", "Strings", "Dynamic Programming")
-    and a difficulty level ("Easy", "Medium", "Hard").
+    and a difficulty level ("Easy", "Medium", "Hard"). While the AI is
+    unavailable, a matching problem from the stored pool is returned.
+    Repeats with the same ``Idempotency-Key`` get the same problem.
     """
+    result, replayed = await idempotency_store.run(
+        idempotency, request, lambda: _generate_problem(request, db)
+    )
+    if replayed:
+        response.headers[REPLAY_HEADER] = "true"
+    return result
+
+
+async def _generate_problem(
+    request: GenerateProblemRequest, db: AsyncSession
+) -> GeneratedProblemResponse:
     try:
         result = await ai_service.generate_problem(
             topic=request.topic,
@@ -41,6 +97,15 @@ async def generate_problem(request: GenerateProblemRequest):
             sample_io=sample_io,
             starter_code=result.get("starter_code", ""),
         )
+    except CircuitOpenError as e:
+        problem = await _pool_problem(db, request)
+        if problem is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"AI service error: {str(e)}",
+                headers={"Retry-After": str(int(e.retry_after) or 1)},
+            )
+        return problem
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
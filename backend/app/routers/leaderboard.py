@@ -0,0 +1,81 @@
+from typing import Annotated, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Query
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import get_db
+from app.models.user import User
+from app.routers.auth import get_current_admin, get_current_user
+from app.schemas.leaderboard import (
+    LeaderboardEntry,
+    LeaderboardPage,
+    LeaderboardRank,
+    RebuildLeaderboardResponse,
+)
+from app.services.leaderboard import global_board, topic_board, leaderboard_service
+
+router = APIRouter(prefix="/leaderboard", tags=["Leaderboard"])
+
+
+def _board(topic: Optional[str]) -> str:
+    return topic_board(topic) if topic else global_board()
+
+
+@router.get("", response_model=LeaderboardPage)
+async def get_leaderboard(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    topic: Optional[str] = Query(None, description="Rank within a single topic"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """Top users by points, global or per topic."""
+    board = _board(topic)
+    rows, total = await leaderboard_service.top(board, skip, limit)
+    
+    user_ids = [UUID(member) for member, _ in rows]
+    usernames = {}
+    if user_ids:
+        result = await db.execute(
+            select(User.id, User.username).where(User.id.in_(user_ids))
+        )
+        usernames = {str(user_id): username for user_id, username in result.all()}
+    
+    return LeaderboardPage(
+        board=board,
+        total=total,
+        entries=[
+            LeaderboardEntry(
+                rank=skip + i + 1,
+                user_id=member,
+                username=usernames.get(member),
+                score=score
+            )
+            for i, (member, score) in enumerate(rows)
+        ]
+    )
+
+
+@router.get("/me", response_model=LeaderboardRank)
+async def get_my_rank(
+    current_user: Annotated[User, Depends(get_current_user)],
+    topic: Optional[str] = Query(None, description="Rank within a single topic")
+):
+    """The current user's rank and score."""
+    board = _board(topic)
+    found = await leaderboard_service.rank(board, current_user.id)
+    if found is None:
+        return LeaderboardRank(board=board, rank=None, score=0)
+    rank, score = found
+    return LeaderboardRank(board=board, rank=rank + 1, score=score)
+
+
+@router.post("/rebuild", response_model=RebuildLeaderboardResponse)
+async def rebuild_leaderboard(
+    _admin: Annotated[User, Depends(get_current_admin)],
+    db: Annotated[AsyncSession, Depends(get_db)]
+):
+    """Recompute every board from Postgres."""
+    solves = await leaderboard_service.rebuild(db)
+    return RebuildLeaderboardResponse(solves=solves)
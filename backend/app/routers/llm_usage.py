@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta
+from typing import Annotated, Literal
+
+from fastapi import APIRouter, Depends, Query
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import get_db
+from app.models.user import User
+from app.routers.auth import get_current_admin
+from app.schemas.llm_usage import LLMUsageReport
+from app.services.llm_usage import rollup, usage_recorder
+
+router = APIRouter(prefix="/llm-usage", tags=["LLM Usage"])
+
+
+@router.get("", response_model=LLMUsageReport)
+async def get_llm_usage(
+    _admin: Annotated[User, Depends(get_current_admin)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    group_by: Literal["method", "model", "endpoint", "user", "day"] = "method",
+    days: int = Query(7, ge=1, le=365)
+):
+    """Gemini calls, tokens, latency and estimated cost, grouped by *group_by*."""
+    since = datetime.utcnow() - timedelta(days=days)
+    rows = await rollup(db, group_by, since)
+    return LLMUsageReport(
+        group_by=group_by,
+        since=since,
+        rows=rows,
+        pending=usage_recorder.pending
+    )
@@ -1,16 +1,31 @@
+from dataclasses import asdict
 from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from sqlmodel import select
 from sqlalchemy import func
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.database import get_db
 from app.models.problem import Problem
-from app.schemas.problem import ProblemCreate, ProblemResponse, ProblemListResponse
+from app.models.user import User
+from app.routers.auth import get_current_admin
+from app.schemas.problem import (
+    ProblemCreate,
+    ProblemResponse,
+    ProblemListResponse,
+    CatalogueImportResult,
+    ImportReject,
+)
+from app.services.catalogue import MAX_BATCH_SIZE, export_stream, import_lines, iter_lines
+from app.services.stress_test import SpecError, validate_spec
 
 router = APIRouter(prefix="/problems", tags=["Problems"])
 
+# Rejected lines listed in an import response; the CLI writes all of them
+IMPORT_REJECTS_RETURNED = 100
+
 
 @router.get("", response_model=ProblemListResponse)
 async def list_problems(
@@ -42,6 +57,40 @@ async def list_problems(
     return ProblemListResponse(problems=problems, total=total)
 
 
+@router.get("/export")
+async def export_problems(
+    _admin: Annotated[User, Depends(get_current_admin)]
+):
+    """The whole catalogue as JSONL, one problem per line, streamed."""
+    return StreamingResponse(
+        export_stream(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="problems.jsonl"'}
+    )
+
+
+@router.post("/import", response_model=CatalogueImportResult)
+async def import_problems(
+    request: Request,
+    _admin: Annotated[User, Depends(get_current_admin)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    batch_size: Optional[int] = Query(None, ge=1, le=MAX_BATCH_SIZE)
+):
+    """Upsert problems by slug from a JSONL request body, as the export writes it.
+
+    The body is processed as it arrives. Invalid lines are skipped and
+    reported; the others are written even if some are rejected.
+    """
+    rejects = []
+
+    async def keep_reject(line_no: int, error: str, _text: str):
+        if len(rejects) < IMPORT_REJECTS_RETURNED:
+            rejects.append(ImportReject(line=line_no, error=error))
+
+    result = await import_lines(db, iter_lines(request.stream()), batch_size, keep_reject)
+    return CatalogueImportResult(**asdict(result), rejects=rejects)
+
+
 @router.get("/{problem_id}", response_model=ProblemResponse)
 async def get_problem(
     problem_id: int,
@@ -62,8 +111,24 @@ async def get_problem(
 @router.post("", response_model=ProblemResponse, status_code=status.HTTP_201_CREATED)
 async def create_problem(
     problem_data: ProblemCreate,
+    _admin: Annotated[User, Depends(get_current_admin)],
     db: Annotated[AsyncSession, Depends(get_db)]
 ):
+    if problem_data.stress_spec is not None:
+        try:
+            validate_spec(problem_data.stress_spec)
+        except SpecError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+    if problem_data.slug is not None:
+        result = await db.execute(select(Problem.id).where(Problem.slug == problem_data.slug))
+        if result.scalar_one_or_none() is not None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A problem with this slug already exists"
+            )
     problem = Problem(
         topic=problem_data.topic,
         difficulty=problem_data.difficulty,
@@ -74,8 +139,12 @@ async def create_problem(
         constraints=problem_data.constraints,
         input_format=problem_data.input_format,
         output_format=problem_data.output_format,
-        sample_io=[io.model_dump() for io in problem_data.sample_io]
+        sample_io=[io.model_dump() for io in problem_data.sample_io],
+        reference_solution=problem_data.reference_solution,
+        stress_spec=problem_data.stress_spec,
     )
+    if problem_data.slug is not None:
+        problem.slug = problem_data.slug
     db.add(problem)
     await db.commit()
     await db.refresh(problem)
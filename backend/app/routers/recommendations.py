@@ -0,0 +1,50 @@
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import get_db
+from app.models.problem import Problem
+from app.models.user import User
+from app.routers.auth import get_current_user_optional
+from app.schemas.problem import RecommendedProblem
+from app.services.recommender import recommender
+
+router = APIRouter(prefix="/recommendations", tags=["Problems"])
+
+
+@router.get("/next", response_model=list[RecommendedProblem])
+async def next_problems(
+    current_user: Annotated[User | None, Depends(get_current_user_optional)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    topic: Optional[str] = Query(None, description="Only recommend from this topic"),
+    k: int = Query(3, ge=1, le=20)
+):
+    """Suggest the next problems to solve, best first.
+
+    Guests get the problems best suited to a beginner.
+    """
+    ranked = await recommender.recommend(
+        db, current_user.id if current_user else None, k=k, topic=topic
+    )
+    if not ranked:
+        return []
+    
+    result = await db.execute(
+        select(Problem).where(Problem.id.in_([problem_id for problem_id, _ in ranked]))
+    )
+    problems = {problem.id: problem for problem in result.scalars().all()}
+    
+    return [
+        RecommendedProblem(
+            id=problem.id,
+            topic=problem.topic,
+            difficulty=problem.difficulty,
+            title_en=problem.title_en,
+            title_ar=problem.title_ar,
+            score=score
+        )
+        for problem_id, score in ranked
+        if (problem := problems.get(problem_id))
+    ]
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, HTTPException, status
+
+from app.config import get_settings
+from app.schemas.robotics import SimulateRequest, SimulateResponse
+from app.services.arduino_sim import MAX_TRACE_EVENTS, arduino_simulator, check_expectations
+
+settings = get_settings()
+router = APIRouter(prefix="/robotics", tags=["Robotics"])
+
+
+@router.post("/simulate", response_model=SimulateResponse)
+async def simulate_sketch(request: SimulateRequest):
+    """Run an Arduino sketch on virtual time and return its pin/Serial trace.
+
+    With ``expected``, the trace is also checked against the exercise's
+    expectations.
+    """
+    if not settings.ARDUINO_SIM_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The Arduino simulator is not enabled on this server"
+        )
+    result = await arduino_simulator.run(
+        request.code,
+        request.seconds,
+        [item.model_dump() for item in request.inputs]
+    )
+    failures = (
+        check_expectations(result, request.expected.model_dump(exclude_none=True))
+        if request.expected else []
+    )
+    return SimulateResponse(
+        status=result.status,
+        simulated_ms=result.simulated_ms,
+        loops=result.loops,
+        summary=result.summary(),
+        events=result.events()[:MAX_TRACE_EVENTS],
+        passed=not failures if request.expected else None,
+        failures=failures
+    )
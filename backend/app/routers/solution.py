@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, status
 
 from app.schemas.solution import SubmitSolutionRequest, SolutionFeedbackResponse
 from app.services.ai_service import ai_service
+from app.services.circuit_breaker import CircuitOpenError
 
 router = APIRouter(tags=["Solutions"])
 
@@ -19,6 +20,12 @@ async def submit_solution(request: SubmitSolutionRequest):
             user_code=request.user_code,
         )
         return SolutionFeedbackResponse(feedback=result)
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"AI service error: {str(e)}",
+            headers={"Retry-After": str(int(e.retry_after) or 1)},
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
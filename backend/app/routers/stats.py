@@ -0,0 +1,125 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+from sqlmodel import select
+from sqlalchemy import func
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import get_db
+from app.models.problem import Problem
+from app.models.problem_stats import ProblemStats
+from app.models.user import User
+from app.models.user_problem_stats import UserProblemStats
+from app.models.user_stats import UserStats
+from app.routers.auth import get_current_admin, get_current_user
+from app.schemas.stats import (
+    UserStatsResponse,
+    ProblemStatsResponse,
+    UserProblemStatsResponse,
+    TopicMastery,
+    RebuildStatsResponse,
+)
+from app.services.stats_service import stats_service
+
+router = APIRouter(prefix="/stats", tags=["Stats"])
+
+
+def _rate(accepted: int, attempts: int) -> float:
+    return accepted / attempts if attempts else 0.0
+
+
+@router.get("/me", response_model=UserStatsResponse)
+async def get_my_stats(
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)]
+):
+    """Overall progress of the current user."""
+    stats = await db.get(UserStats, current_user.id) or UserStats(user_id=current_user.id)
+    return UserStatsResponse(
+        user_id=stats.user_id,
+        attempts=stats.attempts,
+        accepted=stats.accepted,
+        solved=stats.solved,
+        acceptance_rate=_rate(stats.accepted, stats.attempts),
+        status_counts=stats.status_counts
+    )
+
+
+@router.get("/me/problems/{problem_id}", response_model=UserProblemStatsResponse)
+async def get_my_problem_stats(
+    problem_id: int,
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)]
+):
+    """The current user's progress on one problem."""
+    progress = await db.get(UserProblemStats, (current_user.id, problem_id))
+    if not progress:
+        progress = UserProblemStats(user_id=current_user.id, problem_id=problem_id)
+    
+    seconds_to_first_accept = None
+    if progress.first_accepted_at and progress.first_attempt_at:
+        seconds_to_first_accept = (
+            progress.first_accepted_at - progress.first_attempt_at
+        ).total_seconds()
+    
+    return UserProblemStatsResponse(
+        problem_id=problem_id,
+        attempts=progress.attempts,
+        accepted=progress.accepted,
+        status_counts=progress.status_counts,
+        last_status=progress.last_status,
+        first_attempt_at=progress.first_attempt_at,
+        first_accepted_at=progress.first_accepted_at,
+        seconds_to_first_accept=seconds_to_first_accept
+    )
+
+
+@router.get("/me/topics", response_model=list[TopicMastery])
+async def get_my_topic_mastery(
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)]
+):
+    """Share of each topic's problems the current user has solved."""
+    stats = await db.get(UserStats, current_user.id)
+    topic_solved = stats.topic_solved if stats else {}
+    
+    result = await db.execute(
+        select(Problem.topic, func.count()).group_by(Problem.topic)
+    )
+    return [
+        TopicMastery(
+            topic=topic,
+            solved=topic_solved.get(topic, 0),
+            total=total,
+            mastery=_rate(topic_solved.get(topic, 0), total)
+        )
+        for topic, total in result.all()
+    ]
+
+
+@router.get("/problems/{problem_id}", response_model=ProblemStatsResponse)
+async def get_problem_stats(
+    problem_id: int,
+    db: Annotated[AsyncSession, Depends(get_db)]
+):
+    """Aggregate results for a problem across all users."""
+    stats = await db.get(ProblemStats, problem_id) or ProblemStats(problem_id=problem_id)
+    return ProblemStatsResponse(
+        problem_id=problem_id,
+        attempts=stats.attempts,
+        accepted=stats.accepted,
+        attempted_by=stats.attempted_by,
+        solved_by=stats.solved_by,
+        acceptance_rate=_rate(stats.accepted, stats.attempts),
+        status_counts=stats.status_counts
+    )
+
+
+@router.post("/rebuild", response_model=RebuildStatsResponse)
+async def rebuild_stats(
+    _admin: Annotated[User, Depends(get_current_admin)],
+    db: Annotated[AsyncSession, Depends(get_db)]
+):
+    """Recompute all aggregates from the submissions table."""
+    replayed = await stats_service.rebuild(db)
+    return RebuildStatsResponse(replayed=replayed)
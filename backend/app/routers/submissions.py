@@ -1,8 +1,8 @@
-from typing import Annotated
+from typing import Annotated, Optional
 import uuid
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
@@ -10,9 +10,27 @@ from app.database import get_db
 from app.models.problem import Problem
 from app.models.submission import Submission
 from app.models.user import User
-from app.routers.auth import get_current_user, get_current_user_optional
-from app.schemas.submission import SubmissionCreate, SubmissionResponse, GradeResponse
+from app.routers.auth import get_current_admin, get_current_user, get_current_user_optional
+from app.schemas.submission import (
+    SubmissionCreate,
+    SubmissionResponse,
+    GradeResponse,
+    VerdictCacheStats,
+    DiagnosticCacheStats,
+    SimilarSubmission,
+    SimilarityPair,
+    SimilarityReport,
+)
 from app.services.ai_service import ai_service
+from app.services.diagnostic_cache import explanation_cache
+from app.services.hint_ladder import hint_ladders
+from app.services.idempotency import REPLAY_HEADER, IdempotencyKey, idempotency_key, idempotency_store
+from app.services.leaderboard import leaderboard_service
+from app.services.recommender import recommender
+from app.services.similarity import similarity_index
+from app.services.stats_service import HINTED_STATUSES, stats_service
+from app.services.stress_test import stress_tester
+from app.services.verdict_cache import verdict_cache, code_fingerprint, problem_fingerprint
 
 router = APIRouter(prefix="/submissions", tags=["Submissions"])
 
@@ -20,14 +38,37 @@ router = APIRouter(prefix="/submissions", tags=["Submissions"])
 @router.post("", response_model=GradeResponse, status_code=status.HTTP_201_CREATED)
 async def submit_code(
     submission_data: SubmissionCreate,
+    response: Response,
     current_user: Annotated[User | None, Depends(get_current_user_optional)],
-    db: Annotated[AsyncSession, Depends(get_db)]
+    db: Annotated[AsyncSession, Depends(get_db)],
+    idempotency: Annotated[Optional[IdempotencyKey], Depends(idempotency_key)]
 ):
-    """Submit code for grading."""
+    """Submit code for grading.
+
+    Repeats with the same ``Idempotency-Key`` get the first response
+    without grading or saving the submission again.
+    """
+    result, replayed = await idempotency_store.run(
+        idempotency,
+        submission_data,
+        lambda: _grade_submission(submission_data, current_user, db),
+        replayable=lambda result: not result["error"]
+    )
+    if replayed:
+        response.headers[REPLAY_HEADER] = "true"
+    return result
+
+
+async def _grade_submission(
+    submission_data: SubmissionCreate,
+    current_user: User | None,
+    db: AsyncSession
+) -> GradeResponse:
     problem = None
     problem_desc = submission_data.problem_description
     constraints = submission_data.problem_constraints
     sample_io = submission_data.problem_sample_io or []
+    input_format = output_format = None
     
     # If problem_id is provided, fetch from DB
     if submission_data.problem_id:
@@ -40,6 +81,8 @@ async def submit_code(
             problem_desc = problem.desc_en
             constraints = problem.constraints
             sample_io = problem.sample_io
+            input_format = problem.input_format
+            output_format = problem.output_format
     
     # If we still don't have a description (invalid problem_id AND no dynamic description)
     if not problem_desc:
@@ -54,29 +97,97 @@ async def submit_code(
                 detail="Either problem_id or problem_description must be provided"
             )
     
+    # Reuse the verdict of an identical earlier submission to a DB problem
+    grade_result = None
+    code_hash = problem_hash = None
+    if problem:
+        code_hash = code_fingerprint(submission_data.code)
+        problem_hash = problem_fingerprint(problem)
+        grade_result = await verdict_cache.lookup(db, problem.id, code_hash, problem_hash)
+    cached = grade_result is not None
+
+    # Failed attempts get a rung of the problem's stored hint ladder rather
+    # than a fresh model hint; a missing or stale ladder is built meanwhile
+    ladder = None
+    if problem:
+        ladder = hint_ladders.current(problem)
+        if ladder is None:
+            hint_ladders.ensure(problem)
+
+    # Randomized tests against the reference solution catch wrong answers
+    # with a concrete failing input; a passing run is evidence for the grader
+    test_report = None
+    if grade_result is None and problem:
+        stress = await stress_tester.run(
+            submission_data.code, problem.reference_solution, problem.stress_spec
+        )
+        if stress.status == "failed":
+            grade_result = stress.verdict()
+        test_report = stress.summary() or None
+
     # Grade the code using AI
-    grade_result = await ai_service.grade_code(
-        code=submission_data.code,
-        problem_desc=problem_desc,
-        constraints=constraints,
-        sample_io=sample_io
-    )
+    hint_suppressed = False
+    if grade_result is None:
+        hint_suppressed = ladder is not None
+        grade_result = await ai_service.grade_code(
+            code=submission_data.code,
+            problem_desc=problem_desc,
+            constraints=constraints,
+            sample_io=sample_io,
+            input_format=input_format,
+            output_format=output_format,
+            problem_id=problem.id if problem else None,
+            test_report=test_report,
+            hint=ladder is None,
+        )
     
     submission_id = uuid.uuid4()
+    hint, hint_ar = grade_result.get("hint"), None
+    hint_level = 1  # Guests always get the first rung
+    # Grading itself failed: not an attempt, so it is kept out of
+    # the history, stats, leaderboard, recommendations and hint ladder
+    failed_to_grade = bool(grade_result.get("error"))
     
     # Save submission ONLY if we have a valid DB problem AND a logged-in user
-    if problem and current_user:
+    if problem and current_user and not failed_to_grade:
         submission = Submission(
             user_id=current_user.id,
             problem_id=problem.id,
             code=submission_data.code,
             status=grade_result["status"],
-            ai_feedback=grade_result["feedback_ar"]
+            ai_feedback=grade_result["feedback_ar"],
+            code_hash=code_hash,
+            problem_hash=problem_hash,
+            # A failure graded without a hint would replay hintless once the
+            # ladder goes stale, so only verdicts that carry their own hint are reused
+            grade_result=None if hint_suppressed and not grade_result["is_correct"] else grade_result
         )
         db.add(submission)
+        await db.flush()
+        progress = await stats_service.record_submission(db, submission, problem)
+        hint_level = progress.hint_level
         await db.commit()
         await db.refresh(submission)
         submission_id = submission.id
+        similarity_index.add(problem.id, submission.id, current_user.id, submission.code)
+        await recommender.observe(current_user.id, problem.id, submission.status)
+        
+        if submission.status == "ACCEPTED" and progress.accepted == 1:
+            await leaderboard_service.record_solve(
+                current_user.id, problem.topic, problem.difficulty
+            )
+
+    # Ladder rungs replace the hint of counted failures; any other failure
+    # left without a hint (e.g. a SYNTAX_ERROR judged by the model) gets the
+    # student's current rung
+    if (
+        ladder
+        and not failed_to_grade
+        and not grade_result["is_correct"]
+        and (grade_result["status"] in HINTED_STATUSES or not hint)
+    ):
+        rung = hint_ladders.rung(ladder, hint_level)
+        hint, hint_ar = rung["en"], rung["ar"]
     
     return GradeResponse(
         submission_id=submission_id,
@@ -84,10 +195,29 @@ async def submit_code(
         is_correct=grade_result["is_correct"],
         feedback_en=grade_result["feedback_en"],
         feedback_ar=grade_result["feedback_ar"],
-        hint=grade_result.get("hint")
+        hint=hint,
+        hint_ar=hint_ar,
+        cached=cached,
+        error=failed_to_grade
     )
 
 
+@router.get("/cache-stats", response_model=VerdictCacheStats)
+async def get_verdict_cache_stats(
+    _admin: Annotated[User, Depends(get_current_admin)]
+):
+    """Hit rate of verdict reuse for resubmitted code, across all workers."""
+    return await verdict_cache.stats()
+
+
+@router.get("/diagnostic-cache-stats", response_model=DiagnosticCacheStats)
+async def get_diagnostic_cache_stats(
+    _admin: Annotated[User, Depends(get_current_admin)]
+):
+    """Hit rate of cached compile-error explanations in this worker."""
+    return explanation_cache.stats()
+
+
 @router.get("", response_model=list[SubmissionResponse])
 async def list_my_submissions(
     current_user: Annotated[User, Depends(get_current_user)],
@@ -106,6 +236,58 @@ async def list_my_submissions(
     return result.scalars().all()
 
 
+@router.get("/similarity-report/{problem_id}", response_model=SimilarityReport)
+async def get_similarity_report(
+    problem_id: int,
+    _admin: Annotated[User, Depends(get_current_admin)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    threshold: float = Query(0.8, ge=0.0, le=1.0)
+):
+    """Pairs of submissions by different users that look copied."""
+    total, pairs = await similarity_index.report(db, problem_id, threshold)
+    return SimilarityReport(
+        problem_id=problem_id,
+        submissions=total,
+        threshold=threshold,
+        pairs=[
+            SimilarityPair(
+                submission_a=a_id,
+                user_a=a_user,
+                submission_b=b_id,
+                user_b=b_user,
+                similarity=score
+            )
+            for a_id, a_user, b_id, b_user, score in pairs
+        ]
+    )
+
+
+@router.get("/{submission_id}/similar", response_model=list[SimilarSubmission])
+async def get_similar_submissions(
+    submission_id: UUID,
+    _admin: Annotated[User, Depends(get_current_admin)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    k: int = Query(5, ge=1, le=50)
+):
+    """Top-k submissions by other users most similar to this one."""
+    result = await db.execute(
+        select(Submission.problem_id).where(Submission.id == submission_id)
+    )
+    problem_id = result.scalar_one_or_none()
+    
+    if problem_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Submission not found"
+        )
+    
+    matches = await similarity_index.most_similar(db, problem_id, submission_id, k)
+    return [
+        SimilarSubmission(submission_id=other_id, user_id=user_id, similarity=score)
+        for other_id, user_id, score in matches
+    ]
+
+
 @router.get("/{submission_id}", response_model=SubmissionResponse)
 async def get_submission(
     submission_id: UUID,
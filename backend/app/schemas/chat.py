@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 from typing import Literal, Optional
 from uuid import UUID
 
@@ -13,11 +13,35 @@ class ChatRequest(BaseModel):
     message: str
     problem_id: Optional[int] = None  # For context in problem solving
     code_context: Optional[str] = None  # Current code being worked on
+    code_diff: Optional[str] = None  # Or: unified diff of it against code_base
+    code_base: Optional[str] = None  # code_version of a previous reply
     project_context: Optional[str] = None  # Active Tinkercad project for robotics
 
+    @model_validator(mode="after")
+    def check_code_diff(self):
+        if self.code_diff is not None:
+            if self.code_context is not None:
+                raise ValueError("Send either code_context or code_diff, not both")
+            if not self.code_base:
+                raise ValueError("code_diff requires code_base")
+        return self
+
 
 class ChatResponse(BaseModel):
     message: str
     message_ar: str  # Arabic translation
     code_snippet: Optional[str] = None  # Optional code example
     suggestions: list[str] = []  # Follow-up suggestions
+    code_version: Optional[str] = None  # Base for the next turn's code_diff
+    error: bool = False  # An apology, not an answer; asking again retries
+
+
+class SpeculationStats(BaseModel):
+    enabled: bool
+    started: int  # Suggestions answered in the background
+    skipped: int  # Suggestions not answered because of the budget or load
+    running: int
+    hits: int  # Messages served from a speculated answer
+    misses: int
+    hit_rate: float
+    tokens_this_hour: int
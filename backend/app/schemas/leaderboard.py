@@ -0,0 +1,26 @@
+from pydantic import BaseModel
+from uuid import UUID
+from typing import Optional
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int  # 1-based
+    user_id: UUID
+    username: Optional[str]
+    score: float
+
+
+class LeaderboardPage(BaseModel):
+    board: str
+    total: int
+    entries: list[LeaderboardEntry]
+
+
+class LeaderboardRank(BaseModel):
+    board: str
+    rank: Optional[int]  # None when the user has not solved anything on this board
+    score: float
+
+
+class RebuildLeaderboardResponse(BaseModel):
+    solves: int
@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+
+class LLMUsageRow(BaseModel):
+    key: Optional[str]
+    calls: int
+    prompt_tokens: int
+    output_tokens: int
+    cached_tokens: int
+    total_tokens: int
+    avg_latency_ms: float
+    max_latency_ms: int
+    errors: int
+    estimated_cost_usd: float
+
+
+class LLMUsageReport(BaseModel):
+    group_by: str
+    since: datetime
+    rows: list[LLMUsageRow]
+    pending: int  # Rows still buffered in this worker, not yet written
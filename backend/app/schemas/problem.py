@@ -1,6 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional
 
+# Problem slugs: stable keys that survive moving the catalogue between databases
+SLUG_PATTERN = r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,99}$"
+
 
 class SampleIO(BaseModel):
     input: str
@@ -8,6 +11,7 @@ class SampleIO(BaseModel):
 
 
 class ProblemCreate(BaseModel):
+    slug: Optional[str] = Field(None, pattern=SLUG_PATTERN)  # Generated when omitted
     topic: str  # IO, IF, LOOP, ARRAY
     difficulty: str  # Easy, Medium, Hard
     title_en: str
@@ -18,10 +22,41 @@ class ProblemCreate(BaseModel):
     input_format: Optional[str] = None
     output_format: Optional[str] = None
     sample_io: list[SampleIO]
+    # Enables randomized stress tests; never returned by the API
+    reference_solution: Optional[str] = None
+    stress_spec: Optional[dict] = None
+
+
+class ProblemImport(ProblemCreate):
+    """One line of a catalogue JSONL file, upserted by slug."""
+    slug: str = Field(pattern=SLUG_PATTERN)
+    # Exported so a new environment need not regenerate the ladders
+    hint_ladder: Optional[list[dict[str, str]]] = None
+    hint_ladder_hash: Optional[str] = Field(None, max_length=64)
+
+    @model_validator(mode="after")
+    def ladder_has_hash(self):
+        if (self.hint_ladder is None) != (self.hint_ladder_hash is None):
+            raise ValueError("hint_ladder and hint_ladder_hash go together")
+        return self
+
+
+class ImportReject(BaseModel):
+    line: int
+    error: str
+
+
+class CatalogueImportResult(BaseModel):
+    rows: int
+    upserted: int
+    rejected: int
+    batches: int
+    rejects: list[ImportReject]  # The first IMPORT_REJECTS_RETURNED
 
 
 class ProblemResponse(BaseModel):
     id: int
+    slug: str
     topic: str
     difficulty: str
     title_en: str
@@ -40,3 +75,12 @@ class ProblemResponse(BaseModel):
 class ProblemListResponse(BaseModel):
     problems: list[ProblemResponse]
     total: int
+
+
+class RecommendedProblem(BaseModel):
+    id: int
+    topic: str
+    difficulty: str
+    title_en: str
+    title_ar: Optional[str]
+    score: float
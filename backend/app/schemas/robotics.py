@@ -0,0 +1,52 @@
+from pydantic import BaseModel, Field
+from typing import Annotated, Literal, Optional, Union
+
+# Digital pins 0-19 or analog A0-A5, as the stub core numbers them
+PIN_PATTERN = r"^(?:[Aa][0-5]|1?[0-9])$"
+PinName = Annotated[str, Field(pattern=PIN_PATTERN)]
+Pin = Union[Annotated[int, Field(ge=0, le=19)], PinName]
+
+
+class SensorInput(BaseModel):
+    pin: Pin  # 2, "A0", ...
+    t_ms: int = 0  # Simulated time the value takes effect
+    value: int  # analogRead value (0-1023), or 0/1 when digital
+    digital: bool = False
+
+
+class PinExpectation(BaseModel):
+    mode: Optional[Literal["INPUT", "OUTPUT", "INPUT_PULLUP"]] = None
+    min_changes: int = Field(0, ge=0)
+    high_ms: Optional[tuple[int, int]] = None  # [min, max] length of each HIGH span
+    low_ms: Optional[tuple[int, int]] = None
+    final: Optional[Literal["HIGH", "LOW"]] = None
+
+
+class Expectations(BaseModel):
+    pins: dict[PinName, PinExpectation] = {}
+    serial_contains: list[str] = []
+
+
+class SimulateRequest(BaseModel):
+    code: str
+    seconds: float = Field(10, gt=0, le=60)
+    inputs: list[SensorInput] = []
+    # Exercise checks, e.g. {"pins": {"13": {"mode": "OUTPUT", "min_changes": 4}}}
+    expected: Optional[Expectations] = None
+
+
+class TraceEvent(BaseModel):
+    t_ms: int
+    pin: Optional[str]
+    kind: str  # digital, pwm, tone, servo or serial
+    value: Union[int, str]
+
+
+class SimulateResponse(BaseModel):
+    status: str  # ok, compile_error, timeout or crashed
+    simulated_ms: int
+    loops: int
+    summary: str
+    events: list[TraceEvent]
+    passed: Optional[bool] = None  # Only when expectations were given
+    failures: list[str] = []
@@ -0,0 +1,45 @@
+from pydantic import BaseModel
+from uuid import UUID
+from datetime import datetime
+from typing import Optional
+
+
+class UserStatsResponse(BaseModel):
+    user_id: UUID
+    attempts: int
+    accepted: int
+    solved: int
+    acceptance_rate: float
+    status_counts: dict[str, int]
+
+
+class ProblemStatsResponse(BaseModel):
+    problem_id: int
+    attempts: int
+    accepted: int
+    attempted_by: int
+    solved_by: int
+    acceptance_rate: float
+    status_counts: dict[str, int]
+
+
+class UserProblemStatsResponse(BaseModel):
+    problem_id: int
+    attempts: int
+    accepted: int
+    status_counts: dict[str, int]
+    last_status: Optional[str]
+    first_attempt_at: Optional[datetime]
+    first_accepted_at: Optional[datetime]
+    seconds_to_first_accept: Optional[float]  # From first attempt to first ACCEPTED
+
+
+class TopicMastery(BaseModel):
+    topic: str
+    solved: int
+    total: int
+    mastery: float  # solved / total problems in the topic
+
+
+class RebuildStatsResponse(BaseModel):
+    replayed: int
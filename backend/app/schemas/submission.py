@@ -35,3 +35,37 @@ class GradeResponse(BaseModel):
     feedback_en: str
     feedback_ar: str
     hint: Optional[str] = None
+    hint_ar: Optional[str] = None  # Set when the hint comes from the problem's hint ladder
+    cached: bool = False  # Verdict reused from an identical earlier submission
+    error: bool = False  # Grading failed; resubmitting grades the code again
+
+
+class VerdictCacheStats(BaseModel):
+    hits: int
+    misses: int
+    hit_rate: float
+
+
+class DiagnosticCacheStats(VerdictCacheStats):
+    local_entries: int
+
+
+class SimilarSubmission(BaseModel):
+    submission_id: UUID
+    user_id: UUID
+    similarity: float  # Jaccard similarity of winnowing fingerprints
+
+
+class SimilarityPair(BaseModel):
+    submission_a: UUID
+    user_a: UUID
+    submission_b: UUID
+    user_b: UUID
+    similarity: float
+
+
+class SimilarityReport(BaseModel):
+    problem_id: int
+    submissions: int
+    threshold: float
+    pairs: list[SimilarityPair]
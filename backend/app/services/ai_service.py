@@ -1,28 +1,201 @@
+import asyncio
+import hashlib
 import json
 import logging
-import google.generativeai as genai
+import re
+import time
+from collections import OrderedDict
+
 from app.config import get_settings
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.diagnostic_cache import explanation_cache
+from app.services.llm_capture import llm_capture
+from app.services.llm_usage import usage_counts, usage_recorder
+from app.services.prompt_budget import prompt_budget
+from app.services.static_analysis import analyze_cpp
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
-# Configure Gemini
-if settings.GEMINI_API_KEY:
-    genai.configure(api_key=settings.GEMINI_API_KEY)
-else:
-    logger.warning("GEMINI_API_KEY is not set. AI features will not work.")
+
+# Recent chat answers kept per worker to serve while the chat breaker is open
+CHAT_CACHE_SIZE = 256
+# Hints generated per problem hint ladder
+HINT_LADDER_RUNGS = 4
+
+UNAVAILABLE_CHAT = {
+    "message": "The AI tutor is temporarily unavailable. Please try again in a moment.",
+    "message_ar": "المساعد الذكي غير متاح مؤقتاً. يرجى المحاولة بعد قليل.",
+    "suggestions": [],
+    "error": True,
+}
+
+
+class JsonStringFieldStreamer:
+    """Incrementally extract one top-level string field from streamed JSON.
+
+    ``feed`` takes the next raw chunk and returns the newly decoded part of
+    the field's value, so a partial answer can be shown before the whole
+    JSON object has arrived.
+    """
+
+    _ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+    def __init__(self, field: str):
+        self.marker = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self.buffer = ""
+        self.pos = None  # Start of the undecoded part of the value
+        self.done = False
+        self.value = ""
+
+    def feed(self, chunk: str) -> str:
+        self.buffer += chunk
+        if self.done:
+            return ""
+        if self.pos is None:
+            match = self.marker.search(self.buffer)
+            if not match:
+                return ""
+            self.pos = match.end()
+
+        out = []
+        i = self.pos
+        while i < len(self.buffer):
+            ch = self.buffer[i]
+            if ch == '"':
+                self.done = True
+                i += 1
+                break
+            if ch == "\\":
+                if i + 1 >= len(self.buffer):
+                    break
+                esc = self.buffer[i + 1]
+                if esc == "u":
+                    if i + 6 > len(self.buffer):
+                        break
+                    out.append(chr(int(self.buffer[i + 2:i + 6], 16)))
+                    i += 6
+                    continue
+                out.append(self._ESCAPES.get(esc, esc))
+                i += 2
+                continue
+            out.append(ch)
+            i += 1
+        self.pos = i
+        delta = "".join(out)
+        self.value += delta
+        return delta
 
 
 class AIService:
     def __init__(self):
         self.model_name = settings.AI_MODEL
+        # Allow up to 120s for large prompts (e.g. few-shot problem generation)
+        self.request_options = {"timeout": 120}
+        self._model = None
+        self.breakers = {
+            name: CircuitBreaker(
+                name,
+                window=settings.AI_BREAKER_WINDOW,
+                min_calls=settings.AI_BREAKER_MIN_CALLS,
+                failure_ratio=settings.AI_BREAKER_FAILURE_RATIO,
+                slow_call_seconds=settings.AI_BREAKER_SLOW_CALL_SECONDS,
+                reset_seconds=settings.AI_BREAKER_RESET_SECONDS,
+            )
+            for name in (
+                "generate_problem", "grade_code", "explain_diagnostic", "generate_hint_ladder",
+                "review_solution", "chat", "speculative_chat",
+            )
+        }
+        self._chat_answers: OrderedDict[str, dict] = OrderedDict()
+
+    @property
+    def model(self):
+        """The Gemini model, created on first use.
+
+        google.generativeai pulls in grpc and protobuf, so it is only
+        imported once something actually needs the model.
+        """
+        if self._model is None:
+            import google.generativeai as genai
+
+            api_key = settings.final_gemini_key
+            if api_key:
+                genai.configure(api_key=api_key)
+            else:
+                logger.warning("GEMINI_API_KEY is not set. AI features will not work.")
+            try:
+                self._model = genai.GenerativeModel(self.model_name)
+            except Exception as e:
+                logger.error(f"Failed to initialize model {self.model_name}: {e}")
+                raise
+        return self._model
+
+    async def _generate(self, method: str, prompt: str, inputs: dict = None, **kwargs):
+        """Call the model through *method*'s circuit breaker.
+
+        Raises CircuitOpenError without calling Gemini while the breaker is
+        open. Only transport/API failures and slow calls count against the
+        breaker; malformed model output does not. *inputs* are the public
+        method's arguments, kept with the call when capture is enabled.
+        """
+        breaker = self.breakers[method]
+        call = breaker.check()
+        start = time.monotonic()
         try:
-            self.model = genai.GenerativeModel(self.model_name)
-            # Allow up to 120s for large prompts (e.g. few-shot problem generation)
-            self.request_options = {"timeout": 120}
-        except Exception as e:
-            logger.error(f"Failed to initialize model {self.model_name}: {e}")
+            response = await self.model.generate_content_async(
+                prompt, request_options=self.request_options, **kwargs
+            )
+        except asyncio.CancelledError:
+            # The caller went away (client disconnect, shutdown); says nothing about Gemini
+            breaker.release(call)
             raise
+        except BaseException as e:
+            latency = time.monotonic() - start
+            breaker.record(call, False, latency)
+            usage_recorder.record(method, self.model_name, None, latency, success=False)
+            self._capture(
+                method, inputs, prompt, kwargs.get("generation_config"),
+                None, None, latency, error=repr(e),
+            )
+            raise
+        latency = time.monotonic() - start
+        breaker.record(call, True, latency)
+        usage = getattr(response, "usage_metadata", None)
+        usage_recorder.record(method, self.model_name, usage, latency)
+        if llm_capture.enabled:
+            try:
+                text, error = response.text, None
+            except Exception as e:  # e.g. blocked by safety filters
+                text, error = None, repr(e)
+            self._capture(
+                method, inputs, prompt, kwargs.get("generation_config"),
+                text, usage, latency, error=error,
+            )
+        return response
+
+    def _capture(self, method, inputs, prompt, generation_config, text, usage, latency, error=None):
+        llm_capture.record(
+            method,
+            self.model_name,
+            inputs,
+            prompt,
+            generation_config,
+            text,
+            usage_counts(usage),
+            latency,
+            error=error,
+        )
+
+    def breaker_stats(self) -> dict:
+        return {name: breaker.stats() for name, breaker in self.breakers.items()}
+
+    def warmup(self):
+        """Import the SDK and build the model ahead of the first request."""
+        try:
+            self.model
+        except Exception:
+            pass  # Already logged; the first real call will raise again
 
     async def generate_problem(self, topic: str, difficulty: str) -> dict:
         prompt = f"""\
@@ -93,15 +266,18 @@ where "examples" is an array of objects with "input", "output", "explanation".
 """
 
         try:
-            response = await self.model.generate_content_async(
-                prompt, 
-                request_options=self.request_options,
+            response = await self._generate(
+                "generate_problem",
+                prompt,
+                inputs={"topic": topic, "difficulty": difficulty},
                 generation_config={"response_mime_type": "application/json"}
             )
             return json.loads(response.text)
         except json.JSONDecodeError as e:
             logger.error(f"generate_problem JSON parse error: {e}")
             raise ValueError(f"AI returned invalid JSON: {e}")
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logger.error(f"Error in generate_problem: {e}")
             raise
@@ -112,39 +288,69 @@ where "examples" is an array of objects with "input", "output", "explanation".
         problem_desc: str,
         constraints: str | None = None,
         sample_io: list | None = None,
+        input_format: str | None = None,
+        output_format: str | None = None,
+        problem_id: int | None = None,
+        test_report: str | None = None,
+        hint: bool = True,
     ) -> dict:
         """Grade a user's code submission using AI.
 
         Returns a dict with: status, is_correct, feedback_en, feedback_ar, hint.
+        Fallback results produced when grading itself failed also carry
+        ``error: True`` so callers don't memoize them. Code that fails to
+        compile is graded SYNTAX_ERROR locally, without an LLM call. With
+        ``hint=False`` (the problem has a stored hint ladder) the model is
+        not asked for a hint.
         """
-        if len(problem_desc) > 1500:
-            problem_desc = problem_desc[:1500] + "..."
-            
-        if sample_io and len(sample_io) > 3:
-            sample_io = sample_io[:3]
+        analysis = await analyze_cpp(code, constraints)
+        if analysis.has_errors:
+            return await self._syntax_error_verdict(analysis.errors)
 
-        sample_io_text = json.dumps(sample_io, ensure_ascii=False) if sample_io else "N/A"
+        problem = prompt_budget.problem(
+            problem_desc, constraints, sample_io, input_format, output_format, problem_id
+        )
+        # Never elided: a verdict on code the model did not see would be a guess
+        compact_code = prompt_budget.code(code, problem, elide=False)
 
         prompt = (
             "You are an expert code grader for a C++ / Robotics educational platform.\n"
             "Evaluate the following code against the problem description.\n\n"
-            f"### Problem Description\n{problem_desc}\n\n"
-            f"### Constraints\n{constraints or 'N/A'}\n\n"
-            f"### Sample Input/Output\n{sample_io_text}\n\n"
-            f"### Student Code\n```\n{code}\n```\n\n"
-            "Respond with ONLY strict JSON (no markdown, no extra text). "
+            f"### Problem Description\n{problem.description}\n\n"
+            + (f"### Input Format\n{problem.input_format}\n\n" if problem.input_format else "")
+            + (f"### Output Format\n{problem.output_format}\n\n" if problem.output_format else "")
+            + f"### Constraints\n{problem.constraints or 'N/A'}\n\n"
+            f"### Sample Input/Output\n{problem.samples}\n\n"
+            f"### Student Code\n```\n{compact_code}\n```\n\n"
+            + (f"### Static Analysis\n{analysis.summary()}\n\n" if analysis.summary() else "")
+            + (f"### Test Results\n{test_report}\n\n" if test_report else "")
+            + "Respond with ONLY strict JSON (no markdown, no extra text). "
             "The JSON must contain exactly these keys:\n"
             '- "status": one of "ACCEPTED", "WRONG_ANSWER", "SYNTAX_ERROR", "LOGIC_ERROR", "RUNTIME_ERROR"\n'
             '- "is_correct": boolean\n'
             '- "feedback_en": string with detailed feedback in English\n'
             '- "feedback_ar": string with detailed feedback in Arabic\n'
-            '- "hint": string with a short hint for the student (or null if correct)\n'
+            + (
+                '- "hint": string with a short hint for the student (or null if correct)\n'
+                if hint else '- "hint": null\n'
+            )
         )
 
         try:
-            response = await self.model.generate_content_async(
-                prompt, 
-                request_options=self.request_options,
+            response = await self._generate(
+                "grade_code",
+                prompt,
+                inputs={
+                    "code": code,
+                    "problem_desc": problem_desc,
+                    "constraints": constraints,
+                    "sample_io": sample_io,
+                    "input_format": input_format,
+                    "output_format": output_format,
+                    "problem_id": problem_id,
+                    "test_report": test_report,
+                    "hint": hint,
+                },
                 generation_config={"response_mime_type": "application/json"}
             )
             result = json.loads(response.text)
@@ -171,6 +377,17 @@ where "examples" is an array of objects with "input", "output", "explanation".
                 "feedback_en": "The grading system encountered an error. Please try again.",
                 "feedback_ar": "واجه نظام التقييم خطأ. يرجى المحاولة مرة أخرى.",
                 "hint": None,
+                "error": True,
+            }
+        except CircuitOpenError:
+            # Fail fast while Gemini is down; the verdict is not memoized
+            return {
+                "status": "WRONG_ANSWER",
+                "is_correct": False,
+                "feedback_en": "AI grading is temporarily unavailable. Please resubmit in a moment.",
+                "feedback_ar": "التقييم الذكي غير متاح مؤقتاً. يرجى إعادة الإرسال بعد قليل.",
+                "hint": None,
+                "error": True,
             }
         except Exception as e:
             logger.error(f"grade_code error: {e}")
@@ -180,22 +397,150 @@ where "examples" is an array of objects with "input", "output", "explanation".
                 "feedback_en": "An unexpected error occurred during grading.",
                 "feedback_ar": "حدث خطأ غير متوقع أثناء التقييم.",
                 "hint": None,
+                "error": True,
             }
 
+    async def _syntax_error_verdict(self, errors: list[str]) -> dict:
+        """SYNTAX_ERROR verdict explaining the compiler errors.
+
+        Explanations come from the diagnostic cache; errors the model
+        could not explain are shown as the raw compiler message.
+        """
+        explained = await explanation_cache.explain(errors, self.explain_diagnostic)
+        lines_en, lines_ar = [], []
+        for item in explained:
+            where = f"Line {item['line']}" if item["line"] else "Compiler"
+            where_ar = f"السطر {item['line']}" if item["line"] else "المترجم"
+            lines_en.append(f"{where}: {item.get('en', item['message'])}")
+            lines_ar.append(f"{where_ar}: {item.get('ar', item['message'])}")
+            if "en" in item:
+                lines_en.append(f"  (g++: {item['message']})")
+                lines_ar.append(f"  (g++: {item['message']})")
+        return {
+            "status": "SYNTAX_ERROR",
+            "is_correct": False,
+            "feedback_en": "Your code does not compile:\n" + "\n".join(lines_en),
+            "feedback_ar": "الكود لا يُترجم (خطأ في الترجمة):\n" + "\n".join(lines_ar),
+            "hint": "Fix the first compiler error; later errors are often caused by it.",
+        }
+
+    async def explain_diagnostic(self, signature: str) -> dict:
+        """Explain a normalized g++ diagnostic for a beginner, in both languages.
+
+        *signature* uses ``{0}``, ``{1}``… for the identifiers it names; the
+        answer uses the same placeholders so it can be reused for any
+        occurrence of the error.
+        """
+        prompt = (
+            "You are a friendly C++ tutor for beginners.\n"
+            "Explain this g++ compiler error and how to fix it, in 1-2 short sentences.\n"
+            "Placeholders like {0} and {1} stand for names from the student's code: "
+            "use them verbatim where the name belongs, and do not invent other placeholders.\n\n"
+            f"Error: {signature}\n\n"
+            'Respond with ONLY strict JSON: {"en": "<English explanation>", "ar": "<Arabic explanation>"}'
+        )
+        response = await self._generate(
+            "explain_diagnostic",
+            prompt,
+            inputs={"signature": signature},
+            generation_config={"response_mime_type": "application/json"},
+        )
+        return json.loads(response.text)
+
+    async def generate_hint_ladder(
+        self,
+        problem_desc: str,
+        constraints: str | None = None,
+        sample_io: list | None = None,
+        input_format: str | None = None,
+        output_format: str | None = None,
+        reference_solution: str | None = None,
+        problem_id: int | None = None,
+    ) -> list[dict]:
+        """Progressively stronger hints for a problem, in English and Arabic.
+
+        Returns a list of ``{"en": ..., "ar": ...}``, weakest first. Raises
+        ValueError when the answer is not a usable ladder.
+        """
+        problem = prompt_budget.problem(
+            problem_desc, constraints, sample_io, input_format, output_format, problem_id
+        )
+        prompt = (
+            "You are a friendly competitive-programming coach for beginners.\n"
+            f"Write {HINT_LADDER_RUNGS} hints for the problem below, each stronger than the last:\n"
+            "1. a nudge toward the key observation, without naming the technique;\n"
+            "2. the key observation or technique;\n"
+            "3. an outline of the algorithm and its complexity;\n"
+            "4. the full approach step by step, with edge cases to watch for.\n"
+            "Never include code. Each hint is 1-3 sentences.\n\n"
+            f"### Problem Description\n{problem.description}\n\n"
+            + (f"### Input Format\n{problem.input_format}\n\n" if problem.input_format else "")
+            + (f"### Output Format\n{problem.output_format}\n\n" if problem.output_format else "")
+            + f"### Constraints\n{problem.constraints or 'N/A'}\n\n"
+            f"### Sample Input/Output\n{problem.samples}\n\n"
+            + (
+                f"### Reference Solution (for you only; do not quote it)\n```\n"
+                f"{prompt_budget.code(reference_solution, problem)}\n```\n\n"
+                if reference_solution else ""
+            )
+            + 'Respond with ONLY strict JSON: {"hints": [{"en": "<English hint>", "ar": "<Arabic hint>"}, ...]}'
+        )
+        response = await self._generate(
+            "generate_hint_ladder",
+            prompt,
+            inputs={
+                "problem_desc": problem_desc,
+                "constraints": constraints,
+                "sample_io": sample_io,
+                "input_format": input_format,
+                "output_format": output_format,
+                "reference_solution": reference_solution,
+                "problem_id": problem_id,
+            },
+            generation_config={"response_mime_type": "application/json"},
+        )
+        try:
+            hints = json.loads(response.text)["hints"]
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            raise ValueError(f"AI returned an invalid hint ladder: {e}")
+        ladder = [
+            {"en": str(h["en"]).strip(), "ar": str(h["ar"]).strip()}
+            for h in hints
+            if isinstance(h, dict) and h.get("en") and h.get("ar")
+        ]
+        if not ladder:
+            raise ValueError("AI returned an empty hint ladder")
+        return ladder
+
     async def review_solution(self, problem_context: str, user_code: str) -> str:
+        analysis = await analyze_cpp(user_code, problem_context)
+        if analysis.has_errors:
+            details = "\n".join(f"- {e}" for e in analysis.errors)
+            return (
+                "## Compilation errors\n\n"
+                f"The code does not compile yet:\n\n{details}\n\n"
+                "Fix these first (start with the first one), then ask for a review again."
+            )
+
+        findings = analysis.summary()
         prompt = (
             f"You are a Code Reviewer.\n"
             f"Problem Context: {problem_context}\n"
             f"User Code:\n{user_code}\n"
-            "Provide feedback on correctness, complexity, and bugs. "
+            + (f"Static analysis findings (already verified, explain them briefly):\n{findings}\n" if findings else "")
+            + "Provide feedback on correctness, complexity, and bugs. "
             "Return the response as a Markdown string."
         )
 
         try:
-            response = await self.model.generate_content_async(
-                prompt, request_options=self.request_options
+            response = await self._generate(
+                "review_solution",
+                prompt,
+                inputs={"problem_context": problem_context, "user_code": user_code},
             )
             return response.text
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logger.error(f"Error in review_solution: {e}")
             raise
@@ -217,18 +562,17 @@ where "examples" is an array of objects with "input", "output", "explanation".
         ),
     }
 
-    async def chat(self, track: str, message: str, history: list = None, **kwargs) -> dict:
-        """Chat with the AI tutor. Prompt switches based on *track*."""
-
+    def _build_chat_prompt(self, track: str, message: str, **kwargs) -> str:
         # Pick the right personality
         system_prompt = self.SYSTEM_PROMPTS.get(
             track, self.SYSTEM_PROMPTS["problem_solving"]
         )
 
+        # message_ar comes first so streaming clients can show it sooner
         system_prompt += (
-            "\n\nYou MUST respond strictly with a valid JSON object containing EXACTLY three keys:\n"
-            '- "message_en": The English version of your response.\n'
+            "\n\nYou MUST respond strictly with a valid JSON object containing EXACTLY three keys, in this order:\n"
             '- "message_ar": The Arabic version of your response.\n'
+            '- "message_en": The English version of your response.\n'
             '- "suggestions": An array of maximum 3 short follow-up questions or suggestions for the user as strings.\n'
             "No markdown fencing or other text outside the JSON."
         )
@@ -249,24 +593,72 @@ where "examples" is an array of objects with "input", "output", "explanation".
         if kwargs.get("code_context"):
             full_prompt += f"\nCode: {kwargs['code_context']}\n"
 
+        if kwargs.get("simulation_context"):
+            full_prompt += (
+                "\nSimulation of this sketch (what it really does; cite it as evidence):\n"
+                f"{kwargs['simulation_context']}\n"
+            )
+
+        return full_prompt
+
+    @staticmethod
+    def _chat_cache_key(track: str, message: str, **kwargs) -> str:
+        payload = json.dumps(
+            [
+                track,
+                " ".join(message.lower().split()),
+                kwargs.get("problem_context"),
+                kwargs.get("code_context"),
+                kwargs.get("project_context"),
+            ],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _remember_chat(self, key: str, result: dict):
+        self._chat_answers[key] = result
+        self._chat_answers.move_to_end(key)
+        if len(self._chat_answers) > CHAT_CACHE_SIZE:
+            self._chat_answers.popitem(last=False)
+
+    def _degraded_chat(self, key: str) -> dict:
+        """Answer served while the chat breaker is open."""
+        cached = self._chat_answers.get(key)
+        return dict(cached) if cached else dict(UNAVAILABLE_CHAT)
+
+    @staticmethod
+    def _parse_chat_result(text: str) -> dict:
+        result = json.loads(text)
+        return {
+            "message": result.get("message_en", ""),
+            "message_ar": result.get("message_ar", ""),
+            "suggestions": result.get("suggestions", []),
+        }
+
+    async def chat(self, track: str, message: str, history: list = None, **kwargs) -> dict:
+        """Chat with the AI tutor. Prompt switches based on *track*."""
+        full_prompt = self._build_chat_prompt(track, message, **kwargs)
+        cache_key = self._chat_cache_key(track, message, **kwargs)
+
         try:
-            response = await self.model.generate_content_async(
-                full_prompt, 
-                request_options=self.request_options,
+            response = await self._generate(
+                "chat",
+                full_prompt,
+                inputs={"track": track, "message": message, **kwargs},
                 generation_config={"response_mime_type": "application/json"}
             )
-            result = json.loads(response.text)
-            return {
-                "message": result.get("message_en", ""),
-                "message_ar": result.get("message_ar", ""),
-                "suggestions": result.get("suggestions", []),
-            }
+            result = self._parse_chat_result(response.text)
+            self._remember_chat(cache_key, result)
+            return result
+        except CircuitOpenError:
+            return self._degraded_chat(cache_key)
         except json.JSONDecodeError as e:
             logger.error(f"Chat JSON parse error: {e}")
             return {
                 "message": "I'm sorry, I couldn't format my response properly.",
                 "message_ar": "عذراً، لم أتمكن من تنسيق الرد بشكل صحيح.",
                 "suggestions": [],
+                "error": True,
             }
         except Exception as e:
             logger.error(f"Chat Error: {e}")
@@ -274,7 +666,111 @@ where "examples" is an array of objects with "input", "output", "explanation".
                 "message": "I'm sorry, there was a connection error.",
                 "message_ar": "عذراً، حدث خطأ في الاتصال.",
                 "suggestions": [],
+                "error": True,
             }
 
+    async def speculative_chat(self, track: str, message: str, **kwargs) -> dict:
+        """:meth:`chat` for a suggested follow-up the student has not asked yet.
+
+        Runs through its own breaker so failed speculation never opens the
+        chat breaker, and raises instead of returning an apology.
+        """
+        response = await self._generate(
+            "speculative_chat",
+            self._build_chat_prompt(track, message, **kwargs),
+            inputs={"track": track, "message": message, **kwargs},
+            generation_config={"response_mime_type": "application/json"}
+        )
+        return self._parse_chat_result(response.text)
+
+    async def chat_stream(self, track: str, message: str, history: list = None, **kwargs):
+        """Streaming variant of :meth:`chat`.
+
+        Yields ``{"type": "delta", "text": ...}`` events carrying the Arabic
+        answer as it is generated, then one ``{"type": "final", ...}`` event
+        with the same keys :meth:`chat` returns.
+        """
+        full_prompt = self._build_chat_prompt(track, message, **kwargs)
+        cache_key = self._chat_cache_key(track, message, **kwargs)
+        extractor = JsonStringFieldStreamer("message_ar")
+        chunks = []
+        breaker = self.breakers["chat"]
+
+        try:
+            call = breaker.check()
+        except CircuitOpenError:
+            yield {"type": "final", **self._degraded_chat(cache_key)}
+            return
+
+        generation_config = {"response_mime_type": "application/json"}
+        capture_inputs = {"track": track, "message": message, **kwargs}
+        start = time.monotonic()
+        first_chunk_after = None
+        usage = None
+        try:
+            try:
+                response = await self.model.generate_content_async(
+                    full_prompt,
+                    request_options=self.request_options,
+                    generation_config=generation_config,
+                    stream=True
+                )
+                async for chunk in response:
+                    if first_chunk_after is None:
+                        first_chunk_after = time.monotonic() - start
+                    # Usage is cumulative; the last chunk carries the totals
+                    usage = getattr(chunk, "usage_metadata", None) or usage
+                    chunks.append(chunk.text)
+                    delta = extractor.feed(chunk.text)
+                    if delta:
+                        yield {"type": "delta", "text": delta}
+            except GeneratorExit:
+                # The client went away mid-stream; Gemini itself was fine
+                breaker.record(call, True, first_chunk_after or time.monotonic() - start)
+                usage_recorder.record("chat_stream", self.model_name, usage, time.monotonic() - start)
+                raise
+            except asyncio.CancelledError:
+                breaker.release(call)
+                raise
+            except BaseException as e:
+                latency = time.monotonic() - start
+                breaker.record(call, False, latency)
+                usage_recorder.record("chat_stream", self.model_name, usage, latency, success=False)
+                if llm_capture.enabled:
+                    self._capture(
+                        "chat_stream", capture_inputs, full_prompt, generation_config,
+                        "".join(chunks), usage, latency, error=repr(e),
+                    )
+                raise
+            # Streams are judged on time to first token, not total length
+            latency = time.monotonic() - start
+            breaker.record(call, True, first_chunk_after or latency)
+            usage_recorder.record("chat_stream", self.model_name, usage, latency)
+            if llm_capture.enabled:
+                self._capture(
+                    "chat_stream", capture_inputs, full_prompt, generation_config,
+                    "".join(chunks), usage, latency,
+                )
+            result = self._parse_chat_result("".join(chunks))
+            self._remember_chat(cache_key, result)
+            yield {"type": "final", **result}
+        except json.JSONDecodeError as e:
+            logger.error(f"Chat stream JSON parse error: {e}")
+            yield {
+                "type": "final",
+                "message": "I'm sorry, I couldn't format my response properly.",
+                "message_ar": extractor.value or "عذراً، لم أتمكن من تنسيق الرد بشكل صحيح.",
+                "suggestions": [],
+                "error": True,
+            }
+        except Exception as e:
+            logger.error(f"Chat stream error: {e}")
+            yield {
+                "type": "final",
+                "message": "I'm sorry, there was a connection error.",
+                "message_ar": "عذراً، حدث خطأ في الاتصال.",
+                "suggestions": [],
+                "error": True,
+            }
 
 ai_service = AIService()
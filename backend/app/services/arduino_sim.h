@@ -0,0 +1,342 @@
+// Host-side stand-in for the Arduino core, used by app/services/arduino_sim.py.
+//
+// Time is virtual: delay() and friends advance a clock instead of sleeping,
+// and the run ends once the clock reaches the requested duration. Pin and
+// Serial activity is written to stdout as one event per line:
+//
+//   M <ms> <pin> <mode>     pinMode
+//   D <ms> <pin> <level>    digital level change
+//   A <ms> <pin> <value>    analogWrite (PWM) change
+//   T <ms> <pin> <freq>     tone (0 = noTone)
+//   V <ms> <pin> <angle>    Servo position
+//   W <ms> <pin> <code>     misuse warning (see SIM_WARN_*)
+//   S <ms> <text>           one line printed to Serial
+//   X <ms> <loops>          end of the run
+//
+// Sensor inputs are read from stdin before setup() as "<D|A> <pin> <ms> <value>"
+// lines, sorted by time.
+#include <algorithm>
+#include <cmath>
+#include <cstdint>
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <string>
+
+typedef uint8_t byte;
+typedef bool boolean;
+typedef unsigned int word;
+
+#define HIGH 1
+#define LOW 0
+#define INPUT 0
+#define OUTPUT 1
+#define INPUT_PULLUP 2
+#define LED_BUILTIN 13
+#define A0 14
+#define A1 15
+#define A2 16
+#define A3 17
+#define A4 18
+#define A5 19
+#define DEC 10
+#define HEX 16
+#define BIN 2
+#define PI 3.14159265358979323846
+#define F(s) (s)
+
+#define SIM_PINS 20
+#define SIM_MAX_EVENTS 20000
+#define SIM_MAX_INPUTS 256
+#define SIM_WARN_WRITE_NOT_OUTPUT 1
+#define SIM_WARN_SERIAL_NOT_BEGUN 2
+#define SIM_WARN_BAD_PIN 3
+
+// Macros like the Arduino core, so mixed int/long arguments work
+#define min(a, b) ((a) < (b) ? (a) : (b))
+#define max(a, b) ((a) > (b) ? (a) : (b))
+
+static unsigned long long sim_now_us = 0;
+static unsigned long long sim_limit_us = 0;
+static unsigned long sim_loops = 0;
+static long sim_events = 0;
+static int sim_mode[SIM_PINS];
+static int sim_level[SIM_PINS];
+static int sim_pwm[SIM_PINS];
+static int sim_digital_in[SIM_PINS];
+static int sim_analog_in[SIM_PINS];
+static bool sim_input_given[SIM_PINS];
+static bool sim_warned[SIM_PINS][4];
+
+struct SimInput { char kind; int pin; unsigned long long at_us; int value; };
+static SimInput sim_inputs[SIM_MAX_INPUTS];
+static int sim_input_count = 0;
+static int sim_next_input = 0;
+
+static unsigned long long sim_ms() { return sim_now_us / 1000; }
+
+static void sim_finish() {
+    printf("X %llu %lu\n", sim_ms(), sim_loops);
+    fflush(stdout);
+    exit(0);
+}
+
+static void sim_event(char kind, int pin, long value) {
+    printf("%c %llu %d %ld\n", kind, sim_ms(), pin, value);
+    if (++sim_events >= SIM_MAX_EVENTS) sim_finish();
+}
+
+static void sim_warn(int pin, int code) {
+    int slot = (pin >= 0 && pin < SIM_PINS) ? pin : 0;
+    if (sim_warned[slot][code]) return;
+    sim_warned[slot][code] = true;
+    sim_event('W', pin, code);
+}
+
+static bool sim_pin_ok(int pin) {
+    if (pin >= 0 && pin < SIM_PINS) return true;
+    sim_warn(pin, SIM_WARN_BAD_PIN);
+    return false;
+}
+
+static void sim_apply_inputs() {
+    while (sim_next_input < sim_input_count && sim_inputs[sim_next_input].at_us <= sim_now_us) {
+        SimInput &in = sim_inputs[sim_next_input++];
+        if (in.pin < 0 || in.pin >= SIM_PINS) continue;
+        if (in.kind == 'A') sim_analog_in[in.pin] = in.value;
+        else sim_digital_in[in.pin] = in.value ? HIGH : LOW;
+        sim_input_given[in.pin] = true;
+    }
+}
+
+static void sim_advance(unsigned long long us) {
+    sim_now_us += us;
+    sim_apply_inputs();
+    if (sim_now_us >= sim_limit_us) sim_finish();
+}
+
+void pinMode(int pin, int mode) {
+    if (!sim_pin_ok(pin)) return;
+    sim_mode[pin] = mode;
+    sim_event('M', pin, mode);
+}
+
+void digitalWrite(int pin, int value) {
+    if (!sim_pin_ok(pin)) return;
+    value = value ? HIGH : LOW;
+    if (sim_mode[pin] != OUTPUT) sim_warn(pin, SIM_WARN_WRITE_NOT_OUTPUT);
+    if (sim_level[pin] != value) {
+        sim_level[pin] = value;
+        sim_event('D', pin, value);
+    }
+    sim_advance(4);
+}
+
+int digitalRead(int pin) {
+    if (!sim_pin_ok(pin)) return LOW;
+    sim_advance(4);
+    if (sim_mode[pin] == OUTPUT) return sim_level[pin];
+    // An unconnected pin with the pull-up enabled reads HIGH
+    if (sim_mode[pin] == INPUT_PULLUP && !sim_input_given[pin]) return HIGH;
+    return sim_digital_in[pin];
+}
+
+int analogRead(int pin) {
+    if (pin >= 0 && pin < 6) pin += A0;
+    if (!sim_pin_ok(pin)) return 0;
+    sim_advance(100);
+    return sim_analog_in[pin];
+}
+
+void analogWrite(int pin, int value) {
+    if (!sim_pin_ok(pin)) return;
+    value = value < 0 ? 0 : (value > 255 ? 255 : value);
+    if (sim_mode[pin] != OUTPUT) sim_warn(pin, SIM_WARN_WRITE_NOT_OUTPUT);
+    if (sim_pwm[pin] != value) {
+        sim_pwm[pin] = value;
+        sim_event('A', pin, value);
+    }
+    sim_advance(4);
+}
+
+void tone(int pin, unsigned int frequency, unsigned long duration = 0) {
+    (void)duration;
+    if (sim_pin_ok(pin)) sim_event('T', pin, frequency);
+}
+
+void noTone(int pin) {
+    if (sim_pin_ok(pin)) sim_event('T', pin, 0);
+}
+
+void delay(unsigned long ms) { sim_advance((unsigned long long)ms * 1000); }
+void delayMicroseconds(unsigned int us) { sim_advance(us); }
+unsigned long millis() { sim_advance(1); return (unsigned long)sim_ms(); }
+unsigned long micros() { sim_advance(1); return (unsigned long)sim_now_us; }
+
+unsigned long pulseIn(int pin, int value, unsigned long timeout = 1000000) {
+    (void)pin; (void)value;
+    sim_advance(timeout);
+    return 0;
+}
+
+long map(long x, long in_min, long in_max, long out_min, long out_max) {
+    if (in_max == in_min) return out_min;
+    return (x - in_min) * (out_max - out_min) / (in_max - in_min) + out_min;
+}
+
+template <typename T, typename L, typename H>
+T constrain(T x, L low, H high) { return x < low ? low : (x > high ? high : x); }
+
+static unsigned long sim_seed = 1;
+void randomSeed(unsigned long seed) { sim_seed = seed ? seed : 1; }
+long random(long max_value) {
+    sim_seed = sim_seed * 1103515245UL + 12345UL;
+    return max_value > 0 ? (long)((sim_seed >> 16) % (unsigned long)max_value) : 0;
+}
+long random(long min_value, long max_value) {
+    return max_value > min_value ? min_value + random(max_value - min_value) : min_value;
+}
+
+class String {
+public:
+    std::string s;
+    String() {}
+    String(const char *v) : s(v ? v : "") {}
+    String(const std::string &v) : s(v) {}
+    String(char c) : s(1, c) {}
+    String(int v, int base = DEC) : s(sim_format(v, base)) {}
+    String(unsigned int v, int base = DEC) : s(sim_format(v, base)) {}
+    String(long v, int base = DEC) : s(sim_format(v, base)) {}
+    String(unsigned long v, int base = DEC) : s(sim_format(v, base)) {}
+    String(double v, int digits = 2) {
+        char buf[64];
+        snprintf(buf, sizeof buf, "%.*f", digits, v);
+        s = buf;
+    }
+    static std::string sim_format(long long v, int base) {
+        if (base == DEC) return std::to_string(v);
+        std::string out;
+        unsigned long long u = (unsigned long long)v;
+        do { out.insert(out.begin(), "0123456789ABCDEF"[u % base]); u /= base; } while (u);
+        return out;
+    }
+    unsigned int length() const { return s.size(); }
+    const char *c_str() const { return s.c_str(); }
+    char charAt(unsigned int i) const { return i < s.size() ? s[i] : 0; }
+    char operator[](unsigned int i) const { return charAt(i); }
+    long toInt() const { return atol(s.c_str()); }
+    float toFloat() const { return atof(s.c_str()); }
+    int indexOf(const String &v) const { size_t p = s.find(v.s); return p == std::string::npos ? -1 : (int)p; }
+    int indexOf(char c) const { size_t p = s.find(c); return p == std::string::npos ? -1 : (int)p; }
+    String substring(unsigned int from) const { return from < s.size() ? String(s.substr(from)) : String(); }
+    String substring(unsigned int from, unsigned int to) const {
+        return from < s.size() && to > from ? String(s.substr(from, to - from)) : String();
+    }
+    void trim() {
+        size_t a = s.find_first_not_of(" \t\r\n"), b = s.find_last_not_of(" \t\r\n");
+        s = a == std::string::npos ? "" : s.substr(a, b - a + 1);
+    }
+    void toUpperCase() { for (char &c : s) c = toupper(c); }
+    void toLowerCase() { for (char &c : s) c = tolower(c); }
+    bool equals(const String &o) const { return s == o.s; }
+    bool operator==(const String &o) const { return s == o.s; }
+    bool operator!=(const String &o) const { return s != o.s; }
+    String &operator+=(const String &o) { s += o.s; return *this; }
+    String &concat(const String &o) { s += o.s; return *this; }
+};
+
+inline String operator+(const String &a, const String &b) { String r(a); r += b; return r; }
+inline String operator+(const String &a, const char *b) { return a + String(b); }
+inline String operator+(const char *a, const String &b) { return String(a) + b; }
+inline String operator+(const String &a, int b) { return a + String(b); }
+inline String operator+(const String &a, long b) { return a + String(b); }
+inline String operator+(const String &a, unsigned long b) { return a + String(b); }
+inline String operator+(const String &a, double b) { return a + String(b); }
+inline String operator+(const String &a, char b) { return a + String(b); }
+
+class SimSerial {
+public:
+    bool begun = false;
+    long baud = 0;
+    std::string line;
+
+    void begin(long rate) { begun = true; baud = rate; }
+    void end() { begun = false; }
+    operator bool() const { return true; }
+    int available() { return 0; }
+    int read() { return -1; }
+    int peek() { return -1; }
+    void flush() {}
+    void setTimeout(long) {}
+    long parseInt() { return 0; }
+    float parseFloat() { return 0; }
+    String readString() { return String(); }
+    String readStringUntil(char) { return String(); }
+
+    void emit(const std::string &text) {
+        if (!begun) sim_warn(0, SIM_WARN_SERIAL_NOT_BEGUN);
+        for (char c : text) {
+            if (c == '\n') {
+                printf("S %llu %s\n", sim_ms(), line.c_str());
+                line.clear();
+                if (++sim_events >= SIM_MAX_EVENTS) sim_finish();
+            } else if (c != '\r' && line.size() < 200) {
+                line += c;
+            }
+        }
+        // Serial output takes ~1 ms per 10 characters at 9600 baud
+        sim_advance(baud > 0 ? text.size() * 10000000ULL / baud : 0);
+    }
+
+    size_t write(int c) { emit(std::string(1, (char)c)); return 1; }
+    size_t print(const String &v) { emit(v.s); return v.s.size(); }
+    size_t print(const char *v) { return print(String(v)); }
+    size_t print(char v) { return print(String(v)); }
+    size_t print(int v, int base = DEC) { return print(String(v, base)); }
+    size_t print(unsigned int v, int base = DEC) { return print(String(v, base)); }
+    size_t print(long v, int base = DEC) { return print(String(v, base)); }
+    size_t print(unsigned long v, int base = DEC) { return print(String(v, base)); }
+    size_t print(double v, int digits = 2) { return print(String(v, digits)); }
+    size_t println() { return print("\n"); }
+    template <typename T> size_t println(const T &v) { return print(v) + println(); }
+    template <typename T> size_t println(const T &v, int extra) { return print(v, extra) + println(); }
+};
+
+static SimSerial Serial;
+
+class Servo {
+public:
+    int pin = -1;
+    int angle = 90;
+    uint8_t attach(int p, int = 544, int = 2400) { pin = p; return 1; }
+    void detach() { pin = -1; }
+    bool attached() { return pin >= 0; }
+    void write(int value) {
+        value = value < 0 ? 0 : (value > 180 ? 180 : value);
+        if (value != angle || pin < 0) { angle = value; sim_event('V', pin, value); }
+        sim_advance(4);
+    }
+    void writeMicroseconds(int us) { write((int)map(us, 544, 2400, 0, 180)); }
+    int read() { return angle; }
+};
+
+void setup();
+void loop();
+
+int main(int argc, char **argv) {
+    sim_limit_us = argc > 1 ? strtoull(argv[1], nullptr, 10) * 1000ULL : 10000000ULL;
+    char kind;
+    int pin, value;
+    unsigned long long at_ms;
+    while (sim_input_count < SIM_MAX_INPUTS && scanf(" %c %d %llu %d", &kind, &pin, &at_ms, &value) == 4) {
+        if (pin >= 0 && pin < 6 && kind == 'A') pin += A0;
+        sim_inputs[sim_input_count++] = {kind, pin, at_ms * 1000, value};
+    }
+    sim_apply_inputs();
+    setup();
+    for (;;) {
+        loop();
+        sim_loops++;
+        sim_advance(10);
+    }
+}
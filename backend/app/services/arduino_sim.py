@@ -0,0 +1,363 @@
+"""Simulate Arduino sketches on the host to get pin and Serial traces.
+
+The sketch is compiled against ``arduino_sim.h``, a stub of the Arduino
+core with a virtual clock, then ``setup()`` and ``loop()`` run for a few
+simulated seconds, which takes milliseconds of real time. The trace
+answers questions like "why doesn't my LED blink" with evidence: it is
+summarized for the robotics tutor and checked against exercise
+expectations.
+
+Sketches run through app.services.sandbox, so this is off unless
+``ARDUINO_SIM_ENABLED`` is set.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from app.config import get_settings
+from app.services.sandbox import compile_cpp, run_binary
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+STUB_HEADER = (Path(__file__).with_name("arduino_sim.h")).read_text(encoding="utf-8")
+# Compiled sketches kept per worker, so re-running the same code skips g++
+BINARY_CACHE_SIZE = 64
+MAX_SECONDS = 60
+# Real time allowed per run; a loop() that never yields hits it
+REAL_SECONDS_PER_RUN = 2.0
+SUMMARY_SERIAL_LINES = 5
+# Events returned by the simulate endpoint
+MAX_TRACE_EVENTS = 2000
+# Libraries the stub provides, so their #include is dropped
+STUBBED_INCLUDES = {"Arduino.h", "Servo.h"}
+
+MODES = {0: "INPUT", 1: "OUTPUT", 2: "INPUT_PULLUP"}
+WARNINGS = {
+    1: "written with digitalWrite/analogWrite but never set to OUTPUT with pinMode",
+    2: "Serial used before Serial.begin()",
+    3: "invalid pin number used",
+}
+ANALOG_PINS = {f"A{i}": 14 + i for i in range(6)}
+
+_COMPILE_ERROR_RE = re.compile(r"sketch\.ino:(\d+):\d+: error: (.*)")
+_INCLUDE_RE = re.compile(r'^\s*#\s*include\s*[<"]([^>"]+)[>"].*$', re.MULTILINE)
+_FUNCTION_RE = re.compile(
+    r"^[ \t]*((?:unsigned\s+|signed\s+|static\s+|const\s+)*[A-Za-z_][\w:<>]*[\s*&]+)"
+    r"([A-Za-z_]\w*)\s*\(([^;{}]*)\)\s*\{",
+    re.MULTILINE,
+)
+
+
+@dataclass
+class PinTrace:
+    pin: int
+    mode: Optional[str] = None
+    changes: list[tuple[int, int]] = field(default_factory=list)  # (ms, level)
+    pwm: list[tuple[int, int]] = field(default_factory=list)  # (ms, duty 0-255)
+    tones: list[tuple[int, int]] = field(default_factory=list)  # (ms, Hz)
+    servo: list[tuple[int, int]] = field(default_factory=list)  # (ms, degrees)
+    warnings: list[str] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return f"A{self.pin - 14}" if 14 <= self.pin < 20 else str(self.pin)
+
+    def half_periods(self) -> dict[int, list[int]]:
+        """Durations (ms) spent at each level between changes."""
+        spans: dict[int, list[int]] = {0: [], 1: []}
+        for (start, level), (end, _) in zip(self.changes, self.changes[1:]):
+            spans[level].append(end - start)
+        return spans
+
+
+@dataclass
+class SimulationResult:
+    status: str  # "ok", "compile_error", "timeout", "crashed" or "skipped"
+    simulated_ms: int = 0
+    loops: int = 0
+    pins: dict[int, PinTrace] = field(default_factory=dict)
+    serial: list[tuple[int, str]] = field(default_factory=list)
+    warnings: list[str] = field(default_factory=list)
+    compiler_output: str = ""
+
+    def summary(self) -> str:
+        """Compact, model-friendly description of what the sketch did."""
+        if self.status == "compile_error":
+            return "The sketch does not compile:\n" + self.compiler_output
+        if self.status == "timeout":
+            return (
+                "loop() never returned control within the time limit "
+                "(an endless loop without delay()?)."
+            )
+        if self.status == "crashed":
+            return f"The sketch crashed after {self.simulated_ms} ms of simulated time."
+        if self.status != "ok":
+            return ""
+
+        lines = [f"Simulated {self.simulated_ms / 1000:g} s; loop() ran {self.loops} times."]
+        for trace in sorted(self.pins.values(), key=lambda t: t.pin):
+            lines.append(f"- pin {trace.name}: {_describe_pin(trace)}")
+        lines += [f"- {w}" for w in self.warnings]
+        if self.serial:
+            shown = ", ".join(repr(text) for _, text in self.serial[:SUMMARY_SERIAL_LINES])
+            more = f" (+{len(self.serial) - SUMMARY_SERIAL_LINES} more)" if len(self.serial) > SUMMARY_SERIAL_LINES else ""
+            lines.append(f"- Serial printed {len(self.serial)} lines: {shown}{more}")
+        else:
+            lines.append("- Nothing was printed to Serial.")
+        return "\n".join(lines)
+
+    def events(self) -> list[dict]:
+        """Flat, time-ordered trace for API clients."""
+        out = []
+        for trace in self.pins.values():
+            out += [{"t_ms": t, "pin": trace.name, "kind": "digital", "value": v} for t, v in trace.changes]
+            out += [{"t_ms": t, "pin": trace.name, "kind": "pwm", "value": v} for t, v in trace.pwm]
+            out += [{"t_ms": t, "pin": trace.name, "kind": "tone", "value": v} for t, v in trace.tones]
+            out += [{"t_ms": t, "pin": trace.name, "kind": "servo", "value": v} for t, v in trace.servo]
+        out += [{"t_ms": t, "pin": None, "kind": "serial", "value": text} for t, text in self.serial]
+        return sorted(out, key=lambda e: e["t_ms"])
+
+
+def _describe_pin(trace: PinTrace) -> str:
+    parts = [trace.mode or "no pinMode"]
+    if trace.changes:
+        spans = trace.half_periods()
+        if len(trace.changes) >= 3 and spans[0] and spans[1]:
+            high = sum(spans[1]) / len(spans[1])
+            low = sum(spans[0]) / len(spans[0])
+            parts.append(
+                f"toggles {len(trace.changes)} times, HIGH ~{high:.0f} ms / LOW ~{low:.0f} ms"
+            )
+        else:
+            levels = ", ".join(f"{'HIGH' if v else 'LOW'}@{t}ms" for t, v in trace.changes[:6])
+            parts.append(f"set {levels}")
+    elif trace.mode == "OUTPUT" and not (trace.pwm or trace.tones or trace.servo):
+        parts.append("never written (stays LOW)")
+    if trace.pwm:
+        values = [v for _, v in trace.pwm]
+        parts.append(f"analogWrite {len(values)} changes, range {min(values)}-{max(values)}")
+    if trace.tones:
+        freqs = sorted({v for _, v in trace.tones if v})
+        parts.append(f"tone {', '.join(map(str, freqs[:5]))} Hz" if freqs else "noTone only")
+    if trace.servo:
+        angles = [v for _, v in trace.servo]
+        parts.append(f"servo {len(angles)} moves, {min(angles)}-{max(angles)} degrees")
+    parts += trace.warnings
+    return "; ".join(parts)
+
+
+def _pin_number(pin) -> int:
+    if isinstance(pin, str) and pin.upper() in ANALOG_PINS:
+        return ANALOG_PINS[pin.upper()]
+    return int(pin)
+
+
+def prepare_sketch(code: str) -> str:
+    """The sketch as a C++ translation unit: stub header, prototypes, code.
+
+    Like the Arduino IDE, prototypes are generated for top-level functions
+    so they can be called before their definition. Includes of stubbed
+    libraries are blanked, keeping line numbers for compiler messages.
+    """
+    code = _INCLUDE_RE.sub(
+        lambda m: "" if m.group(1) in STUBBED_INCLUDES else m.group(0), code
+    )
+    prototypes = []
+    for match in _FUNCTION_RE.finditer(code):
+        return_type, name, params = match.groups()
+        if name in ("setup", "loop", "if", "for", "while", "switch") or "=" in params:
+            continue
+        if code.count("{", 0, match.start()) != code.count("}", 0, match.start()):
+            continue  # not top level
+        prototypes.append(f"{return_type.strip()} {name}({params.strip()});")
+    return STUB_HEADER + "\n".join(prototypes) + '\n#line 1 "sketch.ino"\n' + code
+
+
+def parse_trace(output: str) -> SimulationResult:
+    """Trace of the stub's output; lines that don't parse (e.g. cut off by a crash) are skipped."""
+    result = SimulationResult("ok")
+    for line in output.splitlines():
+        try:
+            _parse_trace_line(result, line)
+        except ValueError:
+            continue
+    return result
+
+
+def _parse_trace_line(result: SimulationResult, line: str):
+    kind, _, rest = line.partition(" ")
+    if kind == "S":
+        t, _, text = rest.partition(" ")
+        result.serial.append((int(t), text))
+        return
+    fields = rest.split()
+    if kind == "X" and len(fields) == 2:
+        result.simulated_ms, result.loops = int(fields[0]), int(fields[1])
+        return
+    if len(fields) != 3:
+        return
+    t, pin, value = map(int, fields)
+    if kind == "W" and value == 2:
+        result.warnings.append(WARNINGS[2])
+        return
+    trace = result.pins.setdefault(pin, PinTrace(pin))
+    if kind == "M":
+        trace.mode = MODES.get(value, str(value))
+    elif kind == "D":
+        trace.changes.append((t, value))
+    elif kind == "A":
+        trace.pwm.append((t, value))
+    elif kind == "T":
+        trace.tones.append((t, value))
+    elif kind == "V":
+        trace.servo.append((t, value))
+    elif kind == "W":
+        trace.warnings.append(WARNINGS.get(value, f"warning {value}"))
+
+
+def check_expectations(result: SimulationResult, expected: dict) -> list[str]:
+    """Failures of *result* against an exercise's expectations.
+
+    ``expected`` is a dumped ``schemas.robotics.Expectations``, e.g.::
+
+        {"pins": {"13": {"mode": "OUTPUT", "min_changes": 4,
+                         "high_ms": [400, 600], "low_ms": [400, 600]}},
+         "serial_contains": ["Hello"]}
+    """
+    if result.status != "ok":
+        return [f"simulation {result.status}"]
+    failures = []
+    for pin, rules in (expected.get("pins") or {}).items():
+        trace = result.pins.get(_pin_number(pin), PinTrace(_pin_number(pin)))
+        if "mode" in rules and trace.mode != rules["mode"]:
+            failures.append(f"pin {pin}: mode is {trace.mode or 'not set'}, expected {rules['mode']}")
+        if len(trace.changes) < rules.get("min_changes", 0):
+            failures.append(
+                f"pin {pin}: changed {len(trace.changes)} times, expected at least {rules['min_changes']}"
+            )
+        spans = trace.half_periods()
+        for key, level in (("high_ms", 1), ("low_ms", 0)):
+            if key not in rules:
+                continue
+            lo, hi = rules[key]
+            wrong = [d for d in spans[level] if not lo <= d <= hi]
+            if not spans[level] or wrong:
+                failures.append(
+                    f"pin {pin}: {'HIGH' if level else 'LOW'} lasted {wrong or 'never'} ms, expected {lo}-{hi} ms"
+                )
+        if "final" in rules:
+            final = trace.changes[-1][1] if trace.changes else 0
+            if ("HIGH" if final else "LOW") != rules["final"]:
+                failures.append(f"pin {pin}: ends {'HIGH' if final else 'LOW'}, expected {rules['final']}")
+    printed = "\n".join(text for _, text in result.serial)
+    for text in expected.get("serial_contains") or []:
+        if text not in printed:
+            failures.append(f"Serial output never contains {text!r}")
+    return failures
+
+
+class ArduinoSimulator:
+    """Compiles sketches against the stub core and runs them on virtual time."""
+
+    def __init__(self):
+        self._workdir: Optional[Path] = None
+        self._binaries: OrderedDict[str, Path] = OrderedDict()
+        self._compile_locks: dict[str, asyncio.Lock] = {}
+        self._running: Counter[str] = Counter()  # Runs in progress per binary
+
+    @property
+    def workdir(self) -> Path:
+        if self._workdir is None:
+            self._workdir = Path(tempfile.mkdtemp(prefix="arduino-"))
+        return self._workdir
+
+    async def _binary(self, key: str, code: str) -> tuple[Optional[Path], str]:
+        # One compile per sketch; concurrent requests for it wait and share it
+        lock = self._compile_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if key in self._binaries:
+                self._binaries.move_to_end(key)
+                return self._binaries[key], ""
+            binary = self.workdir / f"sketch-{key}"
+            # Built under a temporary name so the final path never holds a partial file
+            partial = self.workdir / f"sketch-{key}-{os.urandom(4).hex()}"
+            ok, errors = await compile_cpp(prepare_sketch(code), partial)
+            if not ok:
+                partial.unlink(missing_ok=True)
+                self._compile_locks.pop(key, None)
+                # Only the sketch's own lines are useful to the student
+                errors = "\n".join(
+                    f"line {m.group(1)}: {m.group(2)}"
+                    for m in _COMPILE_ERROR_RE.finditer(errors)
+                )[:2000]
+                return None, errors
+            partial.rename(binary)
+            self._binaries[key] = binary
+        self._evict()
+        return binary, ""
+
+    def _evict(self):
+        """Drop the least recently used binaries that are not running.
+
+        The newest is kept: it was just compiled for a run not started yet.
+        """
+        for key in list(self._binaries)[:-1]:
+            if len(self._binaries) <= BINARY_CACHE_SIZE:
+                break
+            if self._running[key]:
+                continue
+            self._binaries.pop(key).unlink(missing_ok=True)
+            self._compile_locks.pop(key, None)
+
+    async def run(self, code: str, seconds: float = 10, inputs: Optional[list[dict]] = None) -> SimulationResult:
+        """Run *code* for *seconds* of simulated time.
+
+        *inputs* schedule sensor values: ``{"pin": "A0", "t_ms": 0, "value": 512}``
+        for analogRead, or ``{"pin": 2, "t_ms": 1000, "value": 1, "digital": true}``.
+        """
+        if not settings.ARDUINO_SIM_ENABLED or shutil.which(settings.STATIC_ANALYSIS_COMPILER) is None:
+            return SimulationResult("skipped")
+        key = hashlib.sha256(code.encode("utf-8")).hexdigest()[:16]
+        binary, errors = await self._binary(key, code)
+        if binary is None:
+            return SimulationResult("compile_error", compiler_output=errors)
+
+        stdin = "\n".join(
+            f"{'D' if item.get('digital') else 'A'} {_pin_number(item['pin'])} "
+            f"{int(item.get('t_ms', 0))} {int(item['value'])}"
+            for item in sorted(inputs or [], key=lambda i: i.get("t_ms", 0))
+        )
+        seconds = min(max(seconds, 0.001), MAX_SECONDS)
+        # The stub takes the simulated duration in ms as its argument
+        self._running[key] += 1
+        try:
+            run = await run_binary(binary, stdin, REAL_SECONDS_PER_RUN, args=(int(seconds * 1000),))
+        finally:
+            self._running[key] -= 1
+            if not self._running[key]:
+                del self._running[key]
+                self._evict()  # Binaries skipped while running may be over the cap
+        if run.reason == "timeout":
+            return SimulationResult("timeout")
+        result = parse_trace(run.output)
+        if run.reason is not None:
+            result.status = "crashed"
+        return result
+
+    def cleanup(self):
+        if self._workdir is not None:
+            shutil.rmtree(self._workdir, ignore_errors=True)
+            self._workdir = None
+            self._binaries.clear()
+
+
+arduino_simulator = ArduinoSimulator()
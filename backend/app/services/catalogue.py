@@ -0,0 +1,265 @@
+"""Bulk JSONL import and export of the problem catalogue.
+
+Each line is one problem (``ProblemImport``), keyed by its ``slug``.
+Import validates lines as they stream in and upserts them with multi-row
+``INSERT ... ON CONFLICT (slug) DO UPDATE`` statements of
+CATALOGUE_IMPORT_BATCH_SIZE rows, committing per batch. Lines that do not
+parse or validate, or that the database refuses, are rejected one by one
+instead of aborting their batch. Export streams rows from a server-side
+cursor. Memory use does not grow with the size of the catalogue.
+
+    python -m app.services.catalogue export problems.jsonl
+    python -m app.services.catalogue import problems.jsonl --rejects rejects.jsonl
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from dataclasses import dataclass
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Optional, Union
+
+from pydantic import ValidationError
+from sqlalchemy import func, null, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DBAPIError
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.config import get_settings
+from app.database import engine
+from app.models.problem import Problem
+from app.schemas.problem import ProblemImport
+from app.services.stress_test import SpecError, validate_spec
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# A multi-row insert binds one parameter per column and row; PostgreSQL allows 32767
+MAX_BATCH_SIZE = 1000
+EXPORT_FIELDS = tuple(ProblemImport.model_fields)
+# Left as they are when an imported line has none, so re-importing an old
+# export does not drop ladders built since
+KEPT_IF_MISSING = ("hint_ladder", "hint_ladder_hash")
+
+# (line number, error, line text)
+RejectHandler = Callable[[int, str, str], Awaitable[None]]
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    upserted: int = 0
+    rejected: int = 0
+    batches: int = 0
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Split a byte stream (e.g. ``Request.stream()``) into lines."""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+
+def parse_line(text: str) -> dict:
+    """Column values of one JSONL line. Raises ValidationError or SpecError."""
+    problem = ProblemImport.model_validate_json(text)
+    if problem.stress_spec is not None:
+        validate_spec(problem.stress_spec)
+    values = problem.model_dump()
+    for name in KEPT_IF_MISSING:
+        if values[name] is None:
+            values[name] = null()  # SQL NULL, not JSON null, so COALESCE keeps the old value
+    return values
+
+
+def _validation_error(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'line'}: {error['msg']}"
+        for error in e.errors()
+    )
+
+
+def _upsert(rows: list[dict]):
+    stmt = insert(Problem).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=["slug"],
+        set_={
+            name: (
+                func.coalesce(stmt.excluded[name], getattr(Problem, name))
+                if name in KEPT_IF_MISSING else stmt.excluded[name]
+            )
+            for name in EXPORT_FIELDS
+            if name != "slug"
+        },
+    )
+
+
+async def _write_batch(
+    db: AsyncSession,
+    batch: list[tuple[int, str, dict]],
+    result: ImportResult,
+    reject: RejectHandler,
+):
+    result.batches += 1
+    try:
+        async with db.begin_nested():
+            await db.execute(_upsert([values for _, _, values in batch]))
+        result.upserted += len(batch)
+    except DBAPIError:
+        # Retry row by row to single out the lines the database refuses
+        for line_no, text, values in batch:
+            try:
+                async with db.begin_nested():
+                    await db.execute(_upsert([values]))
+                result.upserted += 1
+            except DBAPIError as e:
+                await reject(line_no, f"rejected by the database: {e.orig}", text)
+    await db.commit()
+
+
+async def import_lines(
+    db: AsyncSession,
+    lines: AsyncIterable[Union[bytes, str]],
+    batch_size: Optional[int] = None,
+    on_reject: Optional[RejectHandler] = None,
+) -> ImportResult:
+    """Upsert the problems in JSONL *lines* by slug; blank lines are skipped.
+
+    A slug repeated within a batch keeps its last line, as if the lines
+    had been applied in order.
+    """
+    batch_size = min(batch_size or settings.CATALOGUE_IMPORT_BATCH_SIZE, MAX_BATCH_SIZE)
+    result = ImportResult()
+
+    async def reject(line_no: int, error: str, text: str):
+        result.rejected += 1
+        if on_reject is not None:
+            await on_reject(line_no, error, text)
+
+    batch: dict[str, tuple[int, str, dict]] = {}
+    line_no = 0
+    async for raw in lines:
+        line_no += 1
+        if isinstance(raw, bytes):
+            try:
+                raw = raw.decode("utf-8")
+            except UnicodeDecodeError as e:
+                result.rows += 1
+                await reject(line_no, f"not UTF-8: {e}", raw.decode("utf-8", errors="replace"))
+                continue
+        text = raw.rstrip("\r\n")
+        if not text.strip():
+            continue
+        result.rows += 1
+        try:
+            values = parse_line(text)
+        except ValidationError as e:
+            await reject(line_no, _validation_error(e), text)
+            continue
+        except SpecError as e:
+            await reject(line_no, f"stress_spec: {e}", text)
+            continue
+        if batch.pop(values["slug"], None) is not None:
+            result.upserted += 1  # Superseded by this line
+        batch[values["slug"]] = (line_no, text, values)
+        if len(batch) >= batch_size:
+            await _write_batch(db, list(batch.values()), result, reject)
+            batch = {}
+    if batch:
+        await _write_batch(db, list(batch.values()), result, reject)
+    logger.info(
+        f"Imported {result.upserted} of {result.rows} problems in {result.batches} batches, "
+        f"{result.rejected} rejected"
+    )
+    return result
+
+
+async def export_lines(db: AsyncSession) -> AsyncIterator[str]:
+    """The catalogue as JSONL lines, read through a server-side cursor."""
+    result = await db.stream(
+        select(*(getattr(Problem, name) for name in EXPORT_FIELDS))
+        .order_by(Problem.id)
+        .execution_options(yield_per=settings.CATALOGUE_EXPORT_FETCH_SIZE)
+    )
+    async for row in result:
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + "\n"
+
+
+async def export_stream() -> AsyncIterator[str]:
+    """Response body for the export endpoint; uses its own session.
+
+    Lines are sent in chunks of CATALOGUE_EXPORT_FETCH_SIZE rows.
+    """
+    chunk = []
+    async with AsyncSession(engine) as db:
+        async for line in export_lines(db):
+            chunk.append(line)
+            if len(chunk) >= settings.CATALOGUE_EXPORT_FETCH_SIZE:
+                yield "".join(chunk)
+                chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+async def _file_lines(f) -> AsyncIterator[bytes]:
+    for line in f:
+        yield line
+
+
+async def export_file(path: str) -> int:
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        async with AsyncSession(engine) as db:
+            async for line in export_lines(db):
+                f.write(line)
+                count += 1
+    await engine.dispose()
+    return count
+
+
+async def import_file(path: str, rejects_path: str, batch_size: Optional[int] = None) -> ImportResult:
+    rejects = None
+
+    async def write_reject(line_no: int, error: str, text: str):
+        nonlocal rejects
+        if rejects is None:
+            rejects = open(rejects_path, "w", encoding="utf-8")
+        rejects.write(json.dumps({"line": line_no, "error": error, "row": text}, ensure_ascii=False) + "\n")
+
+    try:
+        with open(path, "rb") as f:
+            async with AsyncSession(engine) as db:
+                result = await import_lines(db, _file_lines(f), batch_size, write_reject)
+    finally:
+        if rejects is not None:
+            rejects.close()
+        await engine.dispose()
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import or export the problem catalogue as JSONL")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export")
+    export_parser.add_argument("path")
+    import_parser = commands.add_parser("import")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--rejects", default="rejects.jsonl", help="Written only if lines are rejected")
+    import_parser.add_argument("--batch-size", type=int, default=settings.CATALOGUE_IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "export":
+        print(f"Exported {asyncio.run(export_file(args.path))} problems to {args.path}")
+        sys.exit(0)
+    if not 1 <= args.batch_size <= MAX_BATCH_SIZE:
+        parser.error(f"--batch-size must be 1-{MAX_BATCH_SIZE}")
+    result = asyncio.run(import_file(args.path, args.rejects, args.batch_size))
+    if result.rejected:
+        print(f"{result.rejected} rejected lines written to {args.rejects}")
+    sys.exit(1 if result.rejected else 0)
@@ -0,0 +1,81 @@
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.config import get_settings
+from app.models.problem import Problem
+from app.schemas.chat import ChatRequest
+from app.services.arduino_sim import arduino_simulator
+from app.services.retrieval import format_snippets, retrieval_index
+from app.services.static_analysis import is_arduino_sketch
+
+settings = get_settings()
+
+# Snippets scoring below this cosine similarity are not worth the prompt tokens
+MIN_SNIPPET_SCORE = 0.15
+
+
+def retrieve_context(request: ChatRequest) -> str | None:
+    """Ground the tutor with the snippets most relevant to this message.
+
+    Returns None when the retrieval index has not been built or does not
+    cover the requested problem yet.
+    """
+    if not retrieval_index.available:
+        return None
+    
+    query = request.message
+    if request.code_context:
+        query += "\n" + request.code_context[:500]
+    
+    snippets = []
+    if request.problem_id:
+        # Never the solution to the problem the student is working on
+        snippets = retrieval_index.search(
+            query, k=2, problem_id=request.problem_id, kinds={"problem"}
+        )
+        if not snippets:
+            return None
+    snippets += retrieval_index.search(
+        query,
+        k=settings.RETRIEVAL_TOP_K,
+        track=request.track,
+        kinds={"note"} if request.problem_id else None,
+        min_score=MIN_SNIPPET_SCORE
+    )
+    if not snippets:
+        return None
+    return (
+        "Reference material (guide the student with it; "
+        "do not paste reference solutions verbatim):\n"
+        + format_snippets(snippets)
+    )
+
+
+def problem_statement_context(problem: Problem) -> str:
+    return f"Title: {problem.title_en}\n{problem.desc_en}"
+
+
+async def build_problem_context(request: ChatRequest, db: AsyncSession) -> str | None:
+    """Retrieved snippets, falling back to the problem's full statement."""
+    context = retrieve_context(request)
+    if context is not None or not request.problem_id:
+        return context
+    
+    result = await db.execute(
+        select(Problem).where(Problem.id == request.problem_id)
+    )
+    problem = result.scalar_one_or_none()
+    return problem_statement_context(problem) if problem else None
+
+
+async def simulation_context(request: ChatRequest) -> str | None:
+    """What the student's Arduino sketch actually does, for the robotics tutor."""
+    if (
+        request.track != "robotics"
+        or not settings.ARDUINO_SIM_ENABLED
+        or not request.code_context
+        or not is_arduino_sketch(request.code_context)
+    ):
+        return None
+    result = await arduino_simulator.run(request.code_context, settings.ARDUINO_SIM_CHAT_SECONDS)
+    return result.summary() or None
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+from typing import Optional
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import engine
+from app.models.chat_history import ChatHistory
+from app.models.problem import Problem
+from app.models.user import User
+from app.routers.auth import decode_user_id
+from app.schemas.chat import ChatRequest
+from app.services.chat_context import problem_statement_context, retrieve_context
+
+logger = logging.getLogger(__name__)
+
+# Messages kept per chat history, matching the HTTP endpoint
+HISTORY_LIMIT = 50
+# New messages buffered before they are written back in one transaction
+PERSIST_BATCH_MESSAGES = 6
+
+
+class ChatSession:
+    """Per-connection state for the WebSocket chat channel.
+
+    The user is authenticated and the history loaded once when the socket
+    opens; problems are fetched at most once per connection. New messages
+    are buffered and persisted in batches by background tasks, so a turn
+    only waits for the model.
+    """
+
+    def __init__(self, user: Optional[User], track: str, history: list):
+        self.user = user
+        self.track = track
+        self.history = history
+        self.pending: list[dict] = []
+        self._problems: dict[int, Optional[Problem]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._tasks: set[asyncio.Task] = set()
+
+    @classmethod
+    async def open(cls, token: Optional[str], track: str) -> "ChatSession":
+        user = None
+        history = []
+        user_id = decode_user_id(token) if token else None
+        if user_id is None:
+            return cls(None, track, history)
+
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            result = await db.execute(select(User).where(User.id == user_id))
+            user = result.scalar_one_or_none()
+            if user:
+                result = await db.execute(
+                    select(ChatHistory.messages).where(
+                        ChatHistory.user_id == user.id,
+                        ChatHistory.track == track
+                    ).order_by(ChatHistory.updated_at.desc()).limit(1)
+                )
+                history = list(result.scalar_one_or_none() or [])
+        return cls(user, track, history)
+
+    async def problem_context(self, request: ChatRequest) -> Optional[str]:
+        context = retrieve_context(request)
+        if context is not None or not request.problem_id:
+            return context
+
+        if request.problem_id not in self._problems:
+            async with AsyncSession(engine) as db:
+                result = await db.execute(
+                    select(Problem).where(Problem.id == request.problem_id)
+                )
+                self._problems[request.problem_id] = result.scalar_one_or_none()
+        problem = self._problems[request.problem_id]
+        return problem_statement_context(problem) if problem else None
+
+    def record_turn(self, user_message: str, assistant_message: str):
+        turn = [
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": assistant_message},
+        ]
+        self.history = (self.history + turn)[-HISTORY_LIMIT:]
+        if self.user is None:
+            return
+        self.pending.extend(turn)
+        if len(self.pending) >= PERSIST_BATCH_MESSAGES:
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        task = asyncio.create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self):
+        """Append buffered messages to the stored history."""
+        async with self._flush_lock:
+            if not self.pending or self.user is None:
+                return
+            batch, self.pending = self.pending, []
+            try:
+                async with AsyncSession(engine, expire_on_commit=False) as db:
+                    result = await db.execute(
+                        select(ChatHistory).where(
+                            ChatHistory.user_id == self.user.id,
+                            ChatHistory.track == self.track
+                        ).order_by(ChatHistory.updated_at.desc()).limit(1).with_for_update()
+                    )
+                    chat_history = result.scalar_one_or_none()
+                    if not chat_history:
+                        chat_history = ChatHistory(
+                            user_id=self.user.id,
+                            track=self.track,
+                            messages=[]
+                        )
+                        db.add(chat_history)
+                    messages = list(chat_history.messages) + batch
+                    chat_history.messages = messages[-HISTORY_LIMIT:]
+                    await db.commit()
+            except Exception as e:
+                logger.error(f"Failed to persist chat history: {e}")
+                self.pending = batch + self.pending
+
+    async def close(self):
+        """Persist whatever is still buffered; called when the socket closes."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush()
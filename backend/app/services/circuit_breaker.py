@@ -0,0 +1,138 @@
+import logging
+import time
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Token of every call admitted while closed
+_CLOSED_CALL = object()
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose breaker is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is temporarily unavailable")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Count-based circuit breaker for one upstream operation.
+
+    The outcomes of the last *window* calls are kept; calls slower than
+    *slow_call_seconds* count as failures. Once at least *min_calls* have
+    been seen and the failure ratio reaches *failure_ratio*, the breaker
+    opens and calls fail fast for *reset_seconds*. It then lets a single
+    probe through (half-open): success closes it, failure re-opens it.
+
+    :meth:`allow` returns a token that the call's :meth:`record` or
+    :meth:`release` passes back, so only the probe itself decides the
+    half-open state; calls admitted before the breaker opened and
+    finishing later are ignored until it closes again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_ratio: float = 0.5,
+        slow_call_seconds: float = 30.0,
+        reset_seconds: float = 30.0,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_seconds = reset_seconds
+
+        self.state = CLOSED
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._opened_at: Optional[float] = None
+        self._probe: Optional[object] = None  # Token of the half-open probe in flight
+
+        # Counters exposed through stats()
+        self.times_opened = 0
+        self.rejected = 0
+
+    def _transition(self, state: str):
+        if state != self.state:
+            logger.warning(f"Circuit breaker {self.name}: {self.state} -> {state}")
+            self.state = state
+
+    @property
+    def retry_after(self) -> float:
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> Optional[object]:
+        """A token for a call that may go ahead now, or None.
+
+        Admitted calls must be recorded or released with their token.
+        """
+        if self.state == OPEN and self.retry_after == 0:
+            self._transition(HALF_OPEN)
+        if self.state == CLOSED:
+            return _CLOSED_CALL
+        if self.state == HALF_OPEN and self._probe is None:
+            self._probe = object()
+            return self._probe
+        self.rejected += 1
+        return None
+
+    def check(self) -> object:
+        """Like :meth:`allow` but raises :class:`CircuitOpenError`."""
+        token = self.allow()
+        if token is None:
+            raise CircuitOpenError(self.name, self.retry_after or self.reset_seconds)
+        return token
+
+    def release(self, token: object):
+        """End an admitted call without an outcome, e.g. one that was cancelled."""
+        if token is self._probe:
+            self._probe = None
+
+    def record(self, token: object, success: bool, duration: float = 0.0):
+        success = success and duration < self.slow_call_seconds
+        if token is self._probe and token is not None:
+            self._probe = None
+            if success:
+                self._outcomes.clear()
+                self._opened_at = None
+                self._transition(CLOSED)
+            else:
+                self._open()
+            return
+        if self.state != CLOSED:
+            return  # A straggler from before the breaker opened
+
+        self._outcomes.append(success)
+        failures = self._outcomes.count(False)
+        if (
+            len(self._outcomes) >= self.min_calls
+            and failures / len(self._outcomes) >= self.failure_ratio
+        ):
+            self._open()
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+        self._transition(OPEN)
+
+    def stats(self) -> dict:
+        calls = len(self._outcomes)
+        return {
+            "state": self.state,
+            "failure_ratio": self._outcomes.count(False) / calls if calls else 0.0,
+            "calls": calls,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "retry_after": round(self.retry_after, 1),
+        }
@@ -0,0 +1,174 @@
+"""The student's code across chat turns.
+
+While debugging, students ask many questions about slightly edited
+versions of the same program. Clients may send ``code_diff``, a unified
+diff against ``code_base`` (the ``code_version`` of the previous reply),
+instead of the whole ``code_context``; lines are the code split on
+``"\\n"`` (``difflib.unified_diff(old.split("\\n"), new.split("\\n"),
+lineterm="")`` produces a valid diff, and an empty diff means unchanged).
+The server keeps the last code per caller and track to apply it to.
+
+Diffs only save upload size: the chat prompt always holds the whole
+reconstructed program, since the model keeps no history of earlier turns.
+"""
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from app.config import get_settings
+from app.redis_client import get_redis
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "code_context"
+# Sessions kept per worker without Redis
+LOCAL_CAPACITY = 4096
+
+_HUNK_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+_HEADER_PREFIXES = ("--- ", "+++ ", "diff ", "index ", "\\")
+
+
+class DiffError(ValueError):
+    """The diff is malformed or does not apply to the base code."""
+
+
+class StaleCodeBase(Exception):
+    """The diff's base is not the code the server holds for the session."""
+
+
+def code_version(code: str) -> str:
+    """Short content hash identifying a version of the code."""
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()[:12]
+
+
+def apply_diff(base: str, diff: str) -> str:
+    """Apply unified *diff* to *base*; raises DiffError if it doesn't match."""
+    old = base.split("\n")
+    lines = diff.split("\n")
+    out: list[str] = []
+    pos = 0
+    i = 0
+    while i < len(lines):
+        header = lines[i]
+        i += 1
+        match = _HUNK_RE.match(header)
+        if not match:
+            if not header.strip() or header.startswith(_HEADER_PREFIXES):
+                continue
+            raise DiffError(f"Unexpected line {i} in diff: {header[:40]!r}")
+        old_start = int(match[1])
+        old_count = int(match[2]) if match[2] is not None else 1
+        new_count = int(match[4]) if match[4] is not None else 1
+        # A hunk that removes nothing names the line it inserts after
+        start = old_start - 1 if old_count else old_start
+        if start < pos or start > len(old):
+            raise DiffError(f"Hunk at line {old_start} is out of order or out of range")
+        out.extend(old[pos:start])
+        pos = start
+
+        seen_old = seen_new = 0
+        while seen_old < old_count or seen_new < new_count:
+            if i >= len(lines):
+                raise DiffError(f"Hunk at line {old_start} is truncated")
+            line = lines[i]
+            i += 1
+            tag, text = (line[:1], line[1:]) if line else (" ", "")
+            if tag == "\\":
+                continue
+            if tag in " -":
+                if pos >= len(old) or old[pos] != text:
+                    raise DiffError(f"Diff does not match line {pos + 1} of the base code")
+                pos += 1
+                seen_old += 1
+                if tag == " ":
+                    out.append(text)
+                    seen_new += 1
+            elif tag == "+":
+                out.append(text)
+                seen_new += 1
+            else:
+                raise DiffError(f"Unexpected line {i} in diff: {line[:40]!r}")
+        if seen_old != old_count or seen_new != new_count:
+            raise DiffError(f"Hunk at line {old_start} does not match its line counts")
+    out.extend(old[pos:])
+    return "\n".join(out)
+
+
+@dataclass
+class ResolvedCode:
+    code: Optional[str]
+    version: Optional[str]
+
+
+class CodeContextStore:
+    """Last code sent by each caller per chat track.
+
+    Kept in Redis when REDIS_URL is configured so any worker can apply the
+    next diff, per worker otherwise; entries expire after
+    CHAT_CODE_TTL_SECONDS.
+    """
+
+    def __init__(self):
+        self._local: OrderedDict[str, tuple[str, float]] = OrderedDict()
+
+    @staticmethod
+    def _key(identity: str, track: str) -> str:
+        return f"{KEY_PREFIX}:{identity}:{track}"
+
+    async def _get(self, key: str) -> Optional[str]:
+        redis = get_redis()
+        if redis is not None:
+            try:
+                return await redis.get(key)
+            except Exception as e:
+                logger.warning(f"Code context lookup failed, using local copy: {e}")
+        code, expires_at = self._local.get(key, (None, 0.0))
+        return code if expires_at > time.time() else None
+
+    async def _set(self, key: str, code: str):
+        redis = get_redis()
+        if redis is not None:
+            try:
+                await redis.set(key, code, ex=settings.CHAT_CODE_TTL_SECONDS)
+                return
+            except Exception as e:
+                logger.warning(f"Code context store failed, keeping it locally: {e}")
+        self._local[key] = (code, time.time() + settings.CHAT_CODE_TTL_SECONDS)
+        self._local.move_to_end(key)
+        while len(self._local) > LOCAL_CAPACITY:
+            self._local.popitem(last=False)
+
+    async def resolve(
+        self,
+        identity: str,
+        track: str,
+        code_context: Optional[str],
+        code_diff: Optional[str] = None,
+        code_base: Optional[str] = None,
+    ) -> ResolvedCode:
+        """The full code of this turn, from *code_context* or *code_diff*.
+
+        Raises StaleCodeBase when a diff's base is not the stored code and
+        DiffError when the diff does not apply; the client should resend
+        the full code either way.
+        """
+        if code_context is None and code_diff is None:
+            return ResolvedCode(None, None)
+        key = self._key(identity, track)
+        previous = await self._get(key)
+        if code_diff is not None:
+            if previous is None or code_version(previous) != code_base:
+                raise StaleCodeBase()
+            code = apply_diff(previous, code_diff)
+        else:
+            code = code_context
+        await self._set(key, code)  # also refreshes the expiry
+        return ResolvedCode(code=code, version=code_version(code))
+
+
+code_context_store = CodeContextStore()
@@ -0,0 +1,189 @@
+"""Reusable explanations of g++ compile errors.
+
+Beginners hit the same few compiler errors over and over. Each diagnostic
+is normalized into a signature: the message with quoted identifiers
+replaced by ``{0}``, ``{1}``… and the line number dropped. The model
+explains a signature once, in English and Arabic, using the same
+placeholders. Later submissions fill the template with their own
+identifiers, with no LLM call.
+"""
+import asyncio
+import json
+import logging
+import re
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from app.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY = "diagnostic_explanations"
+# Signatures kept in each worker's memory in front of Redis
+LOCAL_CACHE_SIZE = 1024
+# Errors explained per verdict; later errors are usually caused by the first
+MAX_EXPLAINED = 3
+
+_LINE_RE = re.compile(r"^line (\d+): (.*)$")
+# g++ quotes names with ‘…’ (UTF-8 locales) or '…' (C locale)
+_QUOTED_RE = re.compile(r"‘([^’]*)’|'([^']*)'")
+_PLACEHOLDER_RE = re.compile(r"\{(\d+)\}")
+
+
+def diagnostic_signature(message: str) -> tuple[str, list[str]]:
+    """Split a diagnostic into its template and the identifiers it names.
+
+    Quoted text containing letters or digits becomes ``{n}``; quoted
+    punctuation (``expected ‘;’``) stays part of the signature because it
+    changes what the error means.
+    """
+    args: list[str] = []
+
+    def placeholder(match: re.Match) -> str:
+        text = match.group(1) if match.group(1) is not None else match.group(2)
+        if not re.search(r"\w", text):
+            return f"‘{text}’"
+        args.append(text)
+        return f"‘{{{len(args) - 1}}}’"
+
+    return _QUOTED_RE.sub(placeholder, message.strip()), args
+
+
+def fill_template(template: str, args: list[str]) -> str:
+    """Substitute ``{n}`` placeholders, leaving any other braces untouched."""
+    return _PLACEHOLDER_RE.sub(
+        lambda m: args[int(m.group(1))] if int(m.group(1)) < len(args) else m.group(0),
+        template,
+    )
+
+
+def valid_explanation(explanation, arg_count: int) -> bool:
+    if not isinstance(explanation, dict):
+        return False
+    for lang in ("en", "ar"):
+        text = explanation.get(lang)
+        if not isinstance(text, str) or not text.strip():
+            return False
+        if any(int(n) >= arg_count for n in _PLACEHOLDER_RE.findall(text)):
+            return False
+    return True
+
+
+class ExplanationCache:
+    """Signature -> bilingual explanation template, shared through Redis.
+
+    A per-worker LRU sits in front of the Redis hash; without REDIS_URL
+    it is the only store. Concurrent misses on one signature share a
+    single generation.
+    """
+
+    def __init__(self):
+        self._local: OrderedDict[str, dict] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, signature: str, explanation: dict):
+        self._local[signature] = explanation
+        self._local.move_to_end(signature)
+        while len(self._local) > LOCAL_CACHE_SIZE:
+            self._local.popitem(last=False)
+
+    async def _load(self, signature: str) -> Optional[dict]:
+        if signature in self._local:
+            self._local.move_to_end(signature)
+            return self._local[signature]
+        redis = get_redis()
+        if redis is None:
+            return None
+        try:
+            stored = await redis.hget(REDIS_KEY, signature)
+        except Exception as e:
+            logger.warning(f"Diagnostic explanation lookup failed: {e}")
+            return None
+        if stored is None:
+            return None
+        explanation = json.loads(stored)
+        self._remember(signature, explanation)
+        return explanation
+
+    async def _store(self, signature: str, explanation: dict):
+        self._remember(signature, explanation)
+        redis = get_redis()
+        if redis is not None:
+            try:
+                await redis.hset(REDIS_KEY, signature, json.dumps(explanation, ensure_ascii=False))
+            except Exception as e:
+                logger.warning(f"Diagnostic explanation store failed: {e}")
+
+    async def template(
+        self,
+        signature: str,
+        arg_count: int,
+        generate: Callable[[str], Awaitable[dict]],
+    ) -> Optional[dict]:
+        """The explanation template for *signature*, generating it on a miss.
+
+        Returns None when the model is unavailable or answers with an
+        unusable template; nothing is cached in that case.
+        """
+        explanation = await self._load(signature)
+        if explanation is not None:
+            self.hits += 1
+            return explanation
+        self.misses += 1
+
+        if signature in self._inflight:
+            return await asyncio.shield(self._inflight[signature])
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[signature] = future
+        explanation = None
+        try:
+            explanation = await generate(signature)
+            if not valid_explanation(explanation, arg_count):
+                logger.warning(f"Discarding unusable explanation for {signature!r}")
+                explanation = None
+            else:
+                explanation = {"en": explanation["en"], "ar": explanation["ar"]}
+                await self._store(signature, explanation)
+        except Exception as e:
+            logger.warning(f"Could not explain diagnostic {signature!r}: {e}")
+        finally:
+            future.set_result(explanation)
+            del self._inflight[signature]
+        return explanation
+
+    async def explain(
+        self,
+        errors: list[str],
+        generate: Callable[[str], Awaitable[dict]],
+    ) -> list[dict]:
+        """Explain ``"line N: message"`` diagnostics from static analysis.
+
+        Each item has ``line``, ``message`` and, when a template is
+        available, the filled-in ``en`` and ``ar`` explanations.
+        """
+        explained = []
+        for error in errors[:MAX_EXPLAINED]:
+            match = _LINE_RE.match(error)
+            line, message = (int(match.group(1)), match.group(2)) if match else (None, error)
+            signature, args = diagnostic_signature(message)
+            item = {"line": line, "message": message}
+            explanation = await self.template(signature, len(args), generate)
+            if explanation is not None:
+                item["en"] = fill_template(explanation["en"], args)
+                item["ar"] = fill_template(explanation["ar"], args)
+            explained.append(item)
+        return explained
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "local_entries": len(self._local),
+        }
+
+
+explanation_cache = ExplanationCache()
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+
+from sqlalchemy import text
+
+from app.config import get_settings
+from app.database import engine, pool_headroom
+from app.middleware.admission import admission
+from app.redis_client import get_redis
+from app.services.ai_service import ai_service
+from app.services.circuit_breaker import OPEN
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Seconds each dependency gets to answer a readiness probe
+CHECK_TIMEOUT = 2.0
+
+
+async def _check_database() -> dict:
+    headroom = pool_headroom()
+    if headroom < settings.READY_MIN_DB_HEADROOM:
+        return {"ok": False, "headroom": headroom, "error": "connection pool exhausted"}
+    try:
+        async with engine.connect() as conn:
+            await asyncio.wait_for(conn.execute(text("SELECT 1")), CHECK_TIMEOUT)
+    except Exception as e:
+        return {"ok": False, "headroom": headroom, "error": str(e) or type(e).__name__}
+    return {"ok": True, "headroom": headroom}
+
+
+async def _check_redis() -> dict:
+    redis = get_redis()
+    if redis is None:
+        return {"ok": True, "enabled": False}
+    try:
+        await asyncio.wait_for(redis.ping(), CHECK_TIMEOUT)
+    except Exception as e:
+        return {"ok": False, "enabled": True, "error": str(e) or type(e).__name__}
+    return {"ok": True, "enabled": True}
+
+
+def _check_ai() -> dict:
+    breakers = ai_service.breaker_stats()
+    all_open = all(breaker["state"] == OPEN for breaker in breakers.values())
+    return {
+        # Open breakers alone are served in degraded mode; only report
+        # not-ready when every AI path is down or the worker is saturated
+        "ok": not admission.saturated and not all_open,
+        "configured": bool(settings.final_gemini_key),
+        **admission.stats(),
+        "breakers": breakers,
+    }
+
+
+async def readiness() -> tuple[bool, dict]:
+    """Run every readiness check; returns (ready, per-check details)."""
+    database, redis = await asyncio.gather(_check_database(), _check_redis())
+    checks = {"database": database, "redis": redis, "ai": _check_ai()}
+    ready = all(check["ok"] for check in checks.values())
+    if not ready:
+        failing = [name for name, check in checks.items() if not check["ok"]]
+        logger.warning(f"Not ready: {', '.join(failing)} failing")
+    return ready, checks
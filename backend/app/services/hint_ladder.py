@@ -0,0 +1,105 @@
+"""Per-problem hint ladders.
+
+Instead of asking Gemini for a fresh hint on every failed submission,
+each problem stores a ladder of progressively stronger hints in English
+and Arabic, generated once. A student's ``hint_level`` on the problem,
+advanced by each failed verdict (``stats_service.HINTED_STATUSES``),
+picks the rung, so hints are served from the DB with no LLM call.
+
+A ladder is valid while its hash matches the problem's fingerprint.
+Missing or stale ladders are generated in the background; until one is
+stored, grading asks the model for a hint as before.
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy import update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.config import get_settings
+from app.database import engine
+from app.models.problem import Problem
+from app.services.ai_service import ai_service
+from app.services.verdict_cache import problem_fingerprint
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class HintLadders:
+    """Serves hint ladder rungs and keeps ladders in step with their problems.
+
+    Generation is deduplicated per worker; two workers may occasionally
+    both generate a new problem's ladder, and the last one stored wins.
+    """
+
+    def __init__(self):
+        self._generating: dict[int, asyncio.Task] = {}
+
+    @staticmethod
+    def current(problem: Problem) -> Optional[list[dict]]:
+        """The problem's ladder, or None if it has none or it is stale."""
+        if (
+            not settings.HINT_LADDERS_ENABLED
+            or not problem.hint_ladder
+            or problem.hint_ladder_hash != problem_fingerprint(problem)
+        ):
+            return None
+        return problem.hint_ladder
+
+    @staticmethod
+    def rung(ladder: list[dict], level: int) -> dict:
+        """Hint for a student at *level* (1 = first failure); the last rung repeats."""
+        return ladder[min(max(level, 1), len(ladder)) - 1]
+
+    def ensure(self, problem: Problem):
+        """Generate the problem's ladder in the background unless it is current."""
+        if (
+            not settings.HINT_LADDERS_ENABLED
+            or problem.id is None
+            or problem.id in self._generating
+            or self.current(problem) is not None
+        ):
+            return
+        task = asyncio.create_task(self._generate(problem.id))
+        self._generating[problem.id] = task
+        task.add_done_callback(lambda _: self._generating.pop(problem.id, None))
+
+    async def _generate(self, problem_id: int):
+        # Short sessions on both sides: no transaction stays open during the LLM call
+        async with AsyncSession(engine) as db:
+            problem = await db.get(Problem, problem_id)
+        if problem is None or self.current(problem) is not None:
+            return
+        fingerprint = problem_fingerprint(problem)
+        try:
+            ladder = await ai_service.generate_hint_ladder(
+                problem_desc=problem.desc_en,
+                constraints=problem.constraints,
+                sample_io=problem.sample_io,
+                input_format=problem.input_format,
+                output_format=problem.output_format,
+                reference_solution=problem.reference_solution,
+                problem_id=problem.id,
+            )
+        except Exception as e:
+            logger.warning(f"Hint ladder generation for problem {problem_id} failed: {e}")
+            return
+        # Stored with the fingerprint it was generated from: if the problem
+        # was edited meanwhile, the ladder is already stale and regenerated
+        async with AsyncSession(engine) as db:
+            await db.execute(
+                update(Problem)
+                .where(Problem.id == problem_id)
+                .values(hint_ladder=ladder, hint_ladder_hash=fingerprint)
+            )
+            await db.commit()
+        logger.info(f"Stored a {len(ladder)}-hint ladder for problem {problem_id}")
+
+    def shutdown(self):
+        for task in list(self._generating.values()):
+            task.cancel()
+
+
+hint_ladders = HintLadders()
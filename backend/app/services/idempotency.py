@@ -0,0 +1,262 @@
+"""Idempotency keys for the AI-backed POST routes.
+
+A client may send ``Idempotency-Key: <unique string>`` with a request it
+might repeat (double-clicks, proxy retries on timeout). The first request
+with a key does the work; repeats with the same key and body either join
+it while it is still running or get its stored response, so they cost no
+Gemini call and persist no second row. Reusing a key with a different
+body is rejected with 422.
+
+Keys are scoped to the caller and route. Responses are kept for
+IDEMPOTENCY_TTL_SECONDS in Redis when REDIS_URL is configured, so repeats
+landing on another worker are absorbed too, and per worker otherwise.
+Failed requests, and responses the route marks as not replayable (e.g.
+a grading error telling the student to resubmit), are not stored;
+retrying them runs them again.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import Header, HTTPException, Request, status
+from fastapi.encoders import jsonable_encoder
+
+from app.config import get_settings
+from app.middleware.rate_limit import client_identity
+from app.redis_client import get_redis
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "idempotency"
+MAX_KEY_LENGTH = 255
+REPLAY_HEADER = "Idempotent-Replayed"
+# How often a repeat polls Redis while another worker runs the original
+POLL_SECONDS = 0.25
+
+
+@dataclass
+class IdempotencyKey:
+    value: str
+    scope: str  # "<route>:<caller identity>"
+
+    @property
+    def storage_key(self) -> str:
+        return f"{KEY_PREFIX}:{self.scope}:{self.value}"
+
+
+async def idempotency_key(
+    request: Request,
+    key: Optional[str] = Header(None, alias="Idempotency-Key"),
+) -> Optional[IdempotencyKey]:
+    """Dependency: the request's Idempotency-Key, scoped to caller and route."""
+    if key is None:
+        return None
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters",
+        )
+    headers = {name.lower(): value for name, value in request.headers.items()}
+    identity = client_identity(headers, request.client)
+    return IdempotencyKey(key, f"{request.url.path}:{identity}")
+
+
+def payload_fingerprint(payload: Any) -> str:
+    """SHA-256 of the request body, to tell a repeat from a key reused for new work."""
+    encoded = json.dumps(jsonable_encoder(payload), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class InMemoryRecords:
+    """Expiring idempotency records local to the worker (Redis-less setups)."""
+
+    def __init__(self):
+        self._records: dict[str, tuple[dict, float]] = {}
+
+    def _get(self, key: str, now: float) -> Optional[dict]:
+        record, expires_at = self._records.get(key, (None, 0.0))
+        return record if expires_at > now else None
+
+    async def claim(self, key: str, record: dict, ttl: int) -> Optional[dict]:
+        """Store *record* unless the key is taken; returns the existing record."""
+        now = time.time()
+        if len(self._records) > 10000:
+            self._records = {k: v for k, v in self._records.items() if v[1] > now}
+        existing = self._get(key, now)
+        if existing is not None:
+            return existing
+        self._records[key] = (record, now + ttl)
+        return None
+
+    async def get(self, key: str) -> Optional[dict]:
+        return self._get(key, time.time())
+
+    async def put(self, key: str, record: dict, ttl: int):
+        self._records[key] = (record, time.time() + ttl)
+
+    async def delete(self, key: str):
+        self._records.pop(key, None)
+
+
+class RedisRecords:
+    """Expiring idempotency records in Redis, shared by all workers."""
+
+    def __init__(self, redis):
+        self.redis = redis
+
+    async def claim(self, key: str, record: dict, ttl: int) -> Optional[dict]:
+        if await self.redis.set(key, json.dumps(record), nx=True, ex=ttl):
+            return None
+        existing = await self.get(key)
+        if existing is None:  # expired in between; try once more
+            if await self.redis.set(key, json.dumps(record), nx=True, ex=ttl):
+                return None
+            existing = await self.get(key)
+        return existing
+
+    async def get(self, key: str) -> Optional[dict]:
+        raw = await self.redis.get(key)
+        return json.loads(raw) if raw else None
+
+    async def put(self, key: str, record: dict, ttl: int):
+        await self.redis.set(key, json.dumps(record), ex=ttl)
+
+    async def delete(self, key: str):
+        await self.redis.delete(key)
+
+
+@dataclass
+class _InFlight:
+    fingerprint: str
+    future: asyncio.Future
+
+
+class IdempotencyStore:
+    """Runs each keyed request once and replays its response to repeats.
+
+    Repeats on the same worker await the original's future directly;
+    repeats on other workers find a "pending" record in Redis and poll
+    for the "done" one. A pending record expires after
+    IDEMPOTENCY_LOCK_SECONDS, so a worker dying mid-request does not block
+    the key for the whole TTL.
+    """
+
+    def __init__(self):
+        self._memory = InMemoryRecords()
+        self._inflight: dict[str, _InFlight] = {}
+
+    @property
+    def records(self):
+        redis = get_redis()
+        if redis is None:
+            return self._memory
+        return RedisRecords(redis)
+
+    async def _call(self, op: str, *args):
+        try:
+            return await getattr(self.records, op)(*args)
+        except Exception as e:
+            logger.warning(f"Idempotency record {op} failed, using local records: {e}")
+            return await getattr(self._memory, op)(*args)
+
+    @staticmethod
+    def _check_fingerprint(record_fingerprint: str, fingerprint: str):
+        if record_fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used with a different request body",
+            )
+
+    @staticmethod
+    def _still_running() -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is still being processed",
+            headers={"Retry-After": "1"},
+        )
+
+    async def _join(self, inflight: _InFlight) -> Any:
+        try:
+            return await asyncio.shield(inflight.future)
+        except asyncio.CancelledError:
+            if inflight.future.cancelled():  # the original request went away
+                raise self._still_running()
+            raise
+
+    async def run(
+        self,
+        key: Optional[IdempotencyKey],
+        payload: Any,
+        handler: Callable[[], Awaitable[Any]],
+        replayable: Callable[[Any], bool] = lambda response: True,
+    ) -> tuple[Any, bool]:
+        """Run *handler* once per key. Returns (JSON-able response, replayed).
+
+        Repeats already waiting get the response either way, but it is only
+        stored for later repeats if ``replayable(response)`` holds.
+        """
+        if key is None:
+            return await handler(), False
+        storage_key = key.storage_key
+        fingerprint = payload_fingerprint(payload)
+
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            inflight = self._inflight.get(storage_key)
+            if inflight is not None:
+                self._check_fingerprint(inflight.fingerprint, fingerprint)
+                return await self._join(inflight), True
+
+            record = await self._call(
+                "claim",
+                storage_key,
+                {"fingerprint": fingerprint, "state": "pending"},
+                settings.IDEMPOTENCY_LOCK_SECONDS,
+            )
+            if record is None:
+                break
+            self._check_fingerprint(record["fingerprint"], fingerprint)
+            if record["state"] == "done":
+                return record["response"], True
+            # Another worker is running it
+            if time.monotonic() >= deadline:
+                raise self._still_running()
+            await asyncio.sleep(POLL_SECONDS)
+
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may be joining; don't warn about an unretrieved exception
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[storage_key] = _InFlight(fingerprint, future)
+        try:
+            response = jsonable_encoder(await handler())
+        except asyncio.CancelledError:
+            future.cancel()
+            await self._call("delete", storage_key)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            await self._call("delete", storage_key)
+            raise
+        else:
+            if replayable(response):
+                await self._call(
+                    "put",
+                    storage_key,
+                    {"fingerprint": fingerprint, "state": "done", "response": response},
+                    settings.IDEMPOTENCY_TTL_SECONDS,
+                )
+            else:
+                await self._call("delete", storage_key)
+            future.set_result(response)
+            return response, False
+        finally:
+            del self._inflight[storage_key]
+
+
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,179 @@
+import bisect
+import logging
+from typing import Optional
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.problem import Problem
+from app.models.user_problem_stats import UserProblemStats
+from app.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "leaderboard"
+
+# Points awarded the first time a user solves a problem
+DIFFICULTY_POINTS = {"Easy": 1, "Medium": 2, "Hard": 3}
+
+
+def global_board() -> str:
+    return "global"
+
+
+def topic_board(topic: str) -> str:
+    return f"topic:{topic}"
+
+
+def problem_points(difficulty: str) -> int:
+    return DIFFICULTY_POINTS.get(difficulty, 1)
+
+
+class InMemoryLeaderboardStore:
+    """Sorted-set store kept in process memory (tests and Redis-less setups).
+
+    Each board keeps a list of ``(-score, member)`` in sorted order, so rank
+    lookups are a binary search; updates shift the list.
+    """
+
+    def __init__(self):
+        self._scores: dict[str, dict[str, float]] = {}
+        self._sorted: dict[str, list[tuple[float, str]]] = {}
+
+    async def incr(self, board: str, member: str, amount: float) -> float:
+        scores = self._scores.setdefault(board, {})
+        entries = self._sorted.setdefault(board, [])
+        old = scores.get(member)
+        if old is not None:
+            del entries[bisect.bisect_left(entries, (-old, member))]
+        new = (old or 0) + amount
+        scores[member] = new
+        bisect.insort(entries, (-new, member))
+        return new
+
+    async def rank(self, board: str, member: str) -> Optional[tuple[int, float]]:
+        score = self._scores.get(board, {}).get(member)
+        if score is None:
+            return None
+        return bisect.bisect_left(self._sorted[board], (-score, member)), score
+
+    async def top(self, board: str, offset: int, limit: int) -> list[tuple[str, float]]:
+        entries = self._sorted.get(board, [])
+        return [(member, -neg) for neg, member in entries[offset:offset + limit]]
+
+    async def size(self, board: str) -> int:
+        return len(self._scores.get(board, {}))
+
+    async def replace_all(self, boards: dict[str, dict[str, float]]):
+        self._scores = {board: dict(scores) for board, scores in boards.items()}
+        self._sorted = {
+            board: sorted((-score, member) for member, score in scores.items())
+            for board, scores in boards.items()
+        }
+
+
+class RedisLeaderboardStore:
+    """Sorted-set store backed by Redis ZSETs, shared by all workers."""
+
+    def __init__(self, redis):
+        self.redis = redis
+
+    def _key(self, board: str) -> str:
+        return f"{KEY_PREFIX}:{board}"
+
+    async def incr(self, board: str, member: str, amount: float) -> float:
+        return await self.redis.zincrby(self._key(board), amount, member)
+
+    async def rank(self, board: str, member: str) -> Optional[tuple[int, float]]:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zrevrank(self._key(board), member)
+            pipe.zscore(self._key(board), member)
+            rank, score = await pipe.execute()
+        if rank is None:
+            return None
+        return rank, score
+
+    async def top(self, board: str, offset: int, limit: int) -> list[tuple[str, float]]:
+        return await self.redis.zrevrange(
+            self._key(board), offset, offset + limit - 1, withscores=True
+        )
+
+    async def size(self, board: str) -> int:
+        return await self.redis.zcard(self._key(board))
+
+    async def replace_all(self, boards: dict[str, dict[str, float]]):
+        # Build every board under a temporary key and swap it in atomically
+        async with self.redis.pipeline(transaction=True) as pipe:
+            stale = [key async for key in self.redis.scan_iter(f"{KEY_PREFIX}:*")]
+            for board, scores in boards.items():
+                tmp = self._key(board) + ":rebuild"
+                pipe.delete(tmp)
+                if scores:
+                    pipe.zadd(tmp, scores)
+                    pipe.rename(tmp, self._key(board))
+            rebuilt = {self._key(board) for board, scores in boards.items() if scores}
+            for key in stale:
+                if key not in rebuilt:
+                    pipe.delete(key)
+            await pipe.execute()
+
+
+class LeaderboardService:
+    """Global and per-topic rankings fed by first-time ACCEPTED submissions.
+
+    Uses Redis sorted sets when REDIS_URL is configured, so rank lookups are
+    O(log n) and pages of the top-N never touch Postgres; otherwise falls
+    back to an in-memory store local to the worker.
+    """
+
+    def __init__(self):
+        self._memory_store = InMemoryLeaderboardStore()
+
+    @property
+    def store(self):
+        redis = get_redis()
+        if redis is None:
+            return self._memory_store
+        return RedisLeaderboardStore(redis)
+
+    async def record_solve(self, user_id, topic: str, difficulty: str):
+        """Credit a user for solving a problem for the first time."""
+        points = problem_points(difficulty)
+        member = str(user_id)
+        store = self.store
+        try:
+            await store.incr(global_board(), member, points)
+            await store.incr(topic_board(topic), member, points)
+        except Exception as e:
+            # The board can be rebuilt from Postgres; never fail a submission
+            logger.error(f"Leaderboard update failed: {e}")
+
+    async def top(self, board: str, offset: int = 0, limit: int = 20):
+        store = self.store
+        return await store.top(board, offset, limit), await store.size(board)
+
+    async def rank(self, board: str, user_id) -> Optional[tuple[int, float]]:
+        return await self.store.rank(board, str(user_id))
+
+    async def rebuild(self, db: AsyncSession) -> int:
+        """Recompute every board from ``user_problem_stats``. Returns solves replayed."""
+        result = await db.execute(
+            select(UserProblemStats.user_id, Problem.topic, Problem.difficulty)
+            .join(Problem, Problem.id == UserProblemStats.problem_id)
+            .where(UserProblemStats.first_accepted_at.is_not(None))
+        )
+        boards: dict[str, dict[str, float]] = {global_board(): {}}
+        solves = 0
+        for user_id, topic, difficulty in result.all():
+            points = problem_points(difficulty)
+            member = str(user_id)
+            for board in (global_board(), topic_board(topic)):
+                scores = boards.setdefault(board, {})
+                scores[member] = scores.get(member, 0) + points
+            solves += 1
+        await self.store.replace_all(boards)
+        logger.info(f"Rebuilt leaderboards from {solves} solves")
+        return solves
+
+
+leaderboard_service = LeaderboardService()
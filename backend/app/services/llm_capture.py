@@ -0,0 +1,126 @@
+"""Opt-in capture of LLM calls for offline replay.
+
+When ``LLM_CAPTURE_DIR`` is set, every Gemini call made by AIService is
+appended (sanitized) to ``<dir>/llm-<pid>.jsonl.gz``: the method inputs,
+the prompt, the raw response text, token usage and latency. Each worker
+writes its own file. ``app.services.llm_replay`` replays these files to
+compare prompt changes against the recorded baseline.
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+import random
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional
+
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Records buffered before they are compressed and appended to the file
+WRITE_BATCH = 50
+
+_REDACTIONS = [
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), "<email>"),
+    (re.compile(r"\beyJ[\w-]+\.[\w-]+\.[\w-]+"), "<token>"),
+    (re.compile(r"\bAIza[\w-]{35}\b"), "<api-key>"),
+    (re.compile(r"\+\d[\d -]{7,}\d"), "<phone>"),
+]
+
+
+def sanitize(value):
+    """Redact emails, tokens, API keys and phone numbers from strings in *value*."""
+    if isinstance(value, str):
+        for pattern, replacement in _REDACTIONS:
+            value = pattern.sub(replacement, value)
+        return value
+    if isinstance(value, dict):
+        return {key: sanitize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [sanitize(item) for item in value]
+    return value
+
+
+class CaptureWriter:
+    """Buffers capture records and appends them to a gzip'd JSONL file."""
+
+    def __init__(self, capture_dir: Optional[str] = None, sample_rate: float = 1.0):
+        self.capture_dir = capture_dir
+        self.sample_rate = sample_rate
+        self._buffer: list[str] = []
+        self._write_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.capture_dir)
+
+    @property
+    def path(self) -> Path:
+        return Path(self.capture_dir) / f"llm-{os.getpid()}.jsonl.gz"
+
+    def record(
+        self,
+        method: str,
+        model: str,
+        inputs: Optional[dict],
+        prompt: str,
+        generation_config: Optional[dict],
+        response_text: Optional[str],
+        usage: dict,
+        latency: float,
+        error: Optional[str] = None,
+    ):
+        if not self.enabled or random.random() >= self.sample_rate:
+            return
+        self._buffer.append(json.dumps({
+            "ts": datetime.utcnow().isoformat(),
+            "method": method,
+            "model": model,
+            "inputs": sanitize(inputs or {}),
+            "prompt": sanitize(prompt),
+            "generation_config": generation_config,
+            "response": sanitize(response_text),
+            "usage": usage,
+            "latency_ms": int(latency * 1000),
+            "error": error,
+        }, ensure_ascii=False))
+        if len(self._buffer) >= WRITE_BATCH:
+            batch, self._buffer = self._buffer, []
+            try:
+                asyncio.get_running_loop().run_in_executor(None, self._write, batch)
+            except RuntimeError:
+                self._write(batch)
+
+    def _write(self, lines: list[str]):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Each append adds a gzip member; gzip.open reads them back-to-back
+            with self._write_lock, gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except Exception as e:
+            logger.error(f"Failed to write {len(lines)} LLM capture records: {e}")
+
+    def close(self):
+        batch, self._buffer = self._buffer, []
+        if batch:
+            self._write(batch)
+
+
+def read_captures(paths: list[str]) -> Iterator[dict]:
+    """Yield capture records from files or directories of ``*.jsonl.gz``."""
+    for path in map(Path, paths):
+        files = sorted(path.glob("*.jsonl.gz")) if path.is_dir() else [path]
+        for file in files:
+            with gzip.open(file, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+
+llm_capture = CaptureWriter(settings.LLM_CAPTURE_DIR, settings.LLM_CAPTURE_SAMPLE_RATE)
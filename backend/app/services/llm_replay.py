@@ -0,0 +1,244 @@
+"""Replay captured LLM calls against the current prompts.
+
+    python -m app.services.llm_replay data/captures [--model recorded|live]
+        [--max-token-increase 0.10] [--max-parse-failure-increase 0.02] [--json report.json]
+
+Every captured call's inputs are fed to today's AIService method, so the
+prompt is rebuilt by the current code. The ``recorded`` model (default)
+answers with the captured response and re-estimates prompt tokens in
+proportion to the prompt's length, isolating the effect of a prompt change
+on size. ``live`` sends the rebuilt prompts to Gemini to re-measure latency
+and output validity. The report compares each method against the captured
+baseline; the command exits non-zero when a gate is exceeded.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from types import SimpleNamespace
+from typing import Optional
+
+from app.services.ai_service import AIService
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.llm_capture import llm_capture, read_captures
+
+logger = logging.getLogger(__name__)
+
+# Keys a parseable answer must contain, per AIService method
+REQUIRED_KEYS = {
+    "generate_problem": {"title", "description", "input_format", "output_format", "examples", "constraints"},
+    "grade_code": {"status", "is_correct", "feedback_en", "feedback_ar", "hint"},
+    "explain_diagnostic": {"en", "ar"},
+    "generate_hint_ladder": {"hints"},
+    "chat": {"message_ar", "message_en", "suggestions"},
+    "chat_stream": {"message_ar", "message_en", "suggestions"},
+    "speculative_chat": {"message_ar", "message_en", "suggestions"},
+}
+
+
+def valid_output(method: str, text: Optional[str]) -> bool:
+    """Whether *text* is a usable answer for *method*."""
+    if not text:
+        return False
+    if method not in REQUIRED_KEYS:
+        return bool(text.strip())
+    try:
+        result = json.loads(text)
+    except json.JSONDecodeError:
+        return False
+    return isinstance(result, dict) and REQUIRED_KEYS[method] <= result.keys()
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class RecordedModel:
+    """Stands in for Gemini, answering each call with the captured response."""
+
+    def __init__(self):
+        self.record: dict = {}
+
+    def _usage(self, prompt: str) -> SimpleNamespace:
+        usage = self.record.get("usage") or {}
+        recorded_prompt = self.record.get("prompt") or ""
+        if usage.get("prompt_tokens") and recorded_prompt:
+            prompt_tokens = round(usage["prompt_tokens"] * len(prompt) / len(recorded_prompt))
+        else:
+            prompt_tokens = len(prompt) // 4  # rough chars-per-token fallback
+        output_tokens = usage.get("output_tokens", 0)
+        return SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=output_tokens,
+            cached_content_token_count=0,
+            total_token_count=prompt_tokens + output_tokens,
+        )
+
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        if self.record.get("response") is None:
+            raise RuntimeError(self.record.get("error") or "no recorded response")
+        response = SimpleNamespace(text=self.record["response"], usage_metadata=self._usage(prompt))
+        if not stream:
+            return response
+
+        async def chunks():
+            yield response
+        return chunks()
+
+
+class MeasuringModel:
+    """Wraps a model and remembers the last call's output, usage and latency."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.reset()
+
+    def reset(self):
+        self.text = None
+        self.usage = None
+        self.latency = 0.0
+
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        start = time.monotonic()
+        response = await self.inner.generate_content_async(prompt, stream=stream, **kwargs)
+        if not stream:
+            self.latency = time.monotonic() - start
+            self.usage = response.usage_metadata
+            self.text = response.text
+            return response
+
+        async def chunks():
+            parts = []
+            async for chunk in response:
+                parts.append(chunk.text)
+                self.usage = getattr(chunk, "usage_metadata", None) or self.usage
+                yield chunk
+            self.latency = time.monotonic() - start
+            self.text = "".join(parts)
+        return chunks()
+
+
+async def _call(service: AIService, method: str, inputs: dict):
+    if method == "chat_stream":
+        async for _ in service.chat_stream(**inputs):
+            pass
+    else:
+        await getattr(service, method)(**inputs)
+
+
+async def replay(records, live: bool = False) -> dict:
+    """Replay *records*; returns per-method baseline/replay summaries."""
+    llm_capture.capture_dir = None  # never re-capture the replay itself
+    service = AIService()
+    # Replays must reach the model every time, whatever the failure rate
+    service.breakers = {
+        name: CircuitBreaker(name, min_calls=sys.maxsize) for name in service.breakers
+    }
+    recorded = RecordedModel()
+    measuring = MeasuringModel(service.model if live else recorded)
+    service._model = measuring
+
+    samples: dict[str, dict[str, list]] = {}
+    for record in records:
+        method = record["method"]
+        if not hasattr(service, method):
+            logger.warning(f"Skipping capture of unknown method {method}")
+            continue
+        recorded.record = record
+        measuring.reset()
+        try:
+            await _call(service, method, record.get("inputs") or {})
+        except Exception as e:
+            logger.info(f"{method} replay failed: {e}")
+
+        usage = measuring.usage
+        s = samples.setdefault(method, {key: [] for key in (
+            "base_prompt", "new_prompt", "base_output", "new_output",
+            "base_latency", "new_latency", "base_valid", "new_valid",
+        )})
+        base_usage = record.get("usage") or {}
+        s["base_prompt"].append(base_usage.get("prompt_tokens", 0))
+        s["base_output"].append(base_usage.get("output_tokens", 0))
+        s["base_latency"].append(record.get("latency_ms", 0))
+        s["base_valid"].append(valid_output(method, record.get("response")))
+        s["new_prompt"].append(getattr(usage, "prompt_token_count", 0) or 0)
+        s["new_output"].append(getattr(usage, "candidates_token_count", 0) or 0)
+        s["new_latency"].append(
+            measuring.latency * 1000 if live else record.get("latency_ms", 0)
+        )
+        s["new_valid"].append(valid_output(method, measuring.text))
+
+    report = {}
+    for method, s in samples.items():
+        n = len(s["base_prompt"])
+        base_prompt, new_prompt = sum(s["base_prompt"]), sum(s["new_prompt"])
+        report[method] = {
+            "calls": n,
+            "prompt_tokens": {"baseline": base_prompt, "replay": new_prompt},
+            "prompt_token_delta": (new_prompt - base_prompt) / base_prompt if base_prompt else 0.0,
+            "output_tokens": {"baseline": sum(s["base_output"]), "replay": sum(s["new_output"])},
+            "parse_failure_rate": {
+                "baseline": 1 - sum(s["base_valid"]) / n,
+                "replay": 1 - sum(s["new_valid"]) / n,
+            },
+            "latency_ms": {
+                side: {
+                    "p50": percentile(s[f"{key}_latency"], 0.50),
+                    "p90": percentile(s[f"{key}_latency"], 0.90),
+                    "p99": percentile(s[f"{key}_latency"], 0.99),
+                }
+                for side, key in (("baseline", "base"), ("replay", "new"))
+            },
+        }
+    return report
+
+
+def gate_failures(report: dict, max_token_increase: float, max_parse_failure_increase: float) -> list[str]:
+    """Regressions against the captured baseline that exceed the allowed margins."""
+    failures = []
+    for method, summary in report.items():
+        if summary["prompt_token_delta"] > max_token_increase:
+            failures.append(f"{method}: prompt tokens {summary['prompt_token_delta']:+.1%}")
+        rates = summary["parse_failure_rate"]
+        if rates["replay"] - rates["baseline"] > max_parse_failure_increase:
+            failures.append(
+                f"{method}: parse failure rate {rates['baseline']:.1%} -> {rates['replay']:.1%}"
+            )
+    return failures
+
+
+def _print_report(report: dict):
+    print(f"{'method':<18}{'calls':>6}{'prompt tok':>22}{'delta':>9}{'parse fail':>16}{'p50 ms':>16}{'p90 ms':>16}")
+    for method, r in sorted(report.items()):
+        tokens = f"{r['prompt_tokens']['baseline']}->{r['prompt_tokens']['replay']}"
+        fails = f"{r['parse_failure_rate']['baseline']:.0%}->{r['parse_failure_rate']['replay']:.0%}"
+        p50 = f"{r['latency_ms']['baseline']['p50']:.0f}->{r['latency_ms']['replay']['p50']:.0f}"
+        p90 = f"{r['latency_ms']['baseline']['p90']:.0f}->{r['latency_ms']['replay']['p90']:.0f}"
+        print(f"{method:<18}{r['calls']:>6}{tokens:>22}{r['prompt_token_delta']:>+9.1%}{fails:>16}{p50:>16}{p90:>16}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay captured LLM calls against the current prompts")
+    parser.add_argument("captures", nargs="+", help="Capture files or directories")
+    parser.add_argument("--model", choices=["recorded", "live"], default="recorded")
+    parser.add_argument("--max-token-increase", type=float, default=0.10)
+    parser.add_argument("--max-parse-failure-increase", type=float, default=0.02)
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    report = asyncio.run(replay(read_captures(args.captures), live=args.model == "live"))
+    _print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    failures = gate_failures(report, args.max_token_increase, args.max_parse_failure_increase)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import case, func, insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.config import get_settings
+from app.database import engine
+from app.models.llm_usage import LLMUsage
+from app.services.rate_limiter import current_meter, record_llm_tokens
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Rows are written when this many are buffered, or every FLUSH_SECONDS
+FLUSH_BATCH = 100
+FLUSH_SECONDS = 5.0
+# Oldest rows are dropped beyond this, so a database outage can't exhaust memory
+MAX_BUFFERED = 10000
+
+ROLLUP_KEYS = {
+    "method": LLMUsage.method,
+    "model": LLMUsage.model,
+    "endpoint": LLMUsage.endpoint,
+    "user": LLMUsage.user_id,
+    "day": func.date(LLMUsage.created_at),
+}
+
+
+def usage_counts(usage) -> dict:
+    """Token counts from a Gemini ``usage_metadata`` object (missing fields are 0)."""
+    return {
+        "prompt_tokens": getattr(usage, "prompt_token_count", 0) or 0,
+        "output_tokens": getattr(usage, "candidates_token_count", 0) or 0,
+        "cached_tokens": getattr(usage, "cached_content_token_count", 0) or 0,
+        "total_tokens": getattr(usage, "total_token_count", 0) or 0,
+    }
+
+
+def estimated_cost(prompt_tokens: int, output_tokens: int) -> float:
+    return (
+        prompt_tokens * settings.LLM_INPUT_PRICE_PER_MTOK
+        + output_tokens * settings.LLM_OUTPUT_PRICE_PER_MTOK
+    ) / 1_000_000
+
+
+class UsageRecorder:
+    """Buffers one row per LLM call and writes them to ``llm_usage`` in batches.
+
+    ``record`` never touches the database, so accounting adds no latency
+    to the request; a background task started in the app lifespan flushes
+    the buffer. The user and endpoint come from the request's TokenMeter.
+    """
+
+    def __init__(self):
+        self._buffer: list[dict] = []
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.dropped = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def record(self, method: str, model: str, usage, latency: float, success: bool = True):
+        counts = usage_counts(usage)
+        record_llm_tokens(counts["total_tokens"])
+
+        meter = current_meter()
+        self._buffer.append({
+            "created_at": datetime.utcnow(),
+            "user_id": meter.user_id if meter else None,
+            "endpoint": meter.endpoint if meter else None,
+            "method": method,
+            "model": model,
+            "latency_ms": int(latency * 1000),
+            "success": success,
+            **counts,
+        })
+        if len(self._buffer) > MAX_BUFFERED:
+            del self._buffer[0]
+            self.dropped += 1
+        if len(self._buffer) >= FLUSH_BATCH and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def flush(self):
+        batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+        try:
+            async with AsyncSession(engine) as db:
+                try:
+                    await db.execute(insert(LLMUsage), batch)
+                    await db.commit()
+                except IntegrityError:
+                    # e.g. a user deleted since the call; don't let one row block the rest
+                    await db.rollback()
+                    await self._write_rows(db, batch)
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} LLM usage rows: {e}")
+            self._buffer = (batch + self._buffer)[-MAX_BUFFERED:]
+
+    async def _write_rows(self, db: AsyncSession, batch: list[dict]):
+        """Insert rows one at a time; rows that still conflict without their user are dropped."""
+        for row in batch:
+            for attempt in (row, {**row, "user_id": None}):
+                try:
+                    async with db.begin_nested():
+                        await db.execute(insert(LLMUsage), [attempt])
+                    break
+                except IntegrityError as e:
+                    error = e
+            else:
+                self.dropped += 1
+                logger.error(f"Dropped an LLM usage row the database refuses: {error}")
+        await db.commit()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background flusher and write whatever is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+async def rollup(db: AsyncSession, group_by: str, since: datetime) -> list[dict]:
+    """Aggregate calls, tokens, latency and estimated cost per *group_by* key."""
+    key = ROLLUP_KEYS[group_by]
+    result = await db.execute(
+        select(
+            key,
+            func.count(),
+            func.sum(LLMUsage.prompt_tokens),
+            func.sum(LLMUsage.output_tokens),
+            func.sum(LLMUsage.cached_tokens),
+            func.sum(LLMUsage.total_tokens),
+            func.avg(LLMUsage.latency_ms),
+            func.max(LLMUsage.latency_ms),
+            func.sum(case((LLMUsage.success.is_(False), 1), else_=0)),
+        )
+        .where(LLMUsage.created_at >= since)
+        .group_by(key)
+        .order_by(func.sum(LLMUsage.total_tokens).desc())
+    )
+    return [
+        {
+            "key": str(value) if value is not None else None,
+            "calls": calls,
+            "prompt_tokens": prompt_tokens or 0,
+            "output_tokens": output_tokens or 0,
+            "cached_tokens": cached_tokens or 0,
+            "total_tokens": total_tokens or 0,
+            "avg_latency_ms": float(avg_latency or 0),
+            "max_latency_ms": max_latency or 0,
+            "errors": errors or 0,
+            "estimated_cost_usd": round(estimated_cost(prompt_tokens or 0, output_tokens or 0), 6),
+        }
+        for (
+            value, calls, prompt_tokens, output_tokens, cached_tokens,
+            total_tokens, avg_latency, max_latency, errors,
+        ) in result.all()
+    ]
+
+
+usage_recorder = UsageRecorder()
@@ -0,0 +1,283 @@
+"""Token budgeting for the grade_code prompt.
+
+The problem statement and the student's code share one token budget.
+Each part is compacted only as much as needed to fit:
+
+- description: story sentences are dropped before specification
+  sentences (numbers, math, input/output wording), then it is cut at a
+  sentence boundary;
+- samples: large inputs/outputs keep their first and last lines;
+- code: comments are stripped (line numbers stay valid for compiler
+  findings). The student's code is never cut further: the grader must
+  see all of it to give a verdict, so it may exceed the budget. Other
+  code (e.g. a reference solution used as guidance) has its middle
+  elided.
+
+The compacted problem does not depend on the code, so it is cached per
+problem and content hash.
+"""
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Compacted problems kept per worker
+CACHE_SIZE = 512
+# Sample fields larger than this keep only their first and last lines
+SAMPLE_FIELD_TOKENS = 120
+SAMPLE_HEAD_LINES = 3
+SAMPLE_TAIL_LINES = 2
+# Relative claim of each problem part on the budget when it doesn't all fit
+PROBLEM_WEIGHTS = {"description": 3, "constraints": 1, "input_format": 1, "output_format": 1, "samples": 2}
+
+_TOKEN_RE = re.compile(r"[A-Za-z]+|\d|[^\x00-\x7f]+|[^\sA-Za-z\d]|\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z$\\(])")
+_SPEC_RE = re.compile(
+    r"\$|\d|\\le|≤|≥|\^|\b(?:input|output|print|given|find|compute|calculate|determine|"
+    r"return|each|integers?|array|string|sequence|modulo|quer(?:y|ies)|test cases?|"
+    r"if|otherwise|at most|at least|minimum|maximum|number of)\b",
+    re.IGNORECASE,
+)
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Rough Gemini token count: word pieces, single digits and punctuation.
+
+    Errs on the high side so budgets are not overrun.
+    """
+    count = 0
+    for piece in _TOKEN_RE.findall(text or ""):
+        if piece.isascii() and piece.isalpha():
+            count += (len(piece) + 5) // 6
+        elif not piece.isascii():
+            count += (len(piece) + 2) // 3
+        else:
+            count += 1
+    return count
+
+
+def allocate(needs: dict[str, int], budget: int, weights: dict[str, int]) -> dict[str, int]:
+    """Split *budget* across parts by weight; parts needing less give the rest back."""
+    shares = {}
+    remaining = dict(needs)
+    left = budget
+    while remaining:
+        total_weight = sum(weights[name] for name in remaining)
+        fits = {
+            name: need for name, need in remaining.items()
+            if need <= left * weights[name] / total_weight
+        }
+        if not fits:
+            for name in remaining:
+                shares[name] = int(left * weights[name] / total_weight)
+            break
+        for name, need in fits.items():
+            shares[name] = need
+            left -= need
+            del remaining[name]
+    return shares
+
+
+def _clean(text: Optional[str]) -> str:
+    text = re.sub(r"[ \t]+\n", "\n", (text or "").replace("\r\n", "\n"))
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def compact_text(text: Optional[str], budget: int) -> str:
+    """Fit prose into *budget* tokens, dropping narrative before specification."""
+    text = _clean(text)
+    if estimate_tokens(text) <= budget:
+        return text
+
+    sentences = [s for paragraph in text.split("\n") for s in _SENTENCE_RE.split(paragraph) if s.strip()]
+    kept = [s for s in sentences if _SPEC_RE.search(s)] or sentences
+    out, used = [], 0
+    for sentence in kept:
+        cost = estimate_tokens(sentence)
+        if used + cost > budget:
+            break
+        out.append(sentence)
+        used += cost
+    if not out:  # a single sentence longer than the budget
+        words = kept[0].split()
+        while words and estimate_tokens(" ".join(words)) > budget:
+            words = words[: len(words) * 3 // 4]
+        out = [" ".join(words)]
+    result = " ".join(out)
+    return result + (" [...]" if len(out) < len(kept) else "")
+
+
+def _elide_lines(text: str, head: int, tail: int, note: str) -> str:
+    lines = text.split("\n")
+    if len(lines) <= head + tail + 1:
+        return text
+    omitted = len(lines) - head - tail
+    return "\n".join(lines[:head] + [note.format(omitted=omitted)] + lines[-tail:])
+
+
+def compact_samples(samples: Optional[list], budget: int) -> str:
+    """JSON of as many samples as fit, with oversized fields elided."""
+    compacted = []
+    for sample in samples or []:
+        if not isinstance(sample, dict):
+            continue
+        sample = dict(sample)
+        for key in ("input", "output"):
+            value = str(sample.get(key, ""))
+            if estimate_tokens(value) > SAMPLE_FIELD_TOKENS:
+                value = _elide_lines(value, SAMPLE_HEAD_LINES, SAMPLE_TAIL_LINES, "... ({omitted} lines omitted) ...")
+                if estimate_tokens(value) > SAMPLE_FIELD_TOKENS:
+                    value = value[: SAMPLE_FIELD_TOKENS * 2] + " ... (truncated)"
+            sample[key] = value
+        candidate = compacted + [sample]
+        if compacted and estimate_tokens(json.dumps(candidate, ensure_ascii=False)) > budget:
+            continue
+        compacted = candidate
+    return json.dumps(compacted, ensure_ascii=False) if compacted else "N/A"
+
+
+def strip_comments(code: str) -> str:
+    """Remove ``//`` and ``/* */`` comments and trailing spaces, keeping line breaks."""
+    out = []
+    i, n = 0, len(code)
+    quote = None
+    while i < n:
+        ch = code[i]
+        if quote:
+            out.append(ch)
+            if ch == "\\" and i + 1 < n:
+                out.append(code[i + 1])
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+            out.append(ch)
+        elif code.startswith("//", i):
+            while i < n and code[i] != "\n":
+                i += 1
+            continue
+        elif code.startswith("/*", i):
+            end = code.find("*/", i + 2)
+            end = n if end == -1 else end + 2
+            out.append("\n" * code.count("\n", i, end))
+            i = end
+            continue
+        else:
+            out.append(ch)
+        i += 1
+    return "\n".join(line.rstrip() for line in "".join(out).split("\n")).rstrip("\n")
+
+
+def compact_code(code: str, budget: int) -> str:
+    """Strip comments, then elide the middle of the code if still over *budget*."""
+    code = strip_comments(code.replace("\r\n", "\n"))
+    if estimate_tokens(code) <= budget:
+        return code
+    lines = code.split("\n")
+    head, tail = len(lines) // 2, len(lines) // 4
+    while head + tail > 2:
+        omitted_from = head + 1
+        omitted_to = len(lines) - tail
+        marker = f"// ... lines {omitted_from}-{omitted_to} omitted ..."
+        candidate = "\n".join(lines[:head] + [marker] + lines[len(lines) - tail:])
+        if estimate_tokens(candidate) <= budget:
+            return candidate
+        head, tail = head * 3 // 4, tail * 3 // 4
+    return "\n".join(lines[:head] + ["// ... rest omitted ..."])
+
+
+@dataclass
+class CompactProblem:
+    description: str
+    input_format: str
+    output_format: str
+    constraints: str
+    samples: str
+    tokens: int
+
+
+def compact_problem(
+    problem_desc: str,
+    constraints: Optional[str],
+    sample_io: Optional[list],
+    input_format: Optional[str],
+    output_format: Optional[str],
+    budget: int,
+) -> CompactProblem:
+    samples_full = json.dumps(sample_io, ensure_ascii=False) if sample_io else ""
+    needs = {
+        "description": estimate_tokens(problem_desc),
+        "constraints": estimate_tokens(constraints),
+        "input_format": estimate_tokens(input_format),
+        "output_format": estimate_tokens(output_format),
+        "samples": estimate_tokens(samples_full),
+    }
+    shares = allocate(needs, budget, PROBLEM_WEIGHTS)
+    compacted = CompactProblem(
+        description=compact_text(problem_desc, shares["description"]),
+        input_format=compact_text(input_format, shares["input_format"]),
+        output_format=compact_text(output_format, shares["output_format"]),
+        constraints=compact_text(constraints, shares["constraints"]),
+        samples=compact_samples(sample_io, shares["samples"]),
+        tokens=0,
+    )
+    compacted.tokens = sum(
+        estimate_tokens(part) for part in (
+            compacted.description, compacted.input_format, compacted.output_format,
+            compacted.constraints, compacted.samples,
+        )
+    )
+    return compacted
+
+
+class PromptBudget:
+    """Compacts grade_code inputs into a token budget, caching problem parts."""
+
+    def __init__(self, total_tokens: int, problem_tokens: int):
+        self.total_tokens = total_tokens
+        self.problem_tokens = problem_tokens
+        self._problems: OrderedDict[tuple, CompactProblem] = OrderedDict()
+
+    def problem(
+        self,
+        problem_desc: str,
+        constraints: Optional[str] = None,
+        sample_io: Optional[list] = None,
+        input_format: Optional[str] = None,
+        output_format: Optional[str] = None,
+        problem_id: Optional[int] = None,
+    ) -> CompactProblem:
+        payload = json.dumps(
+            [problem_desc, constraints, sample_io, input_format, output_format],
+            sort_keys=True, ensure_ascii=False, default=str,
+        )
+        key = (problem_id, hashlib.sha256(payload.encode("utf-8")).hexdigest(), self.problem_tokens)
+        if key in self._problems:
+            self._problems.move_to_end(key)
+            return self._problems[key]
+        compacted = compact_problem(
+            problem_desc, constraints, sample_io, input_format, output_format, self.problem_tokens
+        )
+        self._problems[key] = compacted
+        while len(self._problems) > CACHE_SIZE:
+            self._problems.popitem(last=False)
+        return compacted
+
+    def code(self, code: str, problem: CompactProblem, elide: bool = True) -> str:
+        """Compact *code* into whatever the problem left of the total budget.
+
+        With ``elide=False`` only comments are stripped, whatever the length.
+        """
+        if not elide:
+            return strip_comments(code.replace("\r\n", "\n"))
+        return compact_code(code, max(self.total_tokens - problem.tokens, self.total_tokens // 3))
+
+
+prompt_budget = PromptBudget(settings.GRADE_PROMPT_TOKEN_BUDGET, settings.GRADE_PROBLEM_TOKEN_BUDGET)
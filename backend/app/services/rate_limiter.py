@@ -0,0 +1,205 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+from uuid import UUID
+
+from app.config import get_settings
+from app.redis_client import get_redis
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ratelimit"
+
+# Points charged per request; everything not listed costs DEFAULT_COST.
+# AI routes are weighted by how much Gemini time they typically use.
+DEFAULT_COST = 1
+ROUTE_COSTS = {
+    ("POST", "/api/chat"): 10,
+    ("POST", "/api/generate/problem"): 20,
+    ("POST", "/api/submissions"): 10,
+    ("POST", "/api/submit-solution"): 15,
+    ("POST", "/api/robotics/simulate"): 5,
+}
+CHAT_TURN_COST = ROUTE_COSTS[("POST", "/api/chat")]
+
+# Never limited: probes, docs and CORS preflights
+EXEMPT_PATHS = {"/api/health", "/api/ready", "/api/docs", "/api/redoc", "/api/openapi.json"}
+
+
+def route_cost(method: str, path: str) -> int:
+    if method == "OPTIONS" or path in EXEMPT_PATHS:
+        return 0
+    return ROUTE_COSTS.get((method, path.rstrip("/")), DEFAULT_COST)
+
+
+class TokenMeter:
+    """Accumulates LLM tokens used while handling one request or chat turn.
+
+    Also tells LLM usage accounting who the calls are made for.
+    """
+
+    def __init__(self, identity: Optional[str] = None, endpoint: Optional[str] = None):
+        self.identity = identity
+        self.endpoint = endpoint
+        self.tokens = 0
+
+    @property
+    def user_id(self) -> Optional[UUID]:
+        if self.identity and self.identity.startswith("user:"):
+            return UUID(self.identity.removeprefix("user:"))
+        return None
+
+
+_token_meter: ContextVar[Optional[TokenMeter]] = ContextVar("llm_token_meter", default=None)
+
+
+@contextmanager
+def metered(identity: Optional[str] = None, endpoint: Optional[str] = None):
+    """Count LLM tokens reported via :func:`record_llm_tokens` inside the block."""
+    meter = TokenMeter(identity, endpoint)
+    token = _token_meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _token_meter.reset(token)
+
+
+def current_meter() -> Optional[TokenMeter]:
+    return _token_meter.get()
+
+
+def record_llm_tokens(count: int):
+    meter = _token_meter.get()
+    if meter is not None and count:
+        meter.tokens += count
+
+
+class InMemoryCounters:
+    """Expiring integer counters local to the worker (Redis-less setups)."""
+
+    def __init__(self):
+        self._values: dict[str, tuple[int, float]] = {}
+
+    def _get(self, key: str, now: float) -> int:
+        value, expires_at = self._values.get(key, (0, 0.0))
+        return value if expires_at > now else 0
+
+    async def incr(self, key: str, amount: int, ttl: int) -> int:
+        now = time.time()
+        if len(self._values) > 10000:
+            self._values = {k: v for k, v in self._values.items() if v[1] > now}
+        value = self._get(key, now) + amount
+        self._values[key] = (value, now + ttl)
+        return value
+
+    async def get(self, key: str) -> int:
+        return self._get(key, time.time())
+
+
+class RedisCounters:
+    """Expiring integer counters in Redis, shared by all workers."""
+
+    def __init__(self, redis):
+        self.redis = redis
+
+    async def incr(self, key: str, amount: int, ttl: int) -> int:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.incrby(key, amount)
+            pipe.expire(key, ttl)
+            value, _ = await pipe.execute()
+        return value
+
+    async def get(self, key: str) -> int:
+        return int(await self.redis.get(key) or 0)
+
+
+class RateLimiter:
+    """Weighted sliding-window limits plus daily LLM-token quotas.
+
+    Clients are identified by user id, or by IP address for guests. Each
+    request spends its route's cost from a points budget per window; the
+    window slides by weighting the previous fixed window by how much of it
+    still overlaps. Counters live in Redis when REDIS_URL is configured so
+    limits hold across workers, with a per-worker fallback otherwise.
+    """
+
+    def __init__(self):
+        self._memory = InMemoryCounters()
+
+    @property
+    def counters(self):
+        redis = get_redis()
+        if redis is None:
+            return self._memory
+        return RedisCounters(redis)
+
+    async def _incr(self, key: str, amount: int, ttl: int) -> int:
+        try:
+            return await self.counters.incr(key, amount, ttl)
+        except Exception as e:
+            logger.warning(f"Rate limit counter update failed, using local counters: {e}")
+            return await self._memory.incr(key, amount, ttl)
+
+    async def _get(self, key: str) -> int:
+        try:
+            return await self.counters.get(key)
+        except Exception as e:
+            logger.warning(f"Rate limit counter read failed, using local counters: {e}")
+            return await self._memory.get(key)
+
+    @staticmethod
+    def points_limit(identity: str) -> int:
+        if identity.startswith("user:"):
+            return settings.RATE_LIMIT_USER_POINTS
+        return settings.RATE_LIMIT_GUEST_POINTS
+
+    @staticmethod
+    def token_quota(identity: str) -> int:
+        if identity.startswith("user:"):
+            return settings.LLM_DAILY_TOKENS_USER
+        return settings.LLM_DAILY_TOKENS_GUEST
+
+    async def hit(self, identity: str, cost: int) -> tuple[bool, int, int]:
+        """Spend *cost* points. Returns (allowed, points remaining, seconds to reset)."""
+        limit = self.points_limit(identity)
+        window = settings.RATE_LIMIT_WINDOW_SECONDS
+        now = time.time()
+        index = int(now // window)
+        elapsed = now - index * window
+        reset = int(window - elapsed) + 1
+
+        current_key = f"{KEY_PREFIX}:{identity}:{index}"
+        current = await self._incr(current_key, cost, 2 * window)
+        previous = await self._get(f"{KEY_PREFIX}:{identity}:{index - 1}")
+        used = previous * (1 - elapsed / window) + current
+
+        if used > limit:
+            # Refund, so rejected requests don't extend the lockout
+            await self._incr(current_key, -cost, 2 * window)
+            return False, max(0, int(limit - used + cost)), reset
+        return True, int(limit - used), reset
+
+    @staticmethod
+    def _tokens_key(identity: str) -> str:
+        day = datetime.now(timezone.utc).strftime("%Y%m%d")
+        return f"{KEY_PREFIX}:tokens:{identity}:{day}"
+
+    async def tokens_remaining(self, identity: str) -> int:
+        used = await self._get(self._tokens_key(identity))
+        return max(0, self.token_quota(identity) - used)
+
+    async def add_tokens(self, identity: str, tokens: int):
+        if tokens:
+            await self._incr(self._tokens_key(identity), tokens, 2 * 86400)
+
+
+def seconds_until_utc_midnight() -> int:
+    now = datetime.now(timezone.utc)
+    return 86400 - (now.hour * 3600 + now.minute * 60 + now.second)
+
+
+rate_limiter = RateLimiter()
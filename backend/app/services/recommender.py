@@ -0,0 +1,246 @@
+import logging
+import time
+from typing import Optional
+from uuid import UUID
+
+import numpy as np
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.problem import Problem
+from app.models.problem_stats import ProblemStats
+from app.models.user_problem_stats import UserProblemStats
+from app.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+DIFFICULTY_LEVELS = {"Easy": 1.0, "Medium": 2.0, "Hard": 3.0}
+
+# Pseudo-failures added to every topic so one lucky solve doesn't max out skill
+SKILL_PRIOR = 3.0
+# Acceptance rate assumed for problems nobody has attempted yet
+DEFAULT_ACCEPTANCE = 0.5
+
+# Scoring weights
+WEAK_TOPIC_WEIGHT = 0.5
+ACCEPTANCE_WEIGHT = 0.25
+RETRY_BONUS = 0.2
+
+# Per-worker caches are refreshed after this many seconds so that
+# submissions handled by other workers are eventually reflected.
+CATALOGUE_TTL = 300
+PROFILE_TTL = 300
+
+# Bumped in Redis on every submission so other workers drop stale profiles
+PROFILE_VERSION_KEY = "recommender:profile_version:{user_id}"
+
+
+def difficulty_level(difficulty: str) -> float:
+    return DIFFICULTY_LEVELS.get(difficulty, 1.0)
+
+
+class _Catalogue:
+    """Problem metadata as parallel NumPy arrays for vectorized scoring."""
+
+    def __init__(self, rows: list[tuple[int, str, str, int, int]]):
+        self.topics: list[str] = sorted({topic for _, topic, _, _, _ in rows})
+        topic_index = {topic: i for i, topic in enumerate(self.topics)}
+        self.index_of: dict[int, int] = {}
+
+        self.ids = np.empty(len(rows), dtype=np.int64)
+        self.topic_idx = np.empty(len(rows), dtype=np.int64)
+        self.difficulty = np.empty(len(rows), dtype=np.float64)
+        self.acceptance = np.empty(len(rows), dtype=np.float64)
+        for i, (problem_id, topic, difficulty, attempted_by, solved_by) in enumerate(rows):
+            self.index_of[problem_id] = i
+            self.ids[i] = problem_id
+            self.topic_idx[i] = topic_index[topic]
+            self.difficulty[i] = difficulty_level(difficulty)
+            self.acceptance[i] = solved_by / attempted_by if attempted_by else DEFAULT_ACCEPTANCE
+        self.loaded_at = time.monotonic()
+
+
+class _UserProfile:
+    """A user's solved mask and failure counts, aligned with the catalogue."""
+
+    def __init__(self, catalogue: _Catalogue, version: Optional[int] = None):
+        # Positions are only meaningful for this catalogue snapshot
+        self.catalogue = catalogue
+        self.version = version
+        self.solved = np.zeros(len(catalogue.ids), dtype=bool)
+        self.attempted = np.zeros(len(catalogue.ids), dtype=bool)
+        self.failures = np.zeros(len(catalogue.ids))
+        self.loaded_at = time.monotonic()
+
+    def skill(self, catalogue: _Catalogue) -> np.ndarray:
+        """Per-topic skill in [0, 1).
+
+        Solved problems add their difficulty; failures on still-unsolved
+        problems count half their difficulty against the topic.
+        """
+        n_topics = len(catalogue.topics)
+        solved_weight = np.bincount(
+            catalogue.topic_idx,
+            weights=catalogue.difficulty * self.solved,
+            minlength=n_topics,
+        )
+        failed_weight = np.bincount(
+            catalogue.topic_idx,
+            weights=catalogue.difficulty / 2 * self.failures * ~self.solved,
+            minlength=n_topics,
+        )
+        return solved_weight / (solved_weight + failed_weight + SKILL_PRIOR)
+
+
+class Recommender:
+    """Pick the next problem for a user from their history and the catalogue.
+
+    Each user has a per-topic skill vector derived from ``user_problem_stats``.
+    Every unsolved problem is scored in one vectorized pass: problems whose
+    difficulty is close to the user's skill in that topic score highest,
+    with a bonus for weak topics, for widely solved problems and for
+    problems the user already attempted. Per-user profiles are kept in
+    memory and updated incrementally by ``observe`` on each new submission;
+    with REDIS_URL set, a per-user version counter tells other workers that
+    their cached copy is stale.
+    """
+
+    def __init__(self):
+        self._catalogue: Optional[_Catalogue] = None
+        self._profiles: dict[UUID, _UserProfile] = {}
+
+    async def _get_catalogue(self, db: AsyncSession) -> _Catalogue:
+        catalogue = self._catalogue
+        if catalogue is None or time.monotonic() - catalogue.loaded_at > CATALOGUE_TTL:
+            result = await db.execute(
+                select(
+                    Problem.id,
+                    Problem.topic,
+                    Problem.difficulty,
+                    ProblemStats.attempted_by,
+                    ProblemStats.solved_by,
+                ).outerjoin(ProblemStats, ProblemStats.problem_id == Problem.id)
+            )
+            catalogue = _Catalogue([
+                (problem_id, topic, difficulty, attempted_by or 0, solved_by or 0)
+                for problem_id, topic, difficulty, attempted_by, solved_by in result.all()
+            ])
+            self._catalogue = catalogue
+            # Profiles are indexed by catalogue position, so rebuild them too
+            self._profiles.clear()
+        return catalogue
+
+    async def _profile_version(self, user_id: UUID, bump: bool = False) -> Optional[int]:
+        redis = get_redis()
+        if redis is None:
+            return None
+        key = PROFILE_VERSION_KEY.format(user_id=user_id)
+        try:
+            if bump:
+                return await redis.incr(key)
+            return int(await redis.get(key) or 0)
+        except Exception as e:
+            logger.warning(f"Recommender profile version lookup failed: {e}")
+            return None
+
+    async def _get_profile(
+        self, db: AsyncSession, catalogue: _Catalogue, user_id: UUID
+    ) -> _UserProfile:
+        version = await self._profile_version(user_id)
+        profile = self._profiles.get(user_id)
+        if (
+            profile is not None
+            and profile.catalogue is catalogue
+            and time.monotonic() - profile.loaded_at <= PROFILE_TTL
+            and (version is None or version == profile.version)
+        ):
+            return profile
+
+        profile = _UserProfile(catalogue, version)
+        result = await db.execute(
+            select(
+                UserProblemStats.problem_id,
+                UserProblemStats.attempts,
+                UserProblemStats.accepted,
+            ).where(UserProblemStats.user_id == user_id)
+        )
+        for problem_id, attempts, accepted in result.all():
+            i = catalogue.index_of.get(problem_id)
+            if i is None:
+                continue
+            profile.attempted[i] = True
+            profile.solved[i] = accepted > 0
+            profile.failures[i] = attempts - accepted
+        # The catalogue may have been refreshed during the awaits above; a
+        # profile sized for the old one must not be cached for the new one
+        if catalogue is self._catalogue:
+            self._profiles[user_id] = profile
+        return profile
+
+    async def observe(self, user_id: UUID, problem_id: int, status: str):
+        """Fold a new submission into the user's cached profile, if loaded."""
+        version = await self._profile_version(user_id, bump=True)
+        profile = self._profiles.get(user_id)
+        catalogue = self._catalogue
+        if profile is None or catalogue is None:
+            return
+        if profile.catalogue is not catalogue:
+            del self._profiles[user_id]
+            return
+        if version is not None:
+            if profile.version != version - 1:
+                # Another worker saw submissions this copy is missing
+                del self._profiles[user_id]
+                return
+            profile.version = version
+        i = catalogue.index_of.get(problem_id)
+        if i is None:
+            return
+        profile.attempted[i] = True
+        if status == "ACCEPTED":
+            profile.solved[i] = True
+        else:
+            profile.failures[i] += 1
+
+    async def recommend(
+        self,
+        db: AsyncSession,
+        user_id: Optional[UUID],
+        k: int = 3,
+        topic: Optional[str] = None,
+    ) -> list[tuple[int, float]]:
+        """Return up to *k* ``(problem_id, score)`` pairs, best first."""
+        catalogue = await self._get_catalogue(db)
+        if len(catalogue.ids) == 0:
+            return []
+
+        if user_id is not None:
+            profile = await self._get_profile(db, catalogue, user_id)
+        else:
+            profile = _UserProfile(catalogue)
+
+        skill = profile.skill(catalogue)[catalogue.topic_idx]
+        target = 1.0 + 2.0 * skill
+        scores = (
+            -np.abs(catalogue.difficulty - target)
+            + WEAK_TOPIC_WEIGHT * (1.0 - skill)
+            + ACCEPTANCE_WEIGHT * catalogue.acceptance
+            + RETRY_BONUS * profile.attempted
+        )
+        scores[profile.solved] = -np.inf
+        if topic is not None:
+            if topic not in catalogue.topics:
+                return []
+            scores[catalogue.topic_idx != catalogue.topics.index(topic)] = -np.inf
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (int(catalogue.ids[i]), float(scores[i]))
+            for i in top
+            if np.isfinite(scores[i])
+        ]
+
+
+recommender = Recommender()
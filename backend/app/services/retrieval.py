@@ -0,0 +1,276 @@
+"""Local vector index used to ground chat answers.
+
+The index covers problem statements, the reference solutions set by the
+problems' authors and the curated notes under ``knowledge/<track>/*.md``. It is built offline::
+
+    python -m app.services.retrieval build
+
+and stored in ``RETRIEVAL_INDEX_DIR`` as ``vectors.npy`` (an L2-normalized
+float32 matrix, memory-mapped at query time) plus ``docs.json`` (snippet
+text and metadata, one entry per matrix row).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import zlib
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+KNOWLEDGE_DIR = Path(__file__).resolve().parents[2] / "knowledge"
+
+HASHING_DIM = 1024
+MAX_SNIPPET_CHARS = 700
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class HashingEmbedder:
+    """Dependency-free embedder: signed feature hashing of words and word bigrams."""
+
+    name = "hashing"
+
+    def __init__(self, dim: int = HASHING_DIM):
+        self.dim = dim
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = _WORD_RE.findall(text.lower())
+            features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+            for feature in features:
+                h = zlib.crc32(feature.encode("utf-8"))
+                vectors[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        # Sublinear term frequency, then L2-normalize
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class SentenceTransformerEmbedder:
+    """Local sentence-transformers model, used when EMBEDDING_MODEL is set."""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.name = model_name
+        self.model = SentenceTransformer(model_name)
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        return self.model.encode(
+            texts, normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32)
+
+
+def get_embedder(name: Optional[str] = None):
+    """Return the embedder called *name*, falling back to feature hashing."""
+    name = name or settings.EMBEDDING_MODEL or HashingEmbedder.name
+    if name == HashingEmbedder.name:
+        return HashingEmbedder()
+    try:
+        return SentenceTransformerEmbedder(name)
+    except Exception as e:
+        logger.warning(f"Embedding model {name} unavailable ({e}); using feature hashing")
+        return HashingEmbedder()
+
+
+def _clip(text: str) -> str:
+    text = text.strip()
+    if len(text) > MAX_SNIPPET_CHARS:
+        text = text[:MAX_SNIPPET_CHARS].rsplit(" ", 1)[0] + " ..."
+    return text
+
+
+def problem_docs(problem) -> list[dict]:
+    """Split a problem into separately retrievable snippets."""
+    base = {"kind": "problem", "track": "problem_solving", "problem_id": problem.id}
+    parts = [
+        ("Statement", problem.desc_en),
+        ("Input", problem.input_format),
+        ("Output", problem.output_format),
+        ("Constraints", problem.constraints),
+    ]
+    return [
+        {**base, "title": f"{problem.title_en} — {label}", "text": _clip(text)}
+        for label, text in parts
+        if text
+    ]
+
+
+def solution_doc(problem_id: int, title: str, code: str) -> dict:
+    return {
+        "kind": "solution",
+        "track": "problem_solving",
+        "problem_id": problem_id,
+        "title": f"{title} — reference solution",
+        "text": _clip(code),
+    }
+
+
+def note_docs(knowledge_dir: Path = KNOWLEDGE_DIR) -> list[dict]:
+    """One snippet per ``##`` section of every curated note."""
+    docs = []
+    for path in sorted(knowledge_dir.glob("*/*.md")):
+        track = path.parent.name
+        for section in re.split(r"^## ", path.read_text(encoding="utf-8"), flags=re.M)[1:]:
+            heading, _, body = section.partition("\n")
+            docs.append({
+                "kind": "note",
+                "track": track,
+                "problem_id": None,
+                "title": heading.strip(),
+                "text": _clip(body),
+            })
+    return docs
+
+
+def write_index(docs: list[dict], out_dir: str, embedder=None):
+    """Embed *docs* and atomically replace the index files in *out_dir*."""
+    embedder = embedder or get_embedder()
+    vectors = embedder.embed([f"{doc['title']}\n{doc['text']}" for doc in docs])
+    os.makedirs(out_dir, exist_ok=True)
+
+    tmp_vectors = os.path.join(out_dir, "vectors.tmp.npy")
+    np.save(tmp_vectors, vectors)
+    os.replace(tmp_vectors, os.path.join(out_dir, "vectors.npy"))
+
+    tmp_docs = os.path.join(out_dir, "docs.tmp.json")
+    with open(tmp_docs, "w", encoding="utf-8") as f:
+        json.dump({"embedder": embedder.name, "docs": docs}, f, ensure_ascii=False)
+    os.replace(tmp_docs, os.path.join(out_dir, "docs.json"))
+
+
+class RetrievalIndex:
+    """Top-k cosine search over the memory-mapped snippet matrix.
+
+    The index is loaded lazily and reloaded when ``docs.json`` changes, so
+    an offline rebuild is picked up without restarting workers. When no
+    index has been built, ``available`` is False and callers fall back to
+    their previous prompt construction.
+    """
+
+    def __init__(self, index_dir: Optional[str] = None):
+        self.index_dir = index_dir or settings.RETRIEVAL_INDEX_DIR
+        self._mtime: Optional[float] = None
+        self._vectors: Optional[np.ndarray] = None
+        self._docs: list[dict] = []
+        self._tracks: Optional[np.ndarray] = None
+        self._problem_ids: Optional[np.ndarray] = None
+        self._embedder = None
+
+    def _load(self) -> bool:
+        docs_path = os.path.join(self.index_dir, "docs.json")
+        try:
+            mtime = os.stat(docs_path).st_mtime
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return True
+
+        with open(docs_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        vectors = np.load(os.path.join(self.index_dir, "vectors.npy"), mmap_mode="r")
+        docs = meta["docs"]
+        if vectors.shape[0] != len(docs):
+            logger.warning("Retrieval index is mid-rebuild; keeping the previous one")
+            return self._vectors is not None
+
+        if self._embedder is None or self._embedder.name != meta["embedder"]:
+            self._embedder = get_embedder(meta["embedder"])
+            if self._embedder.name != meta["embedder"]:
+                # Query vectors would not live in the index's embedding space
+                logger.error(f"Cannot load embedder {meta['embedder']}; retrieval disabled")
+                self._embedder = None
+                return False
+        self._vectors = vectors
+        self._docs = docs
+        self._tracks = np.array([doc["track"] for doc in docs])
+        self._problem_ids = np.array(
+            [doc["problem_id"] if doc["problem_id"] is not None else -1 for doc in docs]
+        )
+        self._mtime = mtime
+        return True
+
+    @property
+    def available(self) -> bool:
+        return self._load()
+
+    def search(
+        self,
+        query: str,
+        k: int = 3,
+        track: Optional[str] = None,
+        problem_id: Optional[int] = None,
+        kinds: Optional[set[str]] = None,
+        min_score: float = 0.0,
+    ) -> list[dict]:
+        """Return up to *k* snippets most similar to *query*, best first."""
+        if not self._load() or not self._docs:
+            return []
+
+        query_vector = self._embedder.embed([query])[0]
+        scores = np.asarray(self._vectors @ query_vector, dtype=np.float64)
+        if track is not None:
+            scores[self._tracks != track] = -np.inf
+        if problem_id is not None:
+            scores[self._problem_ids != problem_id] = -np.inf
+        if kinds is not None:
+            kind_mask = np.array([doc["kind"] in kinds for doc in self._docs])
+            scores[~kind_mask] = -np.inf
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {**self._docs[i], "score": float(scores[i])}
+            for i in top
+            if np.isfinite(scores[i]) and scores[i] > min_score
+        ]
+
+
+def format_snippets(snippets: list[dict]) -> str:
+    return "\n\n".join(f"[{s['title']}]\n{s['text']}" for s in snippets)
+
+
+async def build(out_dir: str):
+    """Build the index from the database and the curated notes."""
+    from sqlmodel import select
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    from app.database import engine
+    from app.models.problem import Problem
+
+    docs = note_docs()
+    async with AsyncSession(engine) as db:
+        result = await db.execute(select(Problem))
+        problems = result.scalars().all()
+        for problem in problems:
+            docs.extend(problem_docs(problem))
+            # Students' submissions are never indexed: they are not ours to show
+            if problem.reference_solution:
+                docs.append(solution_doc(problem.id, problem.title_en, problem.reference_solution))
+    await engine.dispose()
+
+    write_index(docs, out_dir)
+    logger.info(f"Wrote {len(docs)} snippets to {out_dir}")
+
+
+retrieval_index = RetrievalIndex()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the chat retrieval index")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--out", default=settings.RETRIEVAL_INDEX_DIR)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(build(args.out))
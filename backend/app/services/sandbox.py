@@ -0,0 +1,128 @@
+"""Compile and run untrusted C++ with resource limits.
+
+Programs get CPU, memory, output-size and process-count limits and their
+own session, but no filesystem or network isolation. Features built on
+this are off by default; enable them only inside a locked-down container.
+"""
+import asyncio
+import os
+import resource
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from app.config import get_settings
+
+settings = get_settings()
+
+COMPILE_TIMEOUT = 30
+MEMORY_LIMIT_BYTES = 256 * 1024 * 1024
+OUTPUT_LIMIT_BYTES = 1024 * 1024
+
+
+@dataclass
+class RunResult:
+    output: str = ""
+    reason: Optional[str] = None  # None, "timeout" or "runtime_error"
+
+
+def _resource_limiter(time_limit: float):
+    cpu = max(1, int(time_limit) + 1)
+
+    def limit():
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+        resource.setrlimit(resource.RLIMIT_AS, (MEMORY_LIMIT_BYTES, MEMORY_LIMIT_BYTES))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (OUTPUT_LIMIT_BYTES, OUTPUT_LIMIT_BYTES))
+        resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+        os.setsid()
+    return limit
+
+
+async def compile_cpp(code: str, binary: Path) -> tuple[bool, str]:
+    """Compile *code* to *binary* with ``-O2``; returns (ok, compiler stderr)."""
+    source = binary.with_suffix(".cpp")
+    source.write_text(code, encoding="utf-8")
+    proc = await asyncio.create_subprocess_exec(
+        settings.STATIC_ANALYSIS_COMPILER, "-O2", "-std=c++17", "-o", str(binary), str(source),
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        _, stderr = await asyncio.wait_for(proc.communicate(), COMPILE_TIMEOUT)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        return False, "compilation timed out"
+    finally:
+        source.unlink(missing_ok=True)
+    return proc.returncode == 0, stderr.decode(errors="replace")
+
+
+async def _feed(proc, data: bytes):
+    try:
+        proc.stdin.write(data)
+        await proc.stdin.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass  # The program exited without reading all of its input
+    finally:
+        proc.stdin.close()
+
+
+async def _read_limited(stream) -> tuple[bytes, bool]:
+    """Read *stream* to EOF, stopping past OUTPUT_LIMIT_BYTES; returns (output, overflowed)."""
+    chunks, size = [], 0
+    while True:
+        chunk = await stream.read(64 * 1024)
+        if not chunk:
+            return b"".join(chunks), False
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > OUTPUT_LIMIT_BYTES:
+            return b"".join(chunks)[:OUTPUT_LIMIT_BYTES], True
+
+
+async def run_binary(binary: Path, stdin: str, time_limit: float, args: tuple = ()) -> RunResult:
+    """Run *binary* on *stdin* within *time_limit* seconds of wall time.
+
+    Output is read as it is produced; a program writing more than
+    OUTPUT_LIMIT_BYTES (RLIMIT_FSIZE does not cover pipes) is killed and
+    treated as a runtime error.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        str(binary),
+        *map(str, args),
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+        cwd=binary.parent,
+        preexec_fn=_resource_limiter(time_limit),
+    )
+
+    async def interact() -> tuple[bytes, bool]:
+        feeder = asyncio.create_task(_feed(proc, stdin.encode()))
+        try:
+            stdout, overflowed = await _read_limited(proc.stdout)
+            if overflowed:
+                _kill(proc)
+            await proc.wait()
+        finally:
+            feeder.cancel()
+        return stdout, overflowed
+
+    try:
+        stdout, overflowed = await asyncio.wait_for(interact(), time_limit)
+    except asyncio.TimeoutError:
+        _kill(proc)
+        await proc.wait()
+        return RunResult(reason="timeout")
+    output = stdout.decode(errors="replace")
+    if overflowed or proc.returncode != 0:
+        return RunResult(output, "runtime_error")
+    return RunResult(output)
+
+
+def _kill(proc):
+    try:
+        proc.kill()
+    except ProcessLookupError:
+        pass  # Already exited
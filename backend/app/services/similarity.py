@@ -0,0 +1,284 @@
+import asyncio
+import re
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.config import get_settings
+from app.models.submission import Submission
+
+settings = get_settings()
+
+# Winnowing parameters: any shared run of at least KGRAM + WINDOW - 1
+# tokens is guaranteed to produce a shared fingerprint.
+KGRAM = 5
+WINDOW = 4
+
+# Fingerprints found in more than this share of a problem's submissions are
+# boilerplate (includes, fast-IO, main signature) and are ignored when
+# scoring, once the problem has enough submissions for that to be meaningful.
+COMMON_FINGERPRINT_RATIO = 0.5
+COMMON_FINGERPRINT_MIN_DOCS = 10
+
+CPP_KEYWORDS = frozenset("""
+    alignas alignof and asm auto bool break case catch char class const
+    constexpr continue decltype default delete do double else enum explicit
+    extern false float for friend goto if inline int long mutable namespace
+    new noexcept not nullptr operator or private protected public register
+    return short signed sizeof static struct switch template this throw true
+    try typedef typename union unsigned using virtual void volatile while
+""".split())
+
+_TOKEN_RE = re.compile(
+    r"""
+      (?P<comment>//[^\n]*|/\*.*?\*/)
+    | (?P<preproc>^[ \t]*\#[^\n]*)
+    | (?P<string>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')
+    | (?P<number>\d[\w.]*)
+    | (?P<ident>[A-Za-z_]\w*)
+    | (?P<op>\S)
+    """,
+    re.S | re.M | re.X,
+)
+
+
+def tokenize_cpp(code: str) -> list[str]:
+    """Tokenize C++ with renaming-insensitive normalization.
+
+    Comments and preprocessor lines are dropped, identifiers become ``V``,
+    literals become ``S``/``N``; keywords and operators are kept.
+    """
+    tokens = []
+    for match in _TOKEN_RE.finditer(code):
+        kind = match.lastgroup
+        if kind in ("comment", "preproc"):
+            continue
+        if kind == "string":
+            tokens.append("S")
+        elif kind == "number":
+            tokens.append("N")
+        elif kind == "ident":
+            text = match.group()
+            tokens.append(text if text in CPP_KEYWORDS else "V")
+        else:
+            tokens.append(match.group())
+    return tokens
+
+
+def winnow(tokens: list[str], k: int = KGRAM, w: int = WINDOW) -> frozenset[int]:
+    """Select winnowing fingerprints from the k-gram hashes of *tokens*."""
+    if len(tokens) < k:
+        return frozenset()
+    # crc32 rather than hash() so fingerprints agree across worker processes
+    hashes = [
+        zlib.crc32(" ".join(tokens[i:i + k]).encode("utf-8"))
+        for i in range(len(tokens) - k + 1)
+    ]
+    if len(hashes) <= w:
+        return frozenset([min(hashes)])
+    selected = set()
+    for i in range(len(hashes) - w + 1):
+        selected.add(min(hashes[i:i + w]))
+    return frozenset(selected)
+
+
+def fingerprint_code(code: str) -> frozenset[int]:
+    return winnow(tokenize_cpp(code))
+
+
+def fingerprint_batch(codes: list[str]) -> list[frozenset[int]]:
+    """Process-pool entry point: fingerprint a chunk of submissions."""
+    return [fingerprint_code(code) for code in codes]
+
+
+def jaccard(a: frozenset[int], b: frozenset[int]) -> float:
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+def similar_pairs(
+    owners: list[str],
+    fingerprints: list[frozenset[int]],
+    threshold: float,
+) -> list[tuple[int, int, float]]:
+    """Process-pool entry point: all cross-user pairs at or above *threshold*.
+
+    Candidates come from an inverted index, so only submissions sharing at
+    least one non-boilerplate fingerprint are ever compared.
+    """
+    postings: dict[int, list[int]] = {}
+    for idx, fps in enumerate(fingerprints):
+        for fp in fps:
+            postings.setdefault(fp, []).append(idx)
+
+    limit = len(owners)
+    if len(owners) >= COMMON_FINGERPRINT_MIN_DOCS:
+        limit = max(2, int(len(owners) * COMMON_FINGERPRINT_RATIO))
+
+    pairs = []
+    for i, fps in enumerate(fingerprints):
+        candidates = set()
+        for fp in fps:
+            docs = postings[fp]
+            if len(docs) <= limit:
+                candidates.update(j for j in docs if j > i)
+        for j in candidates:
+            if owners[i] == owners[j]:
+                continue
+            score = jaccard(fps, fingerprints[j])
+            if score >= threshold:
+                pairs.append((i, j, score))
+    pairs.sort(key=lambda pair: pair[2], reverse=True)
+    return pairs
+
+
+class _ProblemIndex:
+    """Inverted fingerprint index over one problem's submissions."""
+
+    def __init__(self):
+        self.postings: dict[int, set[UUID]] = {}
+        self.docs: dict[UUID, frozenset[int]] = {}
+        self.owners: dict[UUID, UUID] = {}
+        self.watermark: Optional[datetime] = None
+
+    def add(self, submission_id: UUID, user_id: UUID, fingerprints: frozenset[int]):
+        if submission_id in self.docs:
+            return
+        self.docs[submission_id] = fingerprints
+        self.owners[submission_id] = user_id
+        for fp in fingerprints:
+            self.postings.setdefault(fp, set()).add(submission_id)
+
+    def top_k(self, submission_id: UUID, k: int) -> list[tuple[UUID, UUID, float]]:
+        fps = self.docs.get(submission_id)
+        if not fps:
+            return []
+        limit = len(self.docs)
+        if len(self.docs) >= COMMON_FINGERPRINT_MIN_DOCS:
+            limit = max(2, int(len(self.docs) * COMMON_FINGERPRINT_RATIO))
+
+        owner = self.owners[submission_id]
+        shared = Counter()
+        for fp in fps:
+            docs = self.postings.get(fp, ())
+            if len(docs) <= limit:
+                shared.update(docs)
+
+        results = []
+        for other_id in shared:
+            if self.owners[other_id] == owner:
+                continue
+            other_fps = self.docs[other_id]
+            results.append((other_id, self.owners[other_id], jaccard(fps, other_fps)))
+        results.sort(key=lambda item: item[2], reverse=True)
+        return results[:k]
+
+
+class SimilarityIndex:
+    """Incremental per-problem winnowing index over submitted code.
+
+    Each worker keeps its own in-memory index. A problem is loaded from the
+    database the first time it is queried and later catches up by reading
+    only submissions newer than its watermark, so rows inserted by other
+    workers are picked up too.
+    """
+
+    def __init__(self):
+        self._problems: dict[int, _ProblemIndex] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def add(
+        self,
+        problem_id: int,
+        submission_id: UUID,
+        user_id: UUID,
+        code: str,
+    ):
+        """Index a freshly inserted submission if its problem is loaded.
+
+        The watermark is left alone so that rows other workers inserted in
+        the meantime are still picked up by the next refresh.
+        """
+        index = self._problems.get(problem_id)
+        if index is None:
+            return
+        index.add(submission_id, user_id, fingerprint_code(code))
+
+    async def refresh(self, db: AsyncSession, problem_id: int) -> _ProblemIndex:
+        index = self._problems.setdefault(problem_id, _ProblemIndex())
+        query = select(
+            Submission.id, Submission.user_id, Submission.code, Submission.created_at
+        ).where(Submission.problem_id == problem_id)
+        if index.watermark is not None:
+            query = query.where(Submission.created_at >= index.watermark)
+        result = await db.execute(query.order_by(Submission.created_at))
+        for submission_id, user_id, code, created_at in result.all():
+            if submission_id not in index.docs:
+                index.add(submission_id, user_id, fingerprint_code(code))
+            index.watermark = created_at
+        return index
+
+    async def most_similar(
+        self, db: AsyncSession, problem_id: int, submission_id: UUID, k: int = 5
+    ) -> list[tuple[UUID, UUID, float]]:
+        """Top-k submissions by other users most similar to *submission_id*."""
+        index = await self.refresh(db, problem_id)
+        return index.top_k(submission_id, k)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=settings.SIMILARITY_WORKERS)
+        return self._pool
+
+    async def report(
+        self, db: AsyncSession, problem_id: int, threshold: float, chunk_size: int = 200
+    ) -> tuple[int, list[tuple[UUID, UUID, UUID, UUID, float]]]:
+        """Batch report of suspicious pairs for a whole problem.
+
+        Fingerprinting and pair search run in a worker process pool so a
+        large report does not block the event loop.
+        """
+        result = await db.execute(
+            select(Submission.id, Submission.user_id, Submission.code)
+            .where(Submission.problem_id == problem_id)
+        )
+        rows = result.all()
+        if not rows:
+            return 0, []
+
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        codes = [row.code for row in rows]
+        chunks = await asyncio.gather(*[
+            loop.run_in_executor(pool, fingerprint_batch, codes[i:i + chunk_size])
+            for i in range(0, len(codes), chunk_size)
+        ])
+        fingerprints = [fps for chunk in chunks for fps in chunk]
+
+        pairs = await loop.run_in_executor(
+            pool,
+            similar_pairs,
+            [str(row.user_id) for row in rows],
+            fingerprints,
+            threshold,
+        )
+        return len(rows), [
+            (rows[i].id, rows[i].user_id, rows[j].id, rows[j].user_id, score)
+            for i, j, score in pairs
+        ]
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+similarity_index = SimilarityIndex()
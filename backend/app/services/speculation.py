@@ -0,0 +1,268 @@
+"""Speculative answers to the follow-up suggestions of a chat reply.
+
+Students click the suggested follow-ups a lot, and each click used to
+wait for a full Gemini call. With SPECULATIVE_CHAT_ENABLED, answers to a
+reply's suggestions are computed in the background right after it is
+sent, so a click is answered from the store.
+
+Speculation is low priority and capped: it only starts while this
+worker's AI slots are less than half used, at most
+SPECULATIVE_CHAT_MAX_CONCURRENT calls run at once (further suggestions
+are skipped, not queued), and the tokens it spends per hour are capped.
+Tokens of a speculated answer are charged to the student only when they
+actually click it. Answers are keyed by caller, track, suggestion text
+and the code/project/problem the reply was about, kept in Redis when
+REDIS_URL is configured (per worker otherwise), and expire after
+SPECULATIVE_CHAT_TTL_SECONDS.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.config import get_settings
+from app.database import engine
+from app.middleware.admission import admission
+from app.redis_client import get_redis
+from app.schemas.chat import ChatRequest
+from app.services.ai_service import ai_service
+from app.services.chat_context import build_problem_context, simulation_context
+from app.services.circuit_breaker import OPEN
+from app.services.rate_limiter import metered, record_llm_tokens
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "speculative_chat"
+# Answers kept per worker without Redis
+LOCAL_CAPACITY = 2048
+# Longest a click waits for a speculation that is still running
+JOIN_TIMEOUT_SECONDS = 30.0
+
+
+def speculation_key(identity: str, request: ChatRequest) -> str:
+    """Storage key of the answer to *request* for *identity*."""
+    payload = json.dumps(
+        [
+            " ".join(request.message.lower().split()),
+            request.problem_id,
+            request.code_context,
+            request.project_context,
+        ],
+        ensure_ascii=False,
+    )
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return f"{KEY_PREFIX}:{identity}:{request.track}:{digest}"
+
+
+class SuggestionPrefetcher:
+    """Precomputes, stores and serves answers to suggested follow-ups."""
+
+    def __init__(self):
+        self._local: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
+        # Speculation tasks of each session's latest reply, by key
+        self._sessions: dict[str, dict[str, asyncio.Task]] = {}
+        self._hour = 0
+        self._hour_tokens = 0
+        self.started = 0
+        self.skipped = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.SPECULATIVE_CHAT_ENABLED
+
+    # ── Storage ──────────────────────────────────────────────────────────
+
+    async def _store(self, key: str, entry: dict):
+        redis = get_redis()
+        if redis is not None:
+            try:
+                await redis.set(key, json.dumps(entry, ensure_ascii=False), ex=settings.SPECULATIVE_CHAT_TTL_SECONDS)
+                return
+            except Exception as e:
+                logger.warning(f"Speculative answer store failed, keeping it locally: {e}")
+        self._local[key] = (entry, time.time() + settings.SPECULATIVE_CHAT_TTL_SECONDS)
+        self._local.move_to_end(key)
+        while len(self._local) > LOCAL_CAPACITY:
+            self._local.popitem(last=False)
+
+    async def _pop(self, key: str) -> Optional[dict]:
+        entry, expires_at = self._local.pop(key, (None, 0.0))
+        if entry is not None and expires_at > time.time():
+            return entry
+        redis = get_redis()
+        if redis is None:
+            return None
+        try:
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.get(key)
+                pipe.delete(key)
+                raw, _ = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Speculative answer lookup failed: {e}")
+            return None
+        return json.loads(raw) if raw else None
+
+    # ── Budget ───────────────────────────────────────────────────────────
+
+    def _roll_hour(self):
+        hour = int(time.time() // 3600)
+        if hour != self._hour:
+            self._hour, self._hour_tokens = hour, 0
+
+    def _tokens_left(self) -> int:
+        self._roll_hour()
+        return settings.SPECULATIVE_CHAT_TOKENS_PER_HOUR - self._hour_tokens
+
+    def _spend(self, tokens: int):
+        self._roll_hour()
+        self._hour_tokens += tokens
+
+    def _may_start(self) -> bool:
+        running = sum(len(tasks) for tasks in self._sessions.values())
+        return (
+            running < settings.SPECULATIVE_CHAT_MAX_CONCURRENT
+            and admission.inflight < admission.limit / 2
+            and self._tokens_left() > 0
+            and ai_service.breakers["chat"].state != OPEN
+            and ai_service.breakers["speculative_chat"].state != OPEN
+        )
+
+    # ── Serving ──────────────────────────────────────────────────────────
+
+    async def take(self, identity: str, request: ChatRequest) -> Optional[dict]:
+        """The speculated answer to *request*, or None. Each answer is served once.
+
+        A speculation still running on this worker is awaited rather than
+        duplicated.
+        """
+        if not self.enabled:
+            return None
+        key = speculation_key(identity, request)
+        task = self._inflight.get(key)
+        if task is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(task), JOIN_TIMEOUT_SECONDS)
+            except Exception:
+                pass  # Failed or too slow; the caller answers it normally
+        entry = await self._pop(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # The student asked for it after all; count it against their quota
+        record_llm_tokens(entry["tokens"])
+        return entry["answer"]
+
+    # ── Speculation ──────────────────────────────────────────────────────
+
+    def schedule(
+        self,
+        identity: str,
+        request: ChatRequest,
+        suggestions: list,
+        simulation: Optional[str] = None,
+    ):
+        """Start answering *suggestions* in the background, within the budget.
+
+        *simulation* is the reply's sketch simulation, if it was run.
+        Speculation left over from the session's previous reply is
+        cancelled: the student has moved on.
+        """
+        if not self.enabled:
+            return
+        session = f"{identity}:{request.track}"
+        for key, task in self._sessions.pop(session, {}).items():
+            task.cancel()
+            self._inflight.pop(key, None)
+
+        tasks = {}
+        self._sessions[session] = tasks
+        for suggestion in suggestions[: settings.SPECULATIVE_CHAT_MAX_SUGGESTIONS]:
+            if not isinstance(suggestion, str) or not suggestion.strip():
+                continue
+            follow_up = request.model_copy(update={"message": suggestion})
+            key = speculation_key(identity, follow_up)
+            if key in self._inflight:
+                continue
+            if not self._may_start():
+                self.skipped += 1
+                continue
+            self.started += 1
+            task = asyncio.create_task(
+                self._speculate(key, identity, follow_up, simulation)
+            )
+            self._inflight[key] = task
+            tasks[key] = task
+            task.add_done_callback(lambda t, key=key: self._finished(session, key, t))
+        if not tasks:
+            del self._sessions[session]
+
+    def _finished(self, session: str, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        tasks = self._sessions.get(session)
+        if tasks is not None and tasks.get(key) is task:
+            del tasks[key]
+            if not tasks:
+                del self._sessions[session]
+
+    async def _speculate(
+        self,
+        key: str,
+        identity: str,
+        request: ChatRequest,
+        simulation: Optional[str],
+    ):
+        # Retrieved snippets depend on the message, so build it for the follow-up
+        async with AsyncSession(engine) as db:
+            problem_context = await build_problem_context(request, db)
+        if simulation is None:
+            simulation = await simulation_context(request)
+        with metered(identity, "/api/chat/speculative") as meter:
+            try:
+                answer = await ai_service.speculative_chat(
+                    track=request.track,
+                    message=request.message,
+                    problem_context=problem_context,
+                    code_context=request.code_context,
+                    project_context=request.project_context,
+                    simulation_context=simulation,
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.info(f"Speculative chat answer failed: {e}")
+                return
+            finally:
+                self._spend(meter.tokens)
+        await self._store(key, {"answer": answer, "tokens": meter.tokens})
+
+    def shutdown(self):
+        """Cancel speculation still running; nobody will click it now."""
+        for task in list(self._inflight.values()):
+            task.cancel()
+
+    def stats(self) -> dict:
+        served = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "started": self.started,
+            "skipped": self.skipped,
+            "running": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / served if served else 0.0,
+            "tokens_this_hour": self._hour_tokens,
+        }
+
+
+suggestion_prefetcher = SuggestionPrefetcher()
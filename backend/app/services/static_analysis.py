@@ -0,0 +1,206 @@
+"""Local checks run on student C++ before it is sent to the LLM.
+
+``g++ -fsyntax-only`` finds compile errors and warnings for free, and a few
+pattern checks flag common competitive-programming pitfalls. Code that does
+not compile gets its verdict without an LLM call; otherwise the model is
+handed these compact findings instead of being asked to discover them.
+"""
+import asyncio
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+COMPILE_TIMEOUT = 10
+# Concurrent compiler processes per worker
+MAX_CONCURRENT_COMPILES = 4
+# Diagnostics kept per category, so findings stay compact
+MAX_DIAGNOSTICS = 5
+
+_DIAGNOSTIC_RE = re.compile(r"^<stdin>:(\d+):(\d+): (error|warning): (.*)$")
+_POWER_RE = re.compile(r"10\s*\^\s*\{?\s*(\d+)\s*\}?|\b1e(\d+)\b", re.IGNORECASE)
+_DECL_RE = re.compile(
+    r"\b(?:int|long long|long|double|float|char|bool)\s+([A-Za-z_]\w*)\s*;"
+)
+_INT_DECL_RE = re.compile(r"\bint\s+(?!main\b)[A-Za-z_]")
+
+_compile_slots = asyncio.Semaphore(MAX_CONCURRENT_COMPILES)
+_compiler_missing = False
+
+
+@dataclass
+class AnalysisReport:
+    compiled: Optional[bool] = None  # None when the compiler did not run
+    errors: list[str] = field(default_factory=list)
+    warnings: list[str] = field(default_factory=list)
+    findings: list[str] = field(default_factory=list)
+
+    @property
+    def has_errors(self) -> bool:
+        return self.compiled is False and bool(self.errors)
+
+    def summary(self) -> str:
+        """Compact bullet list for the LLM prompt."""
+        lines = []
+        if self.compiled:
+            lines.append("- Compiles cleanly with g++ -fsyntax-only (no syntax errors).")
+        lines += [f"- Compiler warning: {w}" for w in self.warnings]
+        lines += [f"- {f}" for f in self.findings]
+        return "\n".join(lines)
+
+
+def is_arduino_sketch(code: str) -> bool:
+    return bool(re.search(r"\bvoid\s+setup\s*\(", code) and re.search(r"\bvoid\s+loop\s*\(", code)) \
+        and not re.search(r"\bint\s+main\s*\(", code)
+
+
+def max_power_of_ten(text: Optional[str]) -> int:
+    """Largest exponent in ``10^k`` / ``1ek`` bounds mentioned in *text*."""
+    powers = [int(a or b) for a, b in _POWER_RE.findall(text or "")]
+    return max(powers, default=0)
+
+
+def _strip_comments_and_strings(code: str) -> str:
+    code = re.sub(r"//[^\n]*|/\*.*?\*/", " ", code, flags=re.S)
+    return re.sub(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'', '""', code)
+
+
+def _overflow_finding(code: str, power: int) -> Optional[str]:
+    if power >= 10 and _INT_DECL_RE.search(code) and "long long" not in code \
+            and "int64_t" not in code:
+        return (
+            f"Possible overflow: constraints reach 10^{power} but values are stored in "
+            "`int` (max ~2.1e9); `long long` is needed."
+        )
+    return None
+
+
+def _uninitialized_findings(code: str) -> list[str]:
+    findings = []
+    for match in _DECL_RE.finditer(code):
+        # Globals are zero-initialized
+        if code.count("{", 0, match.start()) == code.count("}", 0, match.start()):
+            continue
+        name = match.group(1)
+        rest = code[match.end():]
+        first_use = re.search(rf"(?<![\w.]){re.escape(name)}\b", rest)
+        if not first_use:
+            continue
+        before = rest[max(0, first_use.start() - 2):first_use.start()]
+        after = rest[first_use.end():first_use.end() + 3].lstrip()
+        compound = re.match(r"\+=|-=|\*=|/=|\+\+|--", after)
+        operator = compound.group(0) if compound else before if before in ("++", "--") else None
+        if operator:
+            findings.append(
+                f"`{name}` is declared without an initial value and then updated "
+                f"with `{operator}`; initialize it first."
+            )
+    return findings[:MAX_DIAGNOSTICS]
+
+
+def _loop_body_span(code: str, start: int) -> tuple[int, int]:
+    """Span of the body of the loop whose header starts at *start*."""
+    depth, i = 0, code.index("(", start)
+    while i < len(code):
+        if code[i] == "(":
+            depth += 1
+        elif code[i] == ")":
+            depth -= 1
+            if depth == 0:
+                break
+        i += 1
+    body_start = i + 1
+    j = body_start
+    while j < len(code) and code[j].isspace():
+        j += 1
+    if j < len(code) and code[j] == "{":
+        depth = 0
+        for k in range(j, len(code)):
+            if code[k] == "{":
+                depth += 1
+            elif code[k] == "}":
+                depth -= 1
+                if depth == 0:
+                    return body_start, k
+        return body_start, len(code)
+    end = code.find(";", j)
+    return body_start, len(code) if end == -1 else end
+
+
+def _nested_loop_finding(code: str, power: int) -> Optional[str]:
+    if power < 5:
+        return None
+    for match in re.finditer(r"\b(?:for|while)\s*\(", code):
+        try:
+            body_start, body_end = _loop_body_span(code, match.start())
+        except ValueError:
+            continue
+        if re.search(r"\b(?:for|while)\s*\(", code[body_start:body_end]):
+            line = code.count("\n", 0, match.start()) + 1
+            return (
+                f"Nested loops starting at line {line} look O(n^2); with n up to "
+                f"10^{power} that is ~10^{2 * power} steps, too slow for typical limits."
+            )
+    return None
+
+
+def pattern_findings(code: str, constraints: Optional[str] = None) -> list[str]:
+    """Heuristic checks for overflow, uninitialized accumulators and O(n^2) loops."""
+    code = _strip_comments_and_strings(code)
+    power = max_power_of_ten(constraints)
+    findings = [_overflow_finding(code, power), *_uninitialized_findings(code),
+                _nested_loop_finding(code, power)]
+    return [f for f in findings if f]
+
+
+async def compile_check(code: str, report: AnalysisReport):
+    """Fill *report* with ``g++ -fsyntax-only`` diagnostics."""
+    global _compiler_missing
+    if _compiler_missing:
+        return
+    async with _compile_slots:
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                settings.STATIC_ANALYSIS_COMPILER, "-fsyntax-only", "-std=c++17",
+                "-Wall", "-Wextra", "-fmax-errors=5", "-x", "c++", "-",
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except FileNotFoundError:
+            _compiler_missing = True
+            logger.warning(f"{settings.STATIC_ANALYSIS_COMPILER} not found; skipping compile checks")
+            return
+        try:
+            _, stderr = await asyncio.wait_for(proc.communicate(code.encode()), COMPILE_TIMEOUT)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            logger.warning("Compile check timed out")
+            return
+
+    for line in stderr.decode(errors="replace").splitlines():
+        match = _DIAGNOSTIC_RE.match(line)
+        if not match:
+            continue
+        line_no, _, kind, message = match.groups()
+        target = report.errors if kind == "error" else report.warnings
+        if len(target) < MAX_DIAGNOSTICS:
+            target.append(f"line {line_no}: {message}")
+    report.compiled = proc.returncode == 0
+
+
+async def analyze_cpp(code: str, constraints: Optional[str] = None) -> AnalysisReport:
+    """Compile-check and pattern-check a C++ submission."""
+    report = AnalysisReport()
+    if not settings.STATIC_ANALYSIS_ENABLED or is_arduino_sketch(code):
+        return report
+    await compile_check(code, report)
+    if not report.has_errors:
+        report.findings = pattern_findings(code, constraints)
+    return report
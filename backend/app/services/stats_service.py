@@ -0,0 +1,156 @@
+import logging
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.problem import Problem
+from app.models.problem_stats import ProblemStats
+from app.models.submission import Submission
+from app.models.user_problem_stats import UserProblemStats
+from app.models.user_stats import UserStats
+
+logger = logging.getLogger(__name__)
+
+ACCEPTED = "ACCEPTED"
+# Failed verdicts that move the student one rung up the problem's hint
+# ladder; compile errors get their own hint instead
+HINTED_STATUSES = {"WRONG_ANSWER", "LOGIC_ERROR", "RUNTIME_ERROR"}
+
+
+def _bump(counts: dict, status: str) -> dict:
+    # Return a new dict so SQLAlchemy notices the JSON column changed
+    counts = dict(counts or {})
+    counts[status] = counts.get(status, 0) + 1
+    return counts
+
+
+def apply_submission(
+    user_stats: UserStats,
+    problem_stats: ProblemStats,
+    progress: UserProblemStats,
+    status: str,
+    topic: str,
+    submitted_at: datetime,
+):
+    """Fold one graded submission into the three aggregate rows.
+
+    *progress* must still hold the user's state on this problem from before
+    the submission; first attempt/accept transitions are derived from it.
+    """
+    first_attempt = progress.attempts == 0
+    first_accept = status == ACCEPTED and progress.accepted == 0
+
+    progress.attempts += 1
+    progress.status_counts = _bump(progress.status_counts, status)
+    progress.last_status = status
+    progress.last_submitted_at = submitted_at
+    if first_attempt:
+        progress.first_attempt_at = submitted_at
+    if status in HINTED_STATUSES:
+        progress.hint_level += 1
+
+    user_stats.attempts += 1
+    user_stats.status_counts = _bump(user_stats.status_counts, status)
+
+    problem_stats.attempts += 1
+    problem_stats.status_counts = _bump(problem_stats.status_counts, status)
+    if first_attempt:
+        problem_stats.attempted_by += 1
+
+    if status == ACCEPTED:
+        progress.accepted += 1
+        user_stats.accepted += 1
+        problem_stats.accepted += 1
+    if first_accept:
+        progress.first_accepted_at = submitted_at
+        user_stats.solved += 1
+        user_stats.topic_solved = _bump(user_stats.topic_solved, topic)
+        problem_stats.solved_by += 1
+
+
+class StatsService:
+    """Incrementally maintained per-user and per-problem submission statistics.
+
+    Aggregates are updated in the same transaction that inserts the
+    submission, so reads are single primary-key lookups instead of scans
+    over ``submissions``.
+    """
+
+    async def _locked_row(self, db: AsyncSession, model, **key):
+        # Create the row if missing without racing concurrent submitters,
+        # then lock it for the read-modify-write below.
+        await db.execute(insert(model).values(**key).on_conflict_do_nothing())
+        conditions = [getattr(model, name) == value for name, value in key.items()]
+        result = await db.execute(select(model).where(*conditions).with_for_update())
+        return result.scalar_one()
+
+    async def record_submission(
+        self, db: AsyncSession, submission: Submission, problem: Problem
+    ) -> UserProblemStats:
+        """Update aggregates for a new submission. The caller commits."""
+        # Lock in a fixed order so concurrent submissions cannot deadlock
+        user_stats = await self._locked_row(db, UserStats, user_id=submission.user_id)
+        problem_stats = await self._locked_row(db, ProblemStats, problem_id=problem.id)
+        progress = await self._locked_row(
+            db, UserProblemStats, user_id=submission.user_id, problem_id=problem.id
+        )
+        apply_submission(
+            user_stats,
+            problem_stats,
+            progress,
+            submission.status,
+            problem.topic,
+            submission.created_at or datetime.utcnow(),
+        )
+        return progress
+
+    async def rebuild(self, db: AsyncSession) -> int:
+        """Recompute every aggregate from ``submissions``. Returns rows replayed."""
+        await db.execute(delete(UserProblemStats))
+        await db.execute(delete(ProblemStats))
+        await db.execute(delete(UserStats))
+
+        users: dict[UUID, UserStats] = {}
+        problems: dict[int, ProblemStats] = {}
+        progress: dict[tuple[UUID, int], UserProblemStats] = {}
+
+        replayed = 0
+        result = await db.stream(
+            select(
+                Submission.user_id,
+                Submission.problem_id,
+                Submission.status,
+                Submission.created_at,
+                Problem.topic,
+            )
+            .join(Problem, Problem.id == Submission.problem_id)
+            .order_by(Submission.created_at)
+        )
+        async for user_id, problem_id, status, created_at, topic in result:
+            if user_id not in users:
+                users[user_id] = UserStats(user_id=user_id)
+            if problem_id not in problems:
+                problems[problem_id] = ProblemStats(problem_id=problem_id)
+            key = (user_id, problem_id)
+            if key not in progress:
+                progress[key] = UserProblemStats(user_id=user_id, problem_id=problem_id)
+            apply_submission(
+                users[user_id], problems[problem_id], progress[key],
+                status, topic, created_at,
+            )
+            replayed += 1
+
+        db.add_all(list(users.values()))
+        db.add_all(list(problems.values()))
+        await db.flush()
+        db.add_all(list(progress.values()))
+        await db.commit()
+        logger.info(f"Rebuilt submission stats from {replayed} submissions")
+        return replayed
+
+
+stats_service = StatsService()
@@ -0,0 +1,408 @@
+"""Randomized stress testing of submissions against a reference solution.
+
+Problems may carry a ``reference_solution`` and a ``stress_spec`` that
+describes random inputs within the constraints::
+
+    {
+      "cases": 200,
+      "lines": [
+        [{"var": "n", "int": [1, 8]}, {"var": "k", "int": [1, "n"]}],
+        [{"repeat": "n", "int": [-10, 10]}],
+        {"repeat": "k", "line": [{"string": {"length": [1, 5], "alphabet": "ab"}}]}
+      ]
+    }
+
+Each line is a list of space-separated items; a ``{"repeat", "line"}``
+entry repeats a line. Bounds, repeat counts and lengths may name earlier
+``var`` values.
+
+Inputs are drawn from a sequence of choices, as in property-based
+testing. When the student's output differs from the reference, the
+choice sequence is shrunk (chunks deleted, values lowered) while the
+failure persists, which yields a small counterexample.
+
+Student code runs through app.services.sandbox, which limits resources
+but does not isolate the process, so the feature is off unless
+``STRESS_TEST_ENABLED`` is set.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from app.config import get_settings
+from app.services.sandbox import compile_cpp, run_binary
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+DEFAULT_CASES = 100
+MAX_CASES = 1000
+# Candidate inputs tried while shrinking a counterexample
+MAX_SHRINK_STEPS = 300
+# Shown to the student; longer counterexamples are cut
+MAX_SHOWN_CHARS = 2000
+
+
+class SpecError(ValueError):
+    pass
+
+
+# What a spec that validated on seed 0 can still raise for other choices,
+# e.g. an empty range once an earlier variable comes out small
+GENERATION_ERRORS = (SpecError, KeyError, TypeError, ValueError, IndexError)
+
+
+def _choice_value(choice: int, lo: int, hi: int) -> int:
+    """Map a choice to a value in [lo, hi]; smaller choices land closer to 0.
+
+    Choices zigzag around the in-range value nearest 0 (0, +1, -1, +2, …)
+    and continue on the longer side once the shorter one is used up.
+    """
+    choice = max(0, choice)
+    origin = min(max(0, lo), hi)
+    up, down = hi - origin, origin - lo
+    both = min(up, down)
+    if choice <= 2 * both:
+        offset = (choice + 1) // 2
+        return origin + offset if choice % 2 else origin - offset
+    beyond = min(choice - 2 * both, max(up, down) - both)
+    return origin + both + beyond if up > down else origin - both - beyond
+
+
+def _value_choice(value: int, lo: int, hi: int) -> int:
+    """Inverse of _choice_value."""
+    origin = min(max(0, lo), hi)
+    both = min(hi - origin, origin - lo)
+    offset = value - origin
+    if abs(offset) <= both:
+        return 2 * offset - 1 if offset > 0 else -2 * offset
+    return 2 * both + abs(offset) - both
+
+
+class ChoiceSource:
+    """Draws bounded integers from a recorded choice sequence.
+
+    Past the end of the sequence, fresh random choices are appended, so
+    values are uniform in their range. Lowering a choice moves its value
+    towards 0 (or the nearest bound), which is what shrinking relies on.
+    """
+
+    def __init__(self, choices: Optional[list[int]] = None, rng: Optional[random.Random] = None):
+        self.choices = list(choices or [])
+        self.rng = rng
+        self.position = 0
+
+    def draw(self, lo: int, hi: int) -> int:
+        if hi < lo:
+            raise SpecError(f"empty range [{lo}, {hi}]")
+        if self.position < len(self.choices):
+            choice = self.choices[self.position]
+        elif self.rng is not None:
+            choice = _value_choice(self.rng.randint(lo, hi), lo, hi)
+            self.choices.append(choice)
+        else:
+            choice = 0
+            self.choices.append(choice)
+        self.position += 1
+        return _choice_value(choice, lo, hi)
+
+
+def _trimmed(choices: list[int]) -> list[int]:
+    """*choices* without trailing zeros, which a ChoiceSource supplies anyway."""
+    end = len(choices)
+    while end and choices[end - 1] == 0:
+        end -= 1
+    return choices[:end]
+
+
+def _value(bound, env: dict) -> int:
+    if isinstance(bound, str):
+        if bound not in env:
+            raise SpecError(f"unknown variable {bound!r}")
+        return env[bound]
+    return int(bound)
+
+
+def _item(spec: dict, source: ChoiceSource, env: dict) -> str:
+    if "int" in spec:
+        lo, hi = (_value(b, env) for b in spec["int"])
+        count = _value(spec["repeat"], env) if "repeat" in spec else None
+        values = [source.draw(lo, hi) for _ in range(1 if count is None else count)]
+        if "var" in spec:
+            env[spec["var"]] = values[0]
+        return " ".join(map(str, values))
+    if "string" in spec:
+        string = spec["string"]
+        alphabet = string.get("alphabet", "abcdefghijklmnopqrstuvwxyz")
+        length = string.get("length", [1, 10])
+        n = source.draw(*(_value(b, env) for b in length)) if isinstance(length, list) else _value(length, env)
+        text = "".join(alphabet[source.draw(0, len(alphabet) - 1)] for _ in range(n))
+        if "var" in spec:
+            env[spec["var"]] = len(text)
+        return text
+    if "literal" in spec:
+        return str(spec["literal"])
+    raise SpecError(f"unknown item {spec!r}")
+
+
+def _lines(lines: list, source: ChoiceSource, env: dict) -> list[str]:
+    out = []
+    for line in lines:
+        if isinstance(line, dict):
+            for _ in range(_value(line["repeat"], env)):
+                out += _lines([line["line"]], source, env)
+        else:
+            out.append(" ".join(_item(item, source, env) for item in line))
+    return out
+
+
+def generate_input(spec: dict, source: ChoiceSource) -> str:
+    """Render one test input for *spec* from *source*'s choices."""
+    return "\n".join(_lines(spec["lines"], source, {})) + "\n"
+
+
+def validate_spec(spec: dict):
+    """Raise SpecError unless *spec* can generate an input."""
+    if not isinstance(spec, dict) or not isinstance(spec.get("lines"), list):
+        raise SpecError("stress_spec needs a 'lines' list")
+    try:
+        generate_input(spec, ChoiceSource(rng=random.Random(0)))
+    except SpecError:
+        raise
+    except GENERATION_ERRORS as e:
+        raise SpecError(f"invalid stress_spec: {e}") from e
+
+
+def same_output(expected: str, actual: str) -> bool:
+    """Token-wise comparison, ignoring whitespace differences."""
+    return expected.split() == actual.split()
+
+
+@dataclass
+class StressReport:
+    status: str  # "passed", "failed" or "skipped"
+    tests_run: int = 0
+    reason: Optional[str] = None  # wrong_answer, timeout or runtime_error when failed
+    counterexample: dict = field(default_factory=dict)
+    seconds: float = 0.0
+
+    def summary(self) -> str:
+        """One line for the grader prompt."""
+        if self.status == "passed":
+            return f"Passed {self.tests_run} randomized tests against the reference solution."
+        return ""
+
+    def verdict(self) -> dict:
+        """A grade_code-style verdict for a failed run."""
+        example = self.counterexample
+        shown = {
+            key: value if len(value) <= MAX_SHOWN_CHARS else value[:MAX_SHOWN_CHARS] + "\n..."
+            for key, value in example.items()
+        }
+        status = "RUNTIME_ERROR" if self.reason in ("timeout", "runtime_error") else "WRONG_ANSWER"
+        what_en = {
+            "timeout": f"exceeded the {settings.STRESS_TIME_LIMIT_SECONDS:g}s time limit",
+            "runtime_error": "crashed",
+            "wrong_answer": "printed a wrong answer",
+        }[self.reason]
+        what_ar = {
+            "timeout": f"تجاوز الحد الزمني ({settings.STRESS_TIME_LIMIT_SECONDS:g} ثانية)",
+            "runtime_error": "توقف بخطأ أثناء التشغيل",
+            "wrong_answer": "طبع إجابة خاطئة",
+        }[self.reason]
+        details = f"Input:\n{shown['input']}\nExpected output:\n{shown['expected']}"
+        if self.reason == "wrong_answer":
+            details += f"\nYour output:\n{shown['actual']}"
+        return {
+            "status": status,
+            "is_correct": False,
+            "feedback_en": f"Your program {what_en} on this test:\n{details}",
+            "feedback_ar": f"برنامجك {what_ar} في هذا الاختبار:\n{details}",
+            "hint": "Run your program on this input by hand and compare each step with what you expect.",
+        }
+
+
+class StressTester:
+    """Compiles and runs student code against a problem's reference solution."""
+
+    def __init__(self):
+        self._workdir: Optional[Path] = None
+        self._reference_binaries: dict[str, Path] = {}
+        self._reference_locks: dict[str, asyncio.Lock] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def workdir(self) -> Path:
+        if self._workdir is None:
+            self._workdir = Path(tempfile.mkdtemp(prefix="stress-"))
+        return self._workdir
+
+    @property
+    def slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(settings.STRESS_PARALLELISM or os.cpu_count() or 1)
+        return self._slots
+
+    async def _compile(self, code: str, binary: Path) -> bool:
+        ok, _ = await compile_cpp(code, binary)
+        return ok
+
+    async def _reference_binary(self, reference: str) -> Optional[Path]:
+        key = hashlib.sha256(reference.encode("utf-8")).hexdigest()[:16]
+        lock = self._reference_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if key not in self._reference_binaries:
+                binary = self.workdir / f"ref-{key}"
+                if not await self._compile(reference, binary):
+                    logger.error(f"Reference solution {key} does not compile")
+                    return None
+                self._reference_binaries[key] = binary
+        return self._reference_binaries[key]
+
+    async def _check(self, spec: dict, choices: list[int], student: Path, reference: Path,
+                     rng: Optional[random.Random] = None) -> tuple[Optional[dict], list[int]]:
+        """Run one input; returns (failure or None, the choices it used)."""
+        source = ChoiceSource(choices, rng)
+        stdin = generate_input(spec, source)
+        used = source.choices[:source.position]
+        async with self.slots:
+            expected, actual = await asyncio.gather(
+                run_binary(reference, stdin, settings.STRESS_TIME_LIMIT_SECONDS),
+                run_binary(student, stdin, settings.STRESS_TIME_LIMIT_SECONDS),
+            )
+        if expected.reason is not None:
+            return None, used  # outside what the reference handles; not evidence
+        if actual.reason is None and same_output(expected.output, actual.output):
+            return None, used
+        return {
+            "reason": actual.reason or "wrong_answer",
+            "input": stdin,
+            "expected": expected.output,
+            "actual": actual.output,
+        }, used
+
+    async def _shrink(self, spec, choices, failure, student, reference) -> dict:
+        """Greedily minimize the choice sequence while the same kind of failure persists.
+
+        Stops after MAX_SHRINK_STEPS candidates or STRESS_BUDGET_SECONDS,
+        returning the smallest failure found so far.
+        """
+        steps = 0
+        deadline = time.monotonic() + settings.STRESS_BUDGET_SECONDS
+        choices = _trimmed(choices)
+
+        async def still_fails(candidate):
+            nonlocal steps
+            steps += 1
+            if time.monotonic() > deadline:
+                steps = MAX_SHRINK_STEPS
+                return None, None
+            try:
+                result, used = await self._check(spec, candidate, student, reference)
+            except GENERATION_ERRORS:
+                return None, None
+            used = _trimmed(used)
+            # Only strictly smaller sequences count, or equivalent ones would loop
+            if (
+                result is not None
+                and result["reason"] == failure["reason"]
+                and (len(used), used) < (len(choices), choices)
+            ):
+                return result, used
+            return None, None
+
+        improved = True
+        while improved and steps < MAX_SHRINK_STEPS:
+            improved = False
+            size = max(1, len(choices) // 2)
+            while size >= 1 and steps < MAX_SHRINK_STEPS:
+                i = 0
+                while i + size <= len(choices) and steps < MAX_SHRINK_STEPS:
+                    result, used = await still_fails(choices[:i] + choices[i + size:])
+                    if result is not None:
+                        choices, failure, improved = used, result, True
+                    else:
+                        i += size
+                size //= 2
+            i = 0
+            while i < len(choices) and steps < MAX_SHRINK_STEPS:
+                half = choices[i] // 2
+                # Odd and even choices lie on opposite sides of 0; also try keeping the sign
+                for smaller in sorted({0, half, half - half % 2 + choices[i] % 2, choices[i] - 2, choices[i] - 1}):
+                    if not 0 <= smaller < choices[i] or steps >= MAX_SHRINK_STEPS:
+                        continue
+                    result, used = await still_fails(choices[:i] + [smaller] + choices[i + 1:])
+                    if result is not None:
+                        choices, failure, improved = used, result, True
+                        break
+                i += 1
+        return failure
+
+    async def run(self, code: str, reference: Optional[str], spec: Optional[dict],
+                  seed: Optional[int] = None) -> StressReport:
+        """Stress-test *code*; ``skipped`` when the problem or environment can't support it."""
+        if not settings.STRESS_TEST_ENABLED or not reference or not spec:
+            return StressReport("skipped")
+        if shutil.which(settings.STATIC_ANALYSIS_COMPILER) is None:
+            return StressReport("skipped")
+        try:
+            validate_spec(spec)
+        except SpecError as e:
+            logger.warning(f"Skipping stress test: {e}")
+            return StressReport("skipped")
+
+        start = time.monotonic()
+        reference_binary = await self._reference_binary(reference)
+        student_binary = self.workdir / f"sub-{os.urandom(8).hex()}"
+        try:
+            if reference_binary is None or not await self._compile(code, student_binary):
+                return StressReport("skipped")
+
+            rng = random.Random(seed)
+            cases = min(int(spec.get("cases", DEFAULT_CASES)), MAX_CASES)
+            batch = settings.STRESS_PARALLELISM or os.cpu_count() or 1
+            tests_run = 0
+            while tests_run < cases:
+                if time.monotonic() - start > settings.STRESS_BUDGET_SECONDS:
+                    break
+                size = min(batch, cases - tests_run)
+                try:
+                    results = await asyncio.gather(*(
+                        self._check(spec, [], student_binary, reference_binary, random.Random(rng.random()))
+                        for _ in range(size)
+                    ))
+                except GENERATION_ERRORS as e:
+                    logger.warning(f"Skipping stress test, input generation failed: {e!r}")
+                    return StressReport("skipped")
+                tests_run += size
+                failures = [(failure, used) for failure, used in results if failure is not None]
+                if failures:
+                    failure, used = min(failures, key=lambda f: len(f[0]["input"]))
+                    failure = await self._shrink(spec, used, failure, student_binary, reference_binary)
+                    return StressReport(
+                        "failed",
+                        tests_run=tests_run,
+                        reason=failure.pop("reason"),
+                        counterexample=failure,
+                        seconds=time.monotonic() - start,
+                    )
+            return StressReport("passed", tests_run=tests_run, seconds=time.monotonic() - start)
+        finally:
+            student_binary.unlink(missing_ok=True)
+
+    def cleanup(self):
+        if self._workdir is not None:
+            shutil.rmtree(self._workdir, ignore_errors=True)
+            self._workdir = None
+            self._reference_binaries.clear()
+
+
+stress_tester = StressTester()
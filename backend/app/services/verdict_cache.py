@@ -0,0 +1,153 @@
+import hashlib
+import json
+import logging
+from typing import Optional
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.problem import Problem
+from app.models.submission import Submission
+from app.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+STATS_KEY = "verdict_cache:stats"
+
+
+def normalize_code(code: str) -> str:
+    """Normalize code so that whitespace-only edits map to the same text.
+
+    Line endings, indentation, trailing spaces and blank lines are dropped and
+    runs of whitespace are collapsed, except inside string/char literals.
+    Line structure is kept because preprocessor directives and ``//``
+    comments depend on it.
+    """
+    lines = []
+    for raw_line in code.replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+        out = []
+        quote = None
+        prev_space = False
+        i = 0
+        while i < len(raw_line):
+            ch = raw_line[i]
+            if quote:
+                out.append(ch)
+                if ch == "\\" and i + 1 < len(raw_line):
+                    out.append(raw_line[i + 1])
+                    i += 1
+                elif ch == quote:
+                    quote = None
+            elif ch in "\"'":
+                quote = ch
+                out.append(ch)
+                prev_space = False
+            elif ch.isspace():
+                if not prev_space:
+                    out.append(" ")
+                prev_space = True
+            else:
+                out.append(ch)
+                prev_space = False
+            i += 1
+        line = "".join(out).strip()
+        if line:
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def code_fingerprint(code: str) -> str:
+    """SHA-256 of the normalized code."""
+    return hashlib.sha256(normalize_code(code).encode("utf-8")).hexdigest()
+
+
+def problem_fingerprint(problem: Problem) -> str:
+    """SHA-256 over everything the grader sees about a problem.
+
+    Editing the statement, constraints, sample tests or stress-test data
+    changes the fingerprint, which invalidates every memoized verdict for
+    the problem.
+    """
+    fields = {
+        "desc_en": problem.desc_en,
+        "constraints": problem.constraints,
+        "input_format": problem.input_format,
+        "output_format": problem.output_format,
+        "sample_io": problem.sample_io,
+    }
+    # Only included when set, so problems without them keep their fingerprints
+    if problem.reference_solution or problem.stress_spec:
+        fields["reference_solution"] = problem.reference_solution
+        fields["stress_spec"] = problem.stress_spec
+    payload = json.dumps(
+        fields,
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class VerdictCache:
+    """Reuse grading results for resubmitted code on the same problem.
+
+    Verdicts live in ``submissions``, so every worker sees the same cache.
+    Hit/miss counters are kept in a Redis hash when REDIS_URL is configured
+    so ``stats`` covers all workers; otherwise they are per-worker.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    async def _count(self, field: str):
+        redis = get_redis()
+        if redis is not None:
+            try:
+                await redis.hincrby(STATS_KEY, field, 1)
+                return
+            except Exception as e:
+                logger.warning(f"Verdict cache stats update failed: {e}")
+        setattr(self, field, getattr(self, field) + 1)
+
+    async def lookup(
+        self,
+        db: AsyncSession,
+        problem_id: int,
+        code_hash: str,
+        problem_hash: str,
+    ) -> Optional[dict]:
+        """Return the stored grade result of a matching earlier submission."""
+        result = await db.execute(
+            select(Submission.grade_result)
+            .where(
+                Submission.problem_id == problem_id,
+                Submission.code_hash == code_hash,
+                Submission.problem_hash == problem_hash,
+                Submission.grade_result.is_not(None),
+            )
+            .order_by(Submission.created_at.desc())
+            .limit(1)
+        )
+        grade_result = result.scalar_one_or_none()
+        if grade_result:
+            await self._count("hits")
+            return dict(grade_result)
+        await self._count("misses")
+        return None
+
+    async def stats(self) -> dict:
+        hits, misses = self.hits, self.misses
+        redis = get_redis()
+        if redis is not None:
+            shared = await redis.hgetall(STATS_KEY)
+            hits += int(shared.get("hits", 0))
+            misses += int(shared.get("misses", 0))
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+        }
+
+
+verdict_cache = VerdictCache()
@@ -0,0 +1,73 @@
+"""Guard worker cold-start time.
+
+Imports ``app.main`` in a fresh interpreter under ``python -X importtime``
+and fails when the import exceeds the time budget or pulls in modules that
+must stay lazy (the Gemini SDK and its grpc/protobuf stack).
+
+Usage:
+    python check_import_time.py [--budget-ms 1500] [--runs 3]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+# Modules that must only be imported on first use, never at app import
+LAZY_MODULES = ("google.generativeai", "google.ai", "grpc", "google.protobuf")
+
+
+def measure() -> tuple[float, set[str]]:
+    """Return (cumulative import time of app.main in ms, modules imported)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"Importing app.main failed:\n{result.stderr}")
+
+    total_us = None
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        modules.add(name)
+        if name == "app.main":
+            total_us = int(cumulative)
+    return total_us / 1000, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    # Best of N runs, so a cold disk cache doesn't fail the check
+    timings = []
+    for _ in range(args.runs):
+        elapsed_ms, modules = measure()
+        timings.append(elapsed_ms)
+
+    eager = sorted(
+        name for name in modules
+        if any(name == lazy or name.startswith(lazy + ".") for lazy in LAZY_MODULES)
+    )
+    best = min(timings)
+    print(f"import app.main: best {best:.0f} ms of {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    if eager:
+        print(f"FAIL: modules that must be lazy were imported: {', '.join(eager)}")
+        failed = True
+    if best > args.budget_ms:
+        print("FAIL: import time is over budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
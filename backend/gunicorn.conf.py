@@ -0,0 +1,41 @@
+"""Gunicorn settings for the production server.
+
+Runs N uvicorn workers behind one gunicorn master:
+
+    gunicorn app.main:app -c gunicorn.conf.py
+
+Worker count and timeouts come from the app settings (WEB_WORKERS etc.).
+Workers split DB_MAX_CONNECTIONS between their connection pools, so the
+worker count is refused if it leaves each too few connections.
+Send SIGHUP to the master for a graceful reload: new workers are started
+and old ones finish in-flight requests before exiting. Each worker runs the
+app lifespan (schema check, client warm-up) before it accepts connections.
+"""
+from app.config import get_settings
+
+settings = get_settings()
+
+# Database connections each worker needs to serve and report ready
+MIN_CONNECTIONS_PER_WORKER = settings.READY_MIN_DB_HEADROOM + 2
+
+bind = "0.0.0.0:8000"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = settings.web_workers
+if settings.DB_MAX_CONNECTIONS // workers < MIN_CONNECTIONS_PER_WORKER:
+    raise RuntimeError(
+        f"DB_MAX_CONNECTIONS={settings.DB_MAX_CONNECTIONS} is too few for {workers} workers; "
+        f"lower WEB_WORKERS or raise both DB_MAX_CONNECTIONS and Postgres max_connections"
+    )
+
+timeout = settings.WORKER_TIMEOUT
+graceful_timeout = settings.GRACEFUL_TIMEOUT
+keepalive = 5
+
+max_requests = settings.WORKER_MAX_REQUESTS
+max_requests_jitter = settings.WORKER_MAX_REQUESTS // 10
+
+# Only these peers may set X-Forwarded-For, which the per-IP rate limits trust
+forwarded_allow_ips = settings.FORWARDED_ALLOW_IPS
+
+accesslog = "-"
+errorlog = "-"
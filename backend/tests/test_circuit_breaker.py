@@ -0,0 +1,82 @@
+import pytest
+
+from app.services import circuit_breaker as cb
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cb.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _opened(clock) -> CircuitBreaker:
+    breaker = CircuitBreaker("test", min_calls=2, reset_seconds=30)
+    for _ in range(2):
+        breaker.record(breaker.check(), False)
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_opens_once_the_failure_ratio_is_reached(clock):
+    breaker = CircuitBreaker("test", min_calls=4, failure_ratio=0.5)
+    for success in (True, True, False):
+        breaker.record(breaker.check(), success)
+    assert breaker.state == CLOSED
+    breaker.record(breaker.check(), False)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_slow_calls_count_as_failures(clock):
+    breaker = CircuitBreaker("test", min_calls=2, slow_call_seconds=5)
+    for _ in range(2):
+        breaker.record(breaker.check(), True, duration=6)
+    assert breaker.state == OPEN
+
+
+def test_one_probe_after_the_reset_time(clock):
+    breaker = _opened(clock)
+    assert breaker.allow() is None
+    clock[0] += 30
+    probe = breaker.check()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is None  # Only one probe at a time
+    breaker.record(probe, True)
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_reopens(clock):
+    breaker = _opened(clock)
+    clock[0] += 30
+    breaker.record(breaker.check(), False)
+    assert breaker.state == OPEN
+    assert breaker.retry_after == 30
+
+
+def test_released_probe_frees_the_slot(clock):
+    breaker = _opened(clock)
+    clock[0] += 30
+    breaker.release(breaker.check())
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is not None
+
+
+@pytest.mark.parametrize("success", [True, False])
+def test_stragglers_do_not_decide_the_probe(clock, success):
+    breaker = CircuitBreaker("test", min_calls=2, reset_seconds=30)
+    straggler = breaker.check()
+    for _ in range(2):
+        breaker.record(breaker.check(), False)
+    clock[0] += 30
+    probe = breaker.check()
+
+    breaker.record(straggler, success)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is None  # The probe is still in flight
+
+    breaker.record(probe, True)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["calls"] == 0
@@ -0,0 +1,60 @@
+import difflib
+
+import pytest
+
+from app.services.code_context import DiffError, apply_diff
+
+BASE = "\n".join(f"line {i}" for i in range(1, 11))
+
+
+def _diff(old: str, new: str, n: int = 3) -> str:
+    return "\n".join(difflib.unified_diff(old.split("\n"), new.split("\n"), n=n, lineterm=""))
+
+
+@pytest.mark.parametrize("n", [0, 1, 3])
+@pytest.mark.parametrize(
+    "new",
+    [
+        BASE.replace("line 5", "line five"),
+        "line 0\n" + BASE,
+        BASE + "\nline 11",
+        BASE.replace("line 3\n", "").replace("line 8", "line eight\nline 8.5"),
+        "",
+    ],
+)
+def test_applies_difflib_output(new, n):
+    assert apply_diff(BASE, _diff(BASE, new, n)) == new
+
+
+def test_empty_diff_keeps_the_code():
+    assert apply_diff(BASE, "") == BASE
+
+
+def test_stale_base_is_rejected():
+    other = BASE.replace("line 4", "line four")
+    diff = _diff(other, other.replace("line 5", "line five"))
+    with pytest.raises(DiffError):
+        apply_diff(BASE, diff)
+
+
+def test_stale_base_is_rejected_without_context_lines():
+    other = BASE.replace("line 5", "line V")
+    with pytest.raises(DiffError):
+        apply_diff(BASE, _diff(other, other.replace("line V", "line five"), n=0))
+
+
+@pytest.mark.parametrize(
+    "diff",
+    [
+        "@@ -5 +5 @@\n-line 5",  # truncated hunk
+        "@@ -5,2 +5,1 @@\n-line 5\n+line five",  # counts don't match the lines
+        "@@ -5 +5 @@\n?line 5\n+line five",  # unknown line tag
+        "@@ -5 +5 @@\n-line 5\n+line five\nnot a hunk",  # text after the hunk
+        "@@ -50 +50 @@\n-line 50\n+line fifty",  # past the end of the code
+        "@@ -7 +7 @@\n-line 7\n+x\n@@ -2 +2 @@\n-line 2\n+y",  # hunks out of order
+        "@@ garbled @@\n-line 5\n+line five",
+    ],
+)
+def test_malformed_diffs_are_rejected(diff):
+    with pytest.raises(DiffError):
+        apply_diff(BASE, diff)
@@ -0,0 +1,90 @@
+import asyncio
+import random
+
+import pytest
+
+from app.services.stress_test import (
+    ChoiceSource,
+    StressTester,
+    _choice_value,
+    _value_choice,
+    generate_input,
+)
+
+RANGES = [(-5, 5), (-3, 10), (-10, 2), (0, 7), (3, 9), (-9, -2), (0, 0), (-1, 0), (-100, 100)]
+
+
+@pytest.mark.parametrize("lo, hi", RANGES)
+def test_value_choice_round_trip(lo, hi):
+    for value in range(lo, hi + 1):
+        assert _choice_value(_value_choice(value, lo, hi), lo, hi) == value
+
+
+@pytest.mark.parametrize("lo, hi", RANGES)
+def test_choices_cover_the_range_once(lo, hi):
+    values = [_choice_value(choice, lo, hi) for choice in range(hi - lo + 1)]
+    assert sorted(values) == list(range(lo, hi + 1))
+    # Choice 0 is the in-range value nearest 0, and larger choices move away from it
+    assert values[0] == min(max(0, lo), hi)
+    distances = [abs(value - values[0]) for value in values]
+    assert distances == sorted(distances)
+
+
+def test_choices_past_the_range_stay_at_the_far_bound():
+    assert _choice_value(1000, -3, 10) == 10
+    assert _choice_value(1000, -10, 2) == -10
+
+
+SPEC = {"lines": [[{"int": [-100, 100], "repeat": 5}]]}
+
+
+def _stub_tester() -> StressTester:
+    """A tester whose _check fails on any value >= 37, or times out on any value <= -50."""
+    tester = StressTester()
+
+    async def check(spec, choices, student, reference, rng=None):
+        source = ChoiceSource(choices, rng)
+        stdin = generate_input(spec, source)
+        used = source.choices[:source.position]
+        values = [int(v) for v in stdin.split()]
+        if max(values) >= 37:
+            return {"reason": "wrong_answer", "input": stdin, "expected": "", "actual": ""}, used
+        if min(values) <= -50:
+            return {"reason": "timeout", "input": stdin, "expected": "", "actual": ""}, used
+        return None, used
+
+    tester._check = check
+    return tester
+
+
+async def _first_failure(tester: StressTester, seed: int, reason: str):
+    rng = random.Random(seed)
+    while True:
+        failure, used = await tester._check(SPEC, [], None, None, rng)
+        if failure is not None and failure["reason"] == reason:
+            return failure, used
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_shrink_finds_the_minimal_counterexample(seed):
+    tester = _stub_tester()
+
+    async def shrink():
+        failure, choices = await _first_failure(tester, seed, "wrong_answer")
+        return await tester._shrink(SPEC, choices, failure, None, None)
+
+    failure = asyncio.run(shrink())
+    assert failure["reason"] == "wrong_answer"
+    assert failure["input"] == "37 0 0 0 0\n"
+
+
+def test_shrink_keeps_the_kind_of_failure():
+    tester = _stub_tester()
+
+    async def shrink():
+        failure, choices = await _first_failure(tester, 0, "timeout")
+        return await tester._shrink(SPEC, choices, failure, None, None)
+
+    failure = asyncio.run(shrink())
+    assert failure["reason"] == "timeout"
+    assert failure["input"] == "-50 0 0 0 0\n"
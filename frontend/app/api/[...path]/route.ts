@@ -18,7 +18,7 @@ async function proxyRequest(request: NextRequest, { params }: { params: { path:
 
     // Build headers (forward relevant ones)
     const headers = new Headers();
-    const forwardHeaders = ['content-type', 'authorization', 'accept', 'accept-language'];
+    const forwardHeaders = ['content-type', 'authorization', 'accept', 'accept-language', 'idempotency-key'];
     forwardHeaders.forEach((header) => {
         const value = request.headers.get(header);
         if (value) headers.set(header, value);
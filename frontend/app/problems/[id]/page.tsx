@@ -193,8 +193,8 @@ export default function ProblemPage() {
                                         </span>
                                     </div>
                                     <p className="text-white/80">{result.feedback_ar}</p>
-                                    {result.hint && (
-                                        <p className="text-white/60 mt-2 text-sm">💡 {result.hint}</p>
+                                    {(result.hint_ar || result.hint) && (
+                                        <p className="text-white/60 mt-2 text-sm">💡 {result.hint_ar || result.hint}</p>
                                     )}
                                 </div>
                             )}
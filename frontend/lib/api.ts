@@ -18,6 +18,36 @@ api.interceptors.request.use((config) => {
     return config;
 });
 
+// Each user action (a click or a send) gets its own Idempotency-Key, which
+// automatic retries of that request reuse, so the backend does the work once.
+const RETRY_DELAYS_MS = [1000, 3000];
+
+const newKey = () =>
+    typeof crypto !== 'undefined' && 'randomUUID' in crypto
+        ? crypto.randomUUID()
+        : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
+// No response, a gateway error, or the original still running (409 + Retry-After)
+const isTransient = (error: any) => {
+    const response = error?.response;
+    if (!response) return true;
+    if (response.status === 409) return Boolean(response.headers?.['retry-after']);
+    return [502, 503, 504].includes(response.status);
+};
+
+const postIdempotent = async (path: string, payload: unknown) => {
+    const headers = { 'Idempotency-Key': newKey() };
+    for (let attempt = 0; ; attempt++) {
+        try {
+            const { data } = await api.post(path, payload, { headers });
+            return data;
+        } catch (error) {
+            if (attempt >= RETRY_DELAYS_MS.length || !isTransient(error)) throw error;
+            await new Promise((resolve) => setTimeout(resolve, RETRY_DELAYS_MS[attempt]));
+        }
+    }
+};
+
 // Types
 export interface Problem {
     id: number;
@@ -45,6 +75,8 @@ export interface GradeResponse {
     feedback_en: string;
     feedback_ar: string;
     hint?: string;
+    hint_ar?: string;
+    error?: boolean;
 }
 
 export interface ChatResponse {
@@ -52,6 +84,8 @@ export interface ChatResponse {
     message_ar: string;
     code_snippet?: string;
     suggestions: string[];
+    code_version?: string;
+    error?: boolean;
 }
 
 // API functions
@@ -86,8 +120,7 @@ export const submissionsApi = {
         if (constraints) payload.problem_constraints = constraints;
         if (sampleIo) payload.problem_sample_io = sampleIo;
 
-        const { data } = await api.post('/submissions', payload);
-        return data;
+        return postIdempotent('/submissions', payload);
     },
     list: async (problemId?: number) => {
         const params = problemId ? `?problem_id=${problemId}` : '';
@@ -96,6 +129,34 @@ export const submissionsApi = {
     },
 };
 
+// Code the server last acknowledged per track; later turns send a diff against it
+const lastCode = new Map<string, { code: string; version: string }>();
+
+// Single-hunk unified diff over lines split on '\n' (what the backend expects)
+const unifiedDiff = (before: string, after: string): string => {
+    const a = before.split('\n');
+    const b = after.split('\n');
+    let start = 0;
+    while (start < a.length && start < b.length && a[start] === b[start]) start++;
+    let endA = a.length;
+    let endB = b.length;
+    while (endA > start && endB > start && a[endA - 1] === b[endB - 1]) {
+        endA--;
+        endB--;
+    }
+    if (start === endA && start === endB) return '';
+    const oldCount = endA - start;
+    const newCount = endB - start;
+    const oldStart = oldCount ? start + 1 : start;
+    const newStart = newCount ? start + 1 : start;
+    const lines = [
+        `@@ -${oldStart},${oldCount} +${newStart},${newCount} @@`,
+        ...a.slice(start, endA).map((line) => '-' + line),
+        ...b.slice(start, endB).map((line) => '+' + line),
+    ];
+    return lines.join('\n') + '\n';
+};
+
 export const chatApi = {
     send: async (
         track: 'problem_solving' | 'robotics',
@@ -104,13 +165,40 @@ export const chatApi = {
         codeContext?: string,
         projectContext?: string
     ): Promise<ChatResponse> => {
-        const { data } = await api.post('/chat', {
+        const post = (payload: Record<string, unknown>): Promise<ChatResponse> =>
+            postIdempotent('/chat', payload);
+        const payload = {
             track,
             message,
             problem_id: problemId,
             code_context: codeContext,
             project_context: projectContext,
-        });
+        };
+        const previous = lastCode.get(track);
+        let data: ChatResponse;
+        if (codeContext && previous) {
+            try {
+                data = await post({
+                    ...payload,
+                    code_context: undefined,
+                    code_diff: unifiedDiff(previous.code, codeContext),
+                    code_base: previous.version,
+                });
+            } catch (error: any) {
+                // The server lost or no longer matches our base: send the whole code
+                if (![400, 409].includes(error?.response?.status)) throw error;
+                data = await post(payload);
+            }
+        } else {
+            data = await post(payload);
+        }
+        if (codeContext) {
+            if (data.code_version) {
+                lastCode.set(track, { code: codeContext, version: data.code_version });
+            } else {
+                lastCode.delete(track);
+            }
+        }
         return data;
     },
     clearHistory: async (track: string) => {
@@ -160,11 +248,12 @@ export const generateApi = {
     problem: async (request: GenerateProblemRequest = {}): Promise<Problem> => {
         const topic = request.topic || 'IO';
         const difficulty = request.difficulty || 'Easy';
-        const { data } = await api.post('/generate/problem', {
+        const payload = {
             topic,
             difficulty,
             custom_request: request.custom_request,
-        });
+        };
+        const data = await postIdempotent('/generate/problem', payload);
         // Map backend response to frontend Problem interface
         // Handle both old format (title/description/examples) and new format (title_en/desc_en/sample_io)
         const examples = data.examples || data.sample_io || [];